@@ -1,5 +1,7 @@
 if __name__ == "__main__":
     import argparse
+    from concurrent.futures import ProcessPoolExecutor
+    from contextlib import nullcontext
     from src.GeneratorAugmentedImages import GeneratorAugmentedImages
     from src.Util import get_fixed_path
     from src.InformationLossChecker import InformationLossChecker
@@ -19,6 +21,14 @@ if __name__ == "__main__":
     parser.add_argument("-rv", "--rotation_values", help="Tuple of rotation radians ex.(-0.26, 0.26)", type=tuple, required=False, default=(-0.26, 0.26))
     parser.add_argument("-zv", "--zoom_values", help="Tuple of zoom values ex.(-0.01, 0.01) => -1% / 1%", type=tuple, required=False, default=(-0.01, 0.01))
 
+    parser.add_argument("-fu", "--fused", help="Transform each image with a single resampling instead of one for each transformation", action="store_true")
+
+    parser.add_argument("-w", "--workers", help="Processes that generate the images, the images are the same for any number of workers", type=int,
+                        required=False, default=1)
+
+    parser.add_argument("-cmb", "--cache_mb", help="MB of decoded source images kept in memory by each process, 0 to disable", type=int,
+                        required=False, default=256)
+
     args = parser.parse_args()
 
     input_folder = get_fixed_path(args.input_folder, replace_backslash=True, add_backslash=True)
@@ -32,9 +42,16 @@ if __name__ == "__main__":
                                    flip_horizontal_probability=args.flip_horizontal_probability,
                                    rotation_values=args.rotation_values,
                                    zoom_values=(1.0 + args.zoom_values[0], 1.0 + args.zoom_values[1]),
-                                   seed=42)
-
-    gen.generate_augmented_images_to_folder(output_folder,
-                                            number_of_images=args.number_of_images,
-                                            image_size=(416, 416),
-                                            information_loss_checker_method=InformationLossChecker.box_centers_out_of_bounds)
+                                   seed=42,
+                                   fused=args.fused,
+                                   cache_bytes=args.cache_mb * 1024 * 1024)
+
+    with ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else nullcontext() as executor:
+        gen.generate_augmented_images_to_folder(output_folder,
+                                                number_of_images=args.number_of_images,
+                                                image_size=(416, 416),
+                                                information_loss_checker_method=InformationLossChecker.box_centers_out_of_bounds,
+                                                executor=executor)
+
+    if args.workers <= 1 and gen.get_cache() is not None:
+        print("Source cache:", gen.get_cache().get_stats())
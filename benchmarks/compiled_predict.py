@@ -0,0 +1,60 @@
+"""Per-call overhead of keras' predict against the compiled tf.function (CompiledModel), with random weights.
+
+Run from the repository folder: python -m benchmarks.compiled_predict"""
+
+
+def time_calls(predict, batch_x, number_of_calls):
+    """Returns the mean milliseconds of a call, after a first untimed call"""
+    import time
+
+    predict(batch_x)
+
+    time_start = time.perf_counter()
+    for _ in range(number_of_calls):
+        predict(batch_x)
+    return (time.perf_counter() - time_start) / number_of_calls * 1000.0
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import numpy as np
+    from src.CompiledModel import CompiledModel
+    import src.nets
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-n", "--calls", help="Timed calls for each model and batch size", type=int, required=False, default=20)
+    parser.add_argument("-bs", "--batch_sizes", help="Batch sizes to time", type=int, nargs="+", required=False, default=[1, 4, 16])
+    parser.add_argument("-xla", "--xla", help="Also time the tf.function compiled with XLA", action="store_true")
+    parser.add_argument("-o", "--output", help="If given, where to save the results as JSON", type=str, required=False, default=None)
+
+    args = parser.parse_args()
+
+    models = {
+        "tracking": src.nets.generate_tracking_model(input_shape=(416, 416, 1), output_shape=(13, 13, 11), number_of_classes=6),
+        "identification": src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=9),
+    }
+
+    results = []
+    for name, model in models.items():
+        predicts = {
+            "keras": lambda x, model=model: model.predict(x, batch_size=None, verbose=0),
+            "compiled": CompiledModel(model).predict,
+        }
+        if args.xla:
+            predicts["compiled_xla"] = CompiledModel(model, jit_compile=True).predict
+
+        for batch_size in args.batch_sizes:
+            batch_x = np.random.rand(batch_size, *model.input_shape[1:]).astype(np.float32)
+
+            result = {"model": name, "batch_size": batch_size}
+            for predict_name, predict in predicts.items():
+                result[predict_name + "_ms"] = time_calls(predict, batch_x, args.calls)
+            results.append(result)
+
+            print(", ".join(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}" for key, value in result.items()))
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
@@ -0,0 +1,256 @@
+"""Throughput of the data generation: images/sec of each transformation of AugmentedImage and of all of them
+combined (chained and fused), of GeneratorAugmentedImages (with and without writing the images), of each
+DatasetGenerator.generate_*_dataset (samples/sec and images/sec) and batches/sec of the training generators and Sequences.
+
+Without --input_folder a synthetic labeled corpus is generated in a temporary folder.
+
+Run from the repository folder: python -m benchmarks.data_generation"""
+
+
+def time_per_second(function, number_of_calls):
+    """Returns the calls/sec of function(index) over number_of_calls calls, after a first untimed call"""
+    import time
+
+    function(0)
+
+    time_start = time.perf_counter()
+    for index in range(number_of_calls):
+        function(index)
+    return number_of_calls / (time.perf_counter() - time_start)
+
+
+def iterate_sequence(sequence):
+    """Endless iterator over the batches of a keras Sequence, calling on_epoch_end at the end of each epoch"""
+    while True:
+        for index in range(len(sequence)):
+            yield sequence[index]
+        sequence.on_epoch_end()
+
+
+def count_image_files(folder, image_exts=(".png", ".jpg")):
+    import os
+    return sum(len([x for x in file_names if x.endswith(image_exts)]) for __, __, file_names in os.walk(folder))
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+    import os
+    import random
+    import time
+    import json
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from benchmarks.synthetic import generate_synthetic_corpus
+    from benchmarks.training_input import time_batches
+    from src.AugmentedImage import AugmentedImage
+    from src.DatasetGenerator import DatasetGenerator
+    from src.GeneratorAugmentedImages import GeneratorAugmentedImages
+    from src.IdentificationNetwork import IdentificationNetwork
+    from src.InformationLossChecker import InformationLossChecker
+    from src.ShardReader import ShardReader
+    from src.ShardWriter import ShardWriter
+    from src.TrackingNetwork import TrackingNetwork
+    from src.Util import get_fixed_path
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-i", "--input_folder", help="Folder of labeled images, synthetic if not given", type=str, required=False, default=None)
+    parser.add_argument("-ci", "--corpus_images", help="Images of the synthetic corpus", type=int, required=False, default=20)
+    parser.add_argument("-n", "--samples", help="Samples timed for each transformation and augmentation", type=int, required=False, default=100)
+    parser.add_argument("-dn", "--dataset_images", help="number_of_images of each generate_*_dataset", type=int, required=False, default=100)
+    parser.add_argument("-nb", "--batches", help="Timed batches for each training input", type=int, required=False, default=20)
+    parser.add_argument("-bs", "--batch_size", help="Batch size of the training inputs", type=int, required=False, default=16)
+    parser.add_argument("-w", "--workers", help="If more than 1, also time the datasets and the augmentation made by this many processes", type=int,
+                        required=False, default=1)
+    parser.add_argument("-cmb", "--cache_mb", help="Megabytes of the cache of the source images (0 disables it)", type=int, required=False, default=256)
+    parser.add_argument("-o", "--output", help="If given, where to save the results as JSON", type=str, required=False, default=None)
+
+    args = parser.parse_args()
+
+    temporary_folder = tempfile.TemporaryDirectory()
+    output_folder = temporary_folder.name + "/"
+
+    if args.input_folder is None:
+        input_folder = output_folder + "Corpus/"
+        generate_synthetic_corpus(input_folder, number_of_images=args.corpus_images)
+    else:
+        input_folder = get_fixed_path(args.input_folder, replace_backslash=True, add_backslash=True)
+
+    cache_bytes = args.cache_mb * 1024 * 1024
+    results = []
+
+    def add_result(group, name, **values):
+        result = {"group": group, "name": name} | values
+        results.append(result)
+        print(", ".join(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}" for key, value in result.items()))
+
+    ####################################################################################################################
+    # Transformations, on images already read and random values already drawn
+    ####################################################################################################################
+    generator_augmented_images = GeneratorAugmentedImages(input_folder, input_folder, cache_bytes=cache_bytes)
+    images_and_boxes_file_names = generator_augmented_images.get_images_and_boxes_file_names()
+
+    augmented_images = [AugmentedImage.from_files(input_folder + image_file, input_folder + box_file) for image_file, box_file in images_and_boxes_file_names]
+    rng = random.Random(42)
+    transformations = [(rng.choice(augmented_images), rng.uniform(-0.26, 0.26), rng.uniform(0.99, 1.01)) for _ in range(args.samples + 1)]
+
+    def transform(method):
+        def transform_index(index):
+            augmented_image, rad, factor = transformations[index]
+            method(AugmentedImage(augmented_image.get_image(), augmented_image.get_boxes().copy()), rad, factor)
+        return transform_index
+
+    def transform_chained(augmented_image, rad, factor):
+        augmented_image.rotate_image(rad)
+        augmented_image.zoom_image(factor)
+        augmented_image.flip_image_vertically()
+        augmented_image.flip_image_horizontally()
+
+    transform_methods = {
+        "rotate": lambda augmented_image, rad, factor: augmented_image.rotate_image(rad),
+        "zoom": lambda augmented_image, rad, factor: augmented_image.zoom_image(factor),
+        "flip_vertical": lambda augmented_image, rad, factor: augmented_image.flip_image_vertically(),
+        "flip_horizontal": lambda augmented_image, rad, factor: augmented_image.flip_image_horizontally(),
+        "combined_chained": transform_chained,
+        "combined_fused": lambda augmented_image, rad, factor: augmented_image.transform_image(rad, factor, True, True),
+    }
+
+    for name, method in transform_methods.items():
+        add_result("transform", name, images_per_sec=time_per_second(transform(method), args.samples))
+
+    add_result("transform", "read_uncached", images_per_sec=time_per_second(
+        lambda index: AugmentedImage.from_files(*[input_folder + x for x in images_and_boxes_file_names[index % len(images_and_boxes_file_names)]]),
+        args.samples))
+
+    ####################################################################################################################
+    # GeneratorAugmentedImages
+    ####################################################################################################################
+    for fused in (False, True):
+        generator_augmented_images.set_fused(fused)
+        name = "fused" if fused else "chained"
+
+        add_result("augment", name, images_per_sec=time_per_second(
+            lambda index: generator_augmented_images.augment(generator_augmented_images.get_random(index), images_and_boxes_file_names,
+                                                             InformationLossChecker.box_centers_out_of_bounds),
+            args.samples))
+
+        time_start = time.perf_counter()
+        generator_augmented_images.generate_augmented_images_to_folder(output_folder + f"Augmented_{name}/", args.samples,
+                                                                       information_loss_checker_method=InformationLossChecker.box_centers_out_of_bounds)
+        add_result("augment_to_folder", name, images_per_sec=args.samples / (time.perf_counter() - time_start))
+
+    generator_augmented_images.set_fused(False)
+
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            #The start of the processes is not timed
+            list(executor.map(abs, range(args.workers)))
+
+            time_start = time.perf_counter()
+            generator_augmented_images.generate_augmented_images_to_folder(output_folder + "Augmented_workers/", args.samples,
+                                                                           information_loss_checker_method=InformationLossChecker.box_centers_out_of_bounds,
+                                                                           executor=executor)
+            add_result("augment_to_folder", f"chained_{args.workers}_workers", images_per_sec=args.samples / (time.perf_counter() - time_start))
+
+    ####################################################################################################################
+    # DatasetGenerator
+    ####################################################################################################################
+    def generate_datasets(dataset_generator, datasets_folder, executor=None, sharded=False):
+        """Returns the (images, seconds) of each generate_*_dataset. The images are the records of the shards or the
+        files of the folders, where the sections of the same type taken from one sample share the same name"""
+        generate_methods = {
+            "pre_tracking": lambda shard_writer: dataset_generator.generate_pre_tracking_dataset(datasets_folder + "PreTracking/", args.dataset_images,
+                                                                                                 shard_writer=shard_writer, seed=7, executor=executor),
+            "tracking": lambda shard_writer: dataset_generator.generate_tracking_dataset(datasets_folder + "Tracking/", datasets_folder + "Tracking/",
+                                                                                         args.dataset_images, shard_writer=shard_writer, seed=7, executor=executor),
+            "identification": lambda shard_writer: dataset_generator.generate_identification_dataset(datasets_folder + "Identification/", args.dataset_images,
+                                                                                                     shard_writer=shard_writer, seed=7, executor=executor),
+        }
+
+        timings = {}
+        for name, generate in generate_methods.items():
+            time_start = time.perf_counter()
+            if sharded:
+                with ShardWriter(datasets_folder + name + "_shards/") as shard_writer:
+                    generate(shard_writer)
+                seconds = time.perf_counter() - time_start
+                number_of_images = len(ShardReader(datasets_folder + name + "_shards/"))
+            else:
+                generate(None)
+                seconds = time.perf_counter() - time_start
+                number_of_images = count_image_files(datasets_folder + {"pre_tracking": "PreTracking/", "tracking": "Tracking/", "identification": "Identification/"}[name])
+            timings[name] = (number_of_images, seconds)
+        return timings
+
+    dataset_runs = {"serial": (output_folder + "Datasets/", False),
+                    "serial_sharded": (output_folder + "Datasets_sharded/", True)}
+
+    for run_name, (datasets_folder, sharded) in dataset_runs.items():
+        for name, (number_of_images, seconds) in generate_datasets(DatasetGenerator(input_folder, input_folder, cache_bytes=cache_bytes),
+                                                                   datasets_folder, sharded=sharded).items():
+            add_result("dataset", f"{name}_{run_name}", samples_per_sec=args.dataset_images / seconds, images=number_of_images,
+                       images_per_sec=number_of_images / seconds)
+
+    if args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            list(executor.map(abs, range(args.workers)))
+
+            for name, (number_of_images, seconds) in generate_datasets(DatasetGenerator(input_folder, input_folder, cache_bytes=cache_bytes),
+                                                                       output_folder + "Datasets_workers/", executor=executor).items():
+                add_result("dataset", f"{name}_{args.workers}_workers", samples_per_sec=args.dataset_images / seconds, images=number_of_images,
+                           images_per_sec=number_of_images / seconds)
+
+    ####################################################################################################################
+    # Training generators
+    ####################################################################################################################
+    datasets_folder = output_folder + "Datasets/"
+    datasets_sharded_folder = output_folder + "Datasets_sharded/"
+
+    training_inputs = {
+        "tracking_generator": lambda: TrackingNetwork.generator(datasets_folder + "Tracking/", datasets_folder + "Tracking/", batch_size=args.batch_size),
+        "tracking_sequence": lambda: iterate_sequence(TrackingNetwork.sequence(datasets_folder + "Tracking/", datasets_folder + "Tracking/",
+                                                                               batch_size=args.batch_size, seed=7)),
+        "tracking_shards": lambda: TrackingNetwork.generator_from_shards(datasets_sharded_folder + "tracking_shards/", batch_size=args.batch_size),
+        "tracking_augmentation": lambda: TrackingNetwork.augmentation_generator(generator_augmented_images, batch_size=args.batch_size,
+                                                                               information_loss_checker_method=InformationLossChecker.box_centers_out_of_bounds,
+                                                                               workers=0),
+    }
+
+    #The model of the type 0 has 9 classes, a small corpus may not generate all of them
+    identification_folder = datasets_folder + "Identification/0/"
+    identification_classes = sorted(os.listdir(identification_folder)) if os.path.isdir(identification_folder) else []
+
+    if len(identification_classes) == 0:
+        print("No identification images of the type 0 were generated, skipping the identification inputs")
+    else:
+        #The labels of generator are as wide as the number of folders, it needs a folder for each class
+        if identification_classes == [str(i) for i in range(9)]:
+            training_inputs["identification_generator"] = lambda: IdentificationNetwork.generator(identification_folder, batch_size=args.batch_size)
+        else:
+            print(f"Only the classes {', '.join(identification_classes)} of the type 0 were generated, skipping identification_generator "
+                  "(use a bigger corpus to time it)")
+
+        training_inputs["identification_sequence"] = lambda: iterate_sequence(IdentificationNetwork.sequence(identification_folder, batch_size=args.batch_size,
+                                                                                                             number_of_classes=9, seed=7))
+        training_inputs["identification_in_memory"] = lambda: IdentificationNetwork.in_memory_generator(identification_folder, batch_size=args.batch_size,
+                                                                                                        number_of_classes=9)
+
+    if args.workers > 1:
+        training_inputs[f"tracking_augmentation_{args.workers}_workers"] = lambda: TrackingNetwork.augmentation_generator(
+            generator_augmented_images, batch_size=args.batch_size, information_loss_checker_method=InformationLossChecker.box_centers_out_of_bounds,
+            workers=args.workers)
+
+    for name, get_input in training_inputs.items():
+        iterator = get_input()
+        add_result("training_input", name, batch_size=args.batch_size, batches_per_sec=time_batches(iterator, args.batches))
+
+        #Stops the processes of the augmentation generators
+        if hasattr(iterator, "close"):
+            iterator.close()
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    temporary_folder.cleanup()
@@ -0,0 +1,124 @@
+"""Milliseconds per sample of the chained augmentation (rotate_image, zoom_image, flips) against the fused one
+(transform_image), on the same random values, with and without reading the images. Also checks that the fused boxes match the chained ones and reports
+how much the images differ.
+
+Without --input_folder a synthetic corpus is generated in a temporary folder.
+
+Run from the repository folder: python -m benchmarks.fused_augmentation"""
+
+
+def time_samples(augment, number_of_samples):
+    """Returns the mean milliseconds of augment(index) over the samples, after a first untimed sample"""
+    import time
+
+    augment(0)
+
+    time_start = time.perf_counter()
+    for index in range(number_of_samples):
+        augment(index)
+    return (time.perf_counter() - time_start) / number_of_samples * 1000.0
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+    import random
+    import copy
+    import json
+    import numpy as np
+    from benchmarks.synthetic import generate_synthetic_corpus
+    from src.AugmentedImage import AugmentedImage
+    from src.GeneratorAugmentedImages import GeneratorAugmentedImages
+    from src.Util import get_fixed_path
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-i", "--input_folder", help="Folder of labeled images, synthetic if not given", type=str, required=False, default=None)
+    parser.add_argument("-n", "--samples", help="Augmented samples for each mode", type=int, required=False, default=200)
+    parser.add_argument("-fvp", "--flip_vertical_probability", help="Probability of a vertical flip", type=float, required=False, default=0.25)
+    parser.add_argument("-fhp", "--flip_horizontal_probability", help="Probability of a horizontal flip", type=float, required=False, default=0.25)
+    parser.add_argument("-o", "--output", help="If given, where to save the results as JSON", type=str, required=False, default=None)
+
+    args = parser.parse_args()
+
+    temporary_folder = tempfile.TemporaryDirectory()
+
+    if args.input_folder is None:
+        input_folder = temporary_folder.name + "/Corpus/"
+        generate_synthetic_corpus(input_folder, number_of_images=20)
+    else:
+        input_folder = get_fixed_path(args.input_folder, replace_backslash=True, add_backslash=True)
+
+    generators = {
+        "chained": GeneratorAugmentedImages(input_folder, input_folder,
+                                            flip_vertical_probability=args.flip_vertical_probability,
+                                            flip_horizontal_probability=args.flip_horizontal_probability),
+        "fused": GeneratorAugmentedImages(input_folder, input_folder,
+                                          flip_vertical_probability=args.flip_vertical_probability,
+                                          flip_horizontal_probability=args.flip_horizontal_probability,
+                                          fused=True),
+    }
+    images_and_boxes_file_names = generators["chained"].get_images_and_boxes_file_names()
+
+    def augment(generator, index):
+        return generator.augment(generator.get_random(index), images_and_boxes_file_names)[0]
+
+    #Transformations only, on images already read and random values already drawn
+    augmented_images = [AugmentedImage.from_files(input_folder + image_file, input_folder + box_file) for image_file, box_file in images_and_boxes_file_names]
+    rng = random.Random(42)
+    transformations = [(rng.choice(augmented_images), rng.uniform(-0.26, 0.26), rng.uniform(0.99, 1.01),
+                        rng.random() <= args.flip_vertical_probability, rng.random() <= args.flip_horizontal_probability)
+                       for _ in range(args.samples)]
+
+    def transform_chained(index):
+        augmented_image, rad, factor, flip_vertically, flip_horizontally = transformations[index]
+        augmented_image = AugmentedImage(augmented_image.get_image(), copy.deepcopy(augmented_image.get_boxes()))
+        augmented_image.rotate_image(rad)
+        augmented_image.zoom_image(factor)
+        if flip_vertically:
+            augmented_image.flip_image_vertically()
+        if flip_horizontally:
+            augmented_image.flip_image_horizontally()
+
+    def transform_fused(index):
+        augmented_image, rad, factor, flip_vertically, flip_horizontally = transformations[index]
+        augmented_image = AugmentedImage(augmented_image.get_image(), copy.deepcopy(augmented_image.get_boxes()))
+        augmented_image.transform_image(rad, factor, flip_vertically, flip_horizontally)
+
+    result = {"samples": args.samples}
+    for name, generator in generators.items():
+        result[name + "_ms"] = time_samples(lambda index, generator=generator: augment(generator, index), args.samples)
+    result["chained_transform_ms"] = time_samples(transform_chained, args.samples)
+    result["fused_transform_ms"] = time_samples(transform_fused, args.samples)
+
+    #Same random values, so the boxes should match and the images only differ by the resampling
+    center_errors = []
+    size_errors = []
+    classes_match = True
+    image_differences = []
+    for index in range(args.samples):
+        augmented_image_chained = augment(generators["chained"], index)
+        augmented_image_fused = augment(generators["fused"], index)
+
+        boxes_chained = augmented_image_chained.get_boxes()
+        boxes_fused = augmented_image_fused.get_boxes()
+
+        classes_match = classes_match and boxes_chained.get_box_classes() == boxes_fused.get_box_classes()
+        center_errors.append(np.abs(np.array(boxes_chained.get_box_centers()) - np.array(boxes_fused.get_box_centers())).max())
+        size_errors.append(np.abs(np.array(boxes_chained.get_box_sizes()) - np.array(boxes_fused.get_box_sizes())).max())
+        image_differences.append(np.abs(augmented_image_chained.get_image().astype(np.float64) - augmented_image_fused.get_image()).mean())
+
+    result["speedup"] = result["chained_ms"] / result["fused_ms"]
+    result["transform_speedup"] = result["chained_transform_ms"] / result["fused_transform_ms"]
+    result["box_classes_match"] = bool(classes_match)
+    result["max_center_error_px"] = float(np.max(center_errors))
+    result["max_size_error_px"] = float(np.max(size_errors))
+    result["mean_image_difference"] = float(np.mean(image_differences))
+
+    print(", ".join(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}" for key, value in result.items()))
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=4)
+
+    temporary_folder.cleanup()
@@ -0,0 +1,212 @@
+"""Per-stage timings of the prediction flow of predict.py: decode, tracking forward, grid decode, crop extraction,
+identification forward, LTSpiceGrid wiring (with the Boxes of the identified classes) and .asc write. For each
+thread count and batch size it reports the throughput and the p50/p95/p99 latencies of the batches and of each stage.
+
+Without --input_folder a synthetic corpus is generated in a temporary folder. Without --models_folder the models
+have random weights, so the number of boxes (and the time of the identification) depends on --confidence.
+Each thread count runs in its own process, as TensorFlow fixes its threads when it starts.
+
+Run from the repository folder: python -m benchmarks.predict_pipeline"""
+
+STAGES = ("decode", "tracking_forward", "grid_decode", "crop_extraction", "identification_forward", "ltspice_grid", "asc_write")
+
+
+def get_percentiles(values):
+    """Returns the mean, p50, p95 and p99 of values in milliseconds"""
+    import numpy as np
+
+    values = np.array(values) * 1000.0
+    return {"mean_ms": float(values.mean()),
+            "p50_ms": float(np.percentile(values, 50)),
+            "p95_ms": float(np.percentile(values, 95)),
+            "p99_ms": float(np.percentile(values, 99))}
+
+
+def time_batch(net_tracking, net_identification, image_paths, output_folder, confidence=0.5, number_of_models=6, image_input_size=(50, 50), subdivisions=13):
+    """Runs the stages of LTSpicePipeline on a batch of images, returning the seconds of each stage and the number of boxes"""
+    import time
+    import os
+    from src.AugmentedImage import AugmentedImage
+    from src.Boxes import Boxes
+    from src.GridBoxesUtil import GridBoxesUtil
+    from src.ImageSectionsUtil import ImageSectionsUtil
+    from src.LTSpiceGrid import LTSpiceGrid
+    from src.LTSpicePipeline import LTSpicePipeline
+
+    times = {}
+    time_start = time.perf_counter()
+
+    def lap(stage):
+        nonlocal time_start
+        time_end = time.perf_counter()
+        times[stage] = time_end - time_start
+        time_start = time_end
+
+    images = [AugmentedImage.image_from_file(image_path, grayscale=True) for image_path in image_paths]
+    lap("decode")
+
+    grids = net_tracking.predict_grids_from_images(images)
+    lap("tracking_forward")
+
+    image_height, image_width = images[0].shape[0:2]
+    boxes_tracking = GridBoxesUtil.to_boxes_batch(grids, image_width, image_height, grids.shape[1], confidence)
+    lap("grid_decode")
+
+    batch_x, image_indices, box_types, boxes_data = ImageSectionsUtil.to_image_sections(images,
+                                                                                        boxes_tracking,
+                                                                                        number_of_types=number_of_models,
+                                                                                        image_section_size=image_input_size)
+    lap("crop_extraction")
+
+    box_classes = net_identification.predict_box_classes_from_image_sections(batch_x, box_types, number_of_models)
+    lap("identification_forward")
+
+    boxes_identification = Boxes.batch_from_boxes_data((image_indices, box_classes, boxes_data[:, 0], boxes_data[:, 1], boxes_data[:, 2], boxes_data[:, 3]),
+                                                       len(images))
+    ltspice_grids = [LTSpiceGrid.from_image_and_boxes(image, boxes, subdivisions) for image, boxes in zip(images, boxes_identification)]
+    lap("ltspice_grid")
+
+    for image_path, ltspice_grid in zip(image_paths, ltspice_grids):
+        LTSpicePipeline.string_to_file(ltspice_grid.to_string(subdivisions), output_folder + os.path.basename(image_path).split(".")[0] + ".asc")
+    lap("asc_write")
+
+    return times, len(box_types)
+
+
+def run_benchmark(config, threads):
+    """Builds the networks with the given intra op threads of TensorFlow (its default if 0) and times the batch sizes
+    of config, returning one result for each of them"""
+    import tensorflow as tf
+    import tempfile
+    import time
+    import cv2
+
+    if threads > 0:
+        tf.config.threading.set_intra_op_parallelism_threads(threads)
+        cv2.setNumThreads(threads)
+
+    from src.IdentificationNetwork import IdentificationNetwork
+    from src.TrackingNetwork import TrackingNetwork
+    import src.nets
+
+    numbers_of_classes = (9, 4, 2, 2, 4, 2)
+
+    net_tracking = TrackingNetwork(src.nets.generate_tracking_model(input_shape=(416, 416, 1), output_shape=(13, 13, 11), number_of_classes=6))
+    net_identification = IdentificationNetwork(models=tuple(src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=x)
+                                                            for x in numbers_of_classes))
+
+    if config["models_folder"] is not None:
+        net_tracking.load_weights(config["models_folder"] + "tracking.h5")
+        net_identification.load_all_weights(config["models_folder"] + "identification.h5", number_of_models=len(numbers_of_classes))
+
+    if not config["no_compile"]:
+        net_tracking.compile_predict(jit_compile=config["xla"], warm_up_batch_sizes=tuple(config["batch_sizes"]))
+        net_identification.compile_predict(jit_compile=config["xla"], warm_up_batch_sizes=(1,))
+
+    output_folder = tempfile.TemporaryDirectory()
+    image_paths = config["image_paths"]
+
+    results = []
+    for batch_size in config["batch_sizes"]:
+        batches = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+
+        #A first untimed pass, so that the compilations and the caches of the file system are not timed
+        time_batch(net_tracking, net_identification, batches[0], output_folder.name + "/", config["confidence"])
+
+        stage_times = {stage: [] for stage in STAGES}
+        batch_times = []
+        number_of_images = 0
+        number_of_boxes = 0
+
+        time_start = time.perf_counter()
+        for _ in range(config["repetitions"]):
+            for batch in batches:
+                times, boxes = time_batch(net_tracking, net_identification, batch, output_folder.name + "/", config["confidence"])
+
+                for stage in STAGES:
+                    stage_times[stage].append(times[stage])
+                batch_times.append(sum(times.values()))
+                number_of_images += len(batch)
+                number_of_boxes += boxes
+        total_time = time.perf_counter() - time_start
+
+        result = {"threads": threads,
+                  "batch_size": batch_size,
+                  "images": number_of_images,
+                  "boxes_per_image": number_of_boxes / number_of_images,
+                  "images_per_second": number_of_images / total_time,
+                  "batch_latency": get_percentiles(batch_times),
+                  "stages": {stage: get_percentiles(stage_times[stage]) for stage in STAGES}}
+
+        total_stage_time = sum(sum(x) for x in stage_times.values())
+        for stage in STAGES:
+            result["stages"][stage]["share"] = sum(stage_times[stage]) / total_stage_time
+
+        results.append(result)
+
+    output_folder.cleanup()
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+    import json
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from benchmarks.synthetic import generate_synthetic_corpus
+    from src.AugmentedImagesUtil import AugmentedImagesUtil
+    from src.Util import get_fixed_path
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-i", "--input_folder", help="Folder of the images to predict, synthetic if not given", type=str, required=False, default=None)
+    parser.add_argument("-m", "--models_folder", help="If given, from where to load the models' weights, random if not given", type=str,
+                        required=False, default=None)
+    parser.add_argument("-n", "--number_of_images", help="Synthetic images", type=int, required=False, default=32)
+    parser.add_argument("-r", "--repetitions", help="Timed passes over the images for each batch size", type=int, required=False, default=3)
+    parser.add_argument("-bs", "--batch_sizes", help="Batch sizes to time", type=int, nargs="+", required=False, default=[1, 4, 16])
+    parser.add_argument("-t", "--threads", help="Intra op threads of TensorFlow to time, 0 for its default", type=int, nargs="+", required=False, default=[0])
+    parser.add_argument("-c", "--confidence", help="Confidence threshold for the prediction", type=float, required=False, default=0.5)
+    parser.add_argument("-nco", "--no_compile", help="Use keras' predict instead of the compiled tf.function", action="store_true")
+    parser.add_argument("-xla", "--xla", help="Compile the tf.function with XLA", action="store_true")
+    parser.add_argument("-o", "--output", help="If given, where to save the results as JSON", type=str, required=False, default=None)
+
+    args = parser.parse_args()
+
+    temporary_folder = tempfile.TemporaryDirectory()
+
+    if args.input_folder is None:
+        input_folder = temporary_folder.name + "/Corpus/"
+        generate_synthetic_corpus(input_folder, number_of_images=args.number_of_images)
+    else:
+        input_folder = get_fixed_path(args.input_folder, replace_backslash=True, add_backslash=True)
+
+    image_file_names = sorted(AugmentedImagesUtil.get_images_file_names_from_folder(input_folder, image_exts=(".jpg", ".png")))
+
+    config = {"image_paths": [input_folder + x for x in image_file_names],
+              "models_folder": get_fixed_path(args.models_folder, replace_backslash=True, add_backslash=True) if args.models_folder is not None else None,
+              "batch_sizes": args.batch_sizes,
+              "repetitions": args.repetitions,
+              "confidence": args.confidence,
+              "no_compile": args.no_compile,
+              "xla": args.xla}
+
+    results = []
+    for threads in args.threads:
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results_of_threads = executor.submit(run_benchmark, config, threads).result()
+
+        for result in results_of_threads:
+            print(f"threads: {result['threads']}, batch_size: {result['batch_size']}, images/s: {result['images_per_second']:.2f}, "
+                  f"boxes/image: {result['boxes_per_image']:.1f}, batch latency p50/p95/p99: "
+                  + "/".join(f"{result['batch_latency'][x]:.2f}" for x in ("p50_ms", "p95_ms", "p99_ms")) + " ms")
+            print("    " + ", ".join(f"{stage}: {value['mean_ms']:.2f} ms ({value['share'] * 100.0:.1f}%)" for stage, value in result["stages"].items()))
+        results += results_of_threads
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"config": {key: value for key, value in config.items() if key != "image_paths"} | {"images": len(image_file_names), "threads": args.threads},
+                       "results": results}, f, indent=4)
+
+    temporary_folder.cleanup()
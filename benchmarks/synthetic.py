@@ -0,0 +1,42 @@
+"""Synthetic labeled schematics used by the benchmarks when no fixture folder is given."""
+
+
+def generate_synthetic_corpus(folder_output, number_of_images, image_size=416, subdivisions=13, boxes_per_image=12, seed=42):
+    """Writes number_of_images synthetic schematics (.png) with their YOLO formatted boxes (.txt) to folder_output.
+    Each box is drawn centered in its own grid cell, so the corpus never produces grid collisions"""
+    import numpy as np
+    import random
+    import cv2
+    import os
+    from src.Box import Box
+
+    os.makedirs(folder_output, exist_ok=True)
+
+    rng = random.Random(seed)
+    step = image_size / subdivisions
+
+    for index in range(number_of_images):
+        image = np.full((image_size, image_size, 3), 255, dtype=np.uint8)
+
+        cells = rng.sample(range(subdivisions * subdivisions), boxes_per_image)
+
+        box_strings = []
+        for cell in cells:
+            cell_y, cell_x = divmod(cell, subdivisions)
+            box_class = rng.randrange(0, 23)
+
+            x = (cell_x + 0.5) * step
+            y = (cell_y + 0.5) * step
+            width = rng.uniform(0.5, 0.9) * step
+            height = rng.uniform(0.5, 0.9) * step
+
+            #Draw something that changes with the class inside the box
+            cv2.rectangle(image, (int(x - width / 2), int(y - height / 2)), (int(x + width / 2), int(y + height / 2)), (0, 0, 0), 2)
+            cv2.putText(image, str(box_class), (int(x - width / 3), int(y + height / 4)), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 0), 1)
+
+            box_strings.append(Box(box_class, x, y, width, height).to_string(image_size, image_size))
+
+        cv2.imwrite(os.path.join(folder_output, f"{index}.png"), image)
+
+        with open(os.path.join(folder_output, f"{index}.txt"), "w") as f:
+            f.write("\n".join(box_strings) + "\n")
@@ -0,0 +1,107 @@
+"""Steps/sec of the training inputs: Python generators against tf.data pipelines.
+
+Without --datasets_folder a synthetic corpus and its datasets are generated in a temporary folder.
+With --train_steps the inputs also feed the real models for that many steps.
+
+Run from the repository folder: python -m benchmarks.training_input"""
+
+
+def time_batches(iterator, number_of_batches):
+    """Returns the batches/sec of an iterator, after a first untimed batch"""
+    import time
+
+    next(iterator)
+
+    time_start = time.perf_counter()
+    for _ in range(number_of_batches):
+        next(iterator)
+    return number_of_batches / (time.perf_counter() - time_start)
+
+
+def time_train_steps(model, loss_function, inputs, number_of_steps):
+    """Returns the training steps/sec of a model fed by inputs, after a first untimed epoch of one step"""
+    import time
+
+    model.compile("adam", loss=loss_function)
+    model.fit(inputs, steps_per_epoch=1, epochs=1, verbose=0)
+
+    time_start = time.perf_counter()
+    model.fit(inputs, steps_per_epoch=number_of_steps, epochs=1, verbose=0)
+    return number_of_steps / (time.perf_counter() - time_start)
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+    import json
+    from benchmarks.synthetic import generate_synthetic_corpus
+    from src.DatasetGenerator import DatasetGenerator
+    from src.IdentificationNetwork import IdentificationNetwork
+    from src.TrackingNetwork import TrackingNetwork
+    from src.Util import get_fixed_path
+    import src.nets
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-i", "--datasets_folder", help="Location of the \"Datasets\" folder, synthetic if not given", type=str, required=False, default=None)
+    parser.add_argument("-n", "--number_of_images", help="Images of each synthetic dataset", type=int, required=False, default=200)
+    parser.add_argument("-nb", "--batches", help="Timed batches for each input", type=int, required=False, default=50)
+    parser.add_argument("-bs", "--batch_size", help="Batch size", type=int, required=False, default=16)
+    parser.add_argument("-ts", "--train_steps", help="If given, also time this many training steps for each input", type=int, required=False, default=0)
+    parser.add_argument("-o", "--output", help="If given, where to save the results as JSON", type=str, required=False, default=None)
+
+    args = parser.parse_args()
+
+    temporary_folder = tempfile.TemporaryDirectory()
+
+    if args.datasets_folder is None:
+        corpus_folder = temporary_folder.name + "/Corpus/"
+        datasets_folder = temporary_folder.name + "/Datasets/"
+
+        generate_synthetic_corpus(corpus_folder, number_of_images=20)
+
+        generator = DatasetGenerator(folder_images=corpus_folder, folder_boxes=corpus_folder)
+        generator.generate_tracking_dataset(folder_images_output=datasets_folder + "Tracking/",
+                                            folder_grids_output=datasets_folder + "Tracking/",
+                                            number_of_images=args.number_of_images)
+        generator.generate_identification_dataset(folder_images_output=datasets_folder + "Identification/",
+                                                  number_of_images=args.number_of_images)
+    else:
+        datasets_folder = get_fixed_path(args.datasets_folder, replace_backslash=True, add_backslash=True)
+
+    inputs = {
+        "tracking": {
+            "generator": lambda: TrackingNetwork.generator(datasets_folder + "Tracking/", datasets_folder + "Tracking/", batch_size=args.batch_size),
+            "tf_data": lambda: iter(TrackingNetwork.dataset(datasets_folder + "Tracking/", datasets_folder + "Tracking/", batch_size=args.batch_size)),
+        },
+        "identification": {
+            "generator": lambda: IdentificationNetwork.generator(datasets_folder + "Identification/0/", batch_size=args.batch_size),
+            "tf_data": lambda: iter(IdentificationNetwork.dataset(datasets_folder + "Identification/0/", batch_size=args.batch_size)),
+            "in_memory": lambda: IdentificationNetwork.in_memory_generator(datasets_folder + "Identification/0/", batch_size=args.batch_size),
+        },
+    }
+
+    results = []
+    for name, inputs_of_network in inputs.items():
+        for input_name, get_input in inputs_of_network.items():
+            result = {"network": name, "input": input_name, "batch_size": args.batch_size,
+                      "batches_per_sec": time_batches(get_input(), args.batches)}
+
+            if args.train_steps > 0:
+                if name == "tracking":
+                    model = src.nets.generate_tracking_model(input_shape=(416, 416, 1), output_shape=(13, 13, 11), number_of_classes=6)
+                    loss_function = TrackingNetwork.loss_function
+                else:
+                    model = src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=9)
+                    loss_function = IdentificationNetwork.loss_function
+
+                result["train_steps_per_sec"] = time_train_steps(model, loss_function, get_input(), args.train_steps)
+
+            results.append(result)
+            print(", ".join(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}" for key, value in result.items()))
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+    temporary_folder.cleanup()
@@ -0,0 +1,20 @@
+if __name__ == "__main__":
+    import argparse
+    from src.GridBoxesUtil import GridBoxesUtil
+    from src.Util import get_fixed_path
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-i", "--input_folder", help="From where to load the text grids", type=str, required=True)
+    parser.add_argument("-o", "--output_folder", help="Where to save the binary grids", type=str, required=True)
+
+    parser.add_argument("-s", "--subdivisions", help="Subdivisions of the grids", type=int, required=False, default=13)
+
+    args = parser.parse_args()
+
+    input_folder = get_fixed_path(args.input_folder, replace_backslash=True, add_backslash=True)
+    output_folder = get_fixed_path(args.output_folder, replace_backslash=True, add_backslash=True)
+
+    GridBoxesUtil.text_files_to_binary_files(folder_grids_input=input_folder,
+                                             folder_grids_output=output_folder,
+                                             subdivisions=args.subdivisions)
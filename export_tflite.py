@@ -0,0 +1,95 @@
+if __name__ == "__main__":
+    import argparse
+    import json
+    import os
+    import numpy as np
+    from src.TFLiteModel import TFLiteModel
+    from src.Util import get_fixed_path
+    import tensorflow.keras.backend as K
+    import src.nets
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-m", "--models_folder", help="From where to load the models' weights", type=str, required=True)
+    parser.add_argument("-i", "--datasets_folder", help="Location of the \"Datasets\" folder, used for the calibration and the report", type=str, required=True)
+    parser.add_argument("-o", "--output_folder", help="Where to save the .tflite models and the report", type=str, required=True)
+
+    parser.add_argument("-nc", "--calibration_images", help="Images used to calibrate the quantization of each model", type=int, required=False, default=200)
+    parser.add_argument("-nr", "--report_images", help="Images (not used for the calibration) used for the accuracy report of each model", type=int, required=False, default=200)
+
+    parser.add_argument("-c", "--confidence", help="Confidence threshold used in the tracking report", type=float, required=False, default=0.75)
+    parser.add_argument("-t", "--threads", help="Threads used by the TFLite interpreter", type=int, required=False, default=None)
+    parser.add_argument("-nq", "--no_quantization", help="Export float models instead of int8 ones", action="store_true")
+
+    args = parser.parse_args()
+
+    models_folder = get_fixed_path(args.models_folder, replace_backslash=True, add_backslash=True)
+    datasets_folder = get_fixed_path(args.datasets_folder, replace_backslash=True, add_backslash=True)
+    output_folder = get_fixed_path(args.output_folder, replace_backslash=True, add_backslash=True)
+
+    os.makedirs(output_folder, exist_ok=True)
+
+    report = {}
+
+    ####################################################################################################################
+    # Tracking network
+    ####################################################################################################################
+    K.clear_session()
+
+    model = src.nets.generate_tracking_model(input_shape=(416, 416, 1), output_shape=(13, 13, 11), number_of_classes=6)
+    model.load_weights(models_folder + "tracking.h5")
+
+    images, __ = TFLiteModel.get_images_and_labels_from_folder(datasets_folder + "Tracking/", args.calibration_images + args.report_images)
+    images_calibration, images_report = images[:args.calibration_images], images[args.calibration_images:]
+
+    model_content = TFLiteModel.convert(model, images_calibration, quantize=not args.no_quantization)
+    TFLiteModel.to_file(model_content, output_folder + "tracking.tflite")
+
+    if len(images_report) > 0:
+        grids_float = model.predict(images_report, batch_size=None)
+        grids_tflite = TFLiteModel(model_content=model_content, number_of_threads=args.threads).predict(images_report)
+
+        objects_float = grids_float[..., 0] >= args.confidence
+        objects_tflite = grids_tflite[..., 0] >= args.confidence
+
+        report["tracking"] = {
+            "images": len(images_report),
+            "mean_absolute_error": float(np.mean(np.abs(grids_float - grids_tflite))),
+            "object_agreement": float(np.mean(objects_float == objects_tflite)),
+            "objects_float": int(np.sum(objects_float)),
+            "objects_tflite": int(np.sum(objects_tflite)),
+            "type_agreement": float(np.mean(np.argmax(grids_float[..., 5:], axis=-1)[objects_float] ==
+                                             np.argmax(grids_tflite[..., 5:], axis=-1)[objects_float])) if np.any(objects_float) else None,
+        }
+
+    ####################################################################################################################
+    # Identification network
+    ####################################################################################################################
+    for i, number_of_classes in enumerate((9, 4, 2, 2, 4, 2)):
+        K.clear_session()
+
+        model = src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=number_of_classes)
+        model.load_weights(models_folder + f"identification_{i}.h5")
+
+        images, labels = TFLiteModel.get_images_and_labels_from_folder(datasets_folder + f"Identification/{i}/", args.calibration_images + args.report_images)
+        images_calibration, images_report = images[:args.calibration_images], images[args.calibration_images:]
+        labels_report = np.array([int(x) for x in labels[args.calibration_images:]])
+
+        model_content = TFLiteModel.convert(model, images_calibration, quantize=not args.no_quantization)
+        TFLiteModel.to_file(model_content, output_folder + f"identification_{i}.tflite")
+
+        if len(images_report) > 0:
+            classes_float = np.argmax(model.predict(images_report, batch_size=None), axis=-1)
+            classes_tflite = np.argmax(TFLiteModel(model_content=model_content, number_of_threads=args.threads).predict(images_report), axis=-1)
+
+            report[f"identification_{i}"] = {
+                "images": len(images_report),
+                "agreement": float(np.mean(classes_float == classes_tflite)),
+                "accuracy_float": float(np.mean(classes_float == labels_report)),
+                "accuracy_tflite": float(np.mean(classes_tflite == labels_report)),
+            }
+
+    with open(output_folder + "tflite_report.json", "w") as f:
+        json.dump(report, f, indent=4)
+
+    print(json.dumps(report, indent=4))
@@ -1,6 +1,9 @@
 if __name__ == "__main__":
     import argparse
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    from contextlib import nullcontext
     from src.DatasetGenerator import DatasetGenerator
+    from src.ShardWriter import ShardWriter
     from src.Util import get_fixed_path
 
     parser = argparse.ArgumentParser()
@@ -10,17 +13,66 @@ if __name__ == "__main__":
 
     parser.add_argument("-n", "--number_of_images", help="How many inputs to generate for each dataset", type=int, required=True)
 
+    parser.add_argument("-ge", "--grid_ext", help="Extension of the tracking grids, \".grid\" for binary grids or \".txt\" for text grids", type=str,
+                        required=False, default=".grid")
+
+    parser.add_argument("-sh", "--sharded", help="Pack each dataset in a few large shard files with an index instead of one file for each sample",
+                        action="store_true")
+    parser.add_argument("-ss", "--shard_size", help="Size in MB of each shard", type=int, required=False, default=256)
+
+    parser.add_argument("-w", "--workers", help="Processes that generate the datasets, all three at the same time if more than one", type=int,
+                        required=False, default=1)
+    parser.add_argument("-s", "--seed", help="Seed of the datasets, the same seed gives the same datasets for any number of workers", type=int,
+                        required=False, default=None)
+
+    parser.add_argument("-cmb", "--cache_mb", help="MB of decoded source images kept in memory by each process, 0 to disable", type=int,
+                        required=False, default=256)
+
     args = parser.parse_args()
 
     input_folder = get_fixed_path(args.input_folder, replace_backslash=True, add_backslash=True)
     output_folder = get_fixed_path(args.output_folder, replace_backslash=True, add_backslash=True)
 
-    gen = DatasetGenerator(folder_images=input_folder, folder_boxes=input_folder)
+    gen = DatasetGenerator(folder_images=input_folder, folder_boxes=input_folder, cache_bytes=args.cache_mb * 1024 * 1024)
+
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+
+    def generate_pre_tracking_dataset():
+        with ShardWriter(output_folder + "PreTracking/", shard_size=args.shard_size * 1024 * 1024) if args.sharded else nullcontext() as shard_writer:
+            gen.generate_pre_tracking_dataset(folder_images_output=output_folder + "PreTracking/",
+                                              number_of_images=args.number_of_images,
+                                              shard_writer=shard_writer,
+                                              seed=args.seed,
+                                              executor=executor)
+
+    def generate_tracking_dataset():
+        with ShardWriter(output_folder + "Tracking/", shard_size=args.shard_size * 1024 * 1024) if args.sharded else nullcontext() as shard_writer:
+            gen.generate_tracking_dataset(folder_images_output=output_folder + "Tracking/",
+                                          folder_grids_output=output_folder + "Tracking/",
+                                          number_of_images=args.number_of_images,
+                                          grid_ext=args.grid_ext,
+                                          shard_writer=shard_writer,
+                                          seed=args.seed,
+                                          executor=executor)
+
+    def generate_identification_dataset():
+        with ShardWriter(output_folder + "Identification/", shard_size=args.shard_size * 1024 * 1024) if args.sharded else nullcontext() as shard_writer:
+            gen.generate_identification_dataset(folder_images_output=output_folder + "Identification/",
+                                                number_of_images=args.number_of_images,
+                                                shard_writer=shard_writer,
+                                                seed=args.seed,
+                                                executor=executor)
+
+    generate_functions = (generate_pre_tracking_dataset, generate_tracking_dataset, generate_identification_dataset)
+
+    if executor is None:
+        for generate_function in generate_functions:
+            generate_function()
+    else:
+        #The three datasets share the processes, each one is fed with chunks by its own thread
+        with executor, ThreadPoolExecutor(max_workers=len(generate_functions)) as threads:
+            for future in [threads.submit(generate_function) for generate_function in generate_functions]:
+                future.result()
 
-    gen.generate_pre_tracking_dataset(folder_images_output=output_folder + "PreTracking/",
-                                      number_of_images=args.number_of_images)
-    gen.generate_tracking_dataset(folder_images_output=output_folder + "Tracking/",
-                                  folder_grids_output=output_folder + "Tracking/",
-                                  number_of_images=args.number_of_images)
-    gen.generate_identification_dataset(folder_images_output=output_folder + "Identification/",
-                                        number_of_images=args.number_of_images)
+    if executor is None and gen.get_cache() is not None:
+        print("Source cache:", gen.get_cache().get_stats())
@@ -3,8 +3,9 @@ if __name__ == "__main__":
     import os
     from src.IdentificationNetwork import IdentificationNetwork
     from src.TrackingNetwork import TrackingNetwork
+    from src.TFLiteModel import TFLiteModel
     from src.AugmentedImagesUtil import AugmentedImagesUtil
-    from src.LTSpiceGrid import LTSpiceGrid
+    from src.LTSpicePipeline import LTSpicePipeline
     from src.Util import get_fixed_path
     import tensorflow.keras.backend as K
     import src.nets
@@ -16,6 +17,18 @@ if __name__ == "__main__":
     parser.add_argument("-m", "--models_folder", help="From where to load the models' weights", type=str, required=True)
 
     parser.add_argument("-c", "--confidence", help="Confidence threshold for the prediction", type=float, required=False, default=0.75)
+    parser.add_argument("-mh", "--multi_head", help="Use the identification model with one shared body and one head for each type",
+                        action="store_true")
+    parser.add_argument("-tfl", "--tflite", help="Use the .tflite models made by export_tflite.py", action="store_true")
+    parser.add_argument("-t", "--threads", help="Threads used by the TFLite interpreter", type=int, required=False, default=None)
+    parser.add_argument("-nco", "--no_compile", help="Use keras' predict instead of the compiled tf.function", action="store_true")
+    parser.add_argument("-xla", "--xla", help="Compile the tf.function with XLA", action="store_true")
+    parser.add_argument("-bs", "--batch_size", help="How many images to send to the tracking network at once", type=int, required=False, default=1)
+
+    parser.add_argument("-p", "--pipelined", help="Overlap the decode of the images, the inference and the writes", action="store_true")
+    parser.add_argument("-dw", "--decode_workers", help="Threads that decode the images when pipelined", type=int, required=False, default=4)
+    parser.add_argument("-ww", "--write_workers", help="Threads that write the .asc files when pipelined", type=int, required=False, default=4)
+    parser.add_argument("-qs", "--queue_size", help="Max images waiting for each stage when pipelined", type=int, required=False, default=64)
 
     args = parser.parse_args()
 
@@ -28,40 +41,78 @@ if __name__ == "__main__":
     ####################################################################################################################
     K.clear_session()
 
-    net_tracking = TrackingNetwork(src.nets.generate_tracking_model(input_shape=(416, 416, 1),
-                                                                    output_shape=(13, 13, 11),
-                                                                    number_of_classes=6))
-    net_tracking.load_weights(models_folder + "tracking.h5")
+    if args.tflite:
+        net_tracking = TrackingNetwork(TFLiteModel.from_file(models_folder + "tracking.tflite", number_of_threads=args.threads))
+    else:
+        net_tracking = TrackingNetwork(src.nets.generate_tracking_model(input_shape=(416, 416, 1),
+                                                                        output_shape=(13, 13, 11),
+                                                                        number_of_classes=6))
+        net_tracking.load_weights(models_folder + "tracking.h5")
 
     ####################################################################################################################
     # Identification network
     ####################################################################################################################
 
-    net_identification = IdentificationNetwork(models=(
-        src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=9),
-        src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=4),
-        src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=2),
-        src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=2),
-        src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=4),
-        src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=2)
-    ))
+    if args.tflite:
+        assert not args.multi_head, "The multi head model cannot be used with TFLite..."
+
+        net_identification = IdentificationNetwork(models=tuple(
+            TFLiteModel.from_file(models_folder + f"identification_{i}.tflite", number_of_threads=args.threads) for i in range(6)
+        ))
+    elif args.multi_head:
+        net_identification = IdentificationNetwork(multi_head_model=src.nets.generate_multi_head_identification_model(
+            numbers_of_classes=(9, 4, 2, 2, 4, 2),
+            input_shape=(50, 50, 1)
+        ))
+
+        #The weights of the single models are only a starting point for train.py, their heads never saw the shared body
+        if not os.path.isfile(models_folder + "identification_multi_head.h5"):
+            raise FileNotFoundError(f"{models_folder}identification_multi_head.h5 not found, train the multi head model with "
+                                    "train.py --identification_multi_head or use the single models without --multi_head...")
+
+        net_identification.load_multi_head_weights(models_folder + "identification_multi_head.h5")
+    else:
+        net_identification = IdentificationNetwork(models=(
+            src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=9),
+            src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=4),
+            src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=2),
+            src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=2),
+            src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=4),
+            src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=2)
+        ))
+
+        net_identification.load_all_weights(models_folder + "identification.h5", number_of_models=6)
 
-    net_identification.load_all_weights(models_folder + "identification.h5", number_of_models=6)
+    if not args.tflite and not args.no_compile:
+        net_tracking.compile_predict(jit_compile=args.xla, warm_up_batch_sizes=(args.batch_size,))
+        net_identification.compile_predict(jit_compile=args.xla, warm_up_batch_sizes=(1,))
 
     ####################################################################################################################
     # Prediction
     ####################################################################################################################
+    pipeline = LTSpicePipeline(net_tracking, net_identification,
+                               confidence=args.confidence,
+                               number_of_models=6,
+                               image_input_size=(50, 50),
+                               subdivisions=13)
+
     image_file_names = AugmentedImagesUtil.get_images_file_names_from_folder(input_folder, image_exts=(".jpg", ".png"))
 
-    for image_file_name in image_file_names:
-        boxes_tracking = net_tracking.predict_boxes_from_file(input_folder + image_file_name, confidence=args.confidence)
-
-        boxes_identification = net_identification.predict_boxes_from_file_and_tracking_output(image_path=input_folder + image_file_name,
-                                                                                              boxes=boxes_tracking,
-                                                                                              number_of_models=6,
-                                                                                              image_input_size=(50, 50))
-        ltspice = LTSpiceGrid.from_file_and_boxes(image_path=input_folder + image_file_name,
-                                                  boxes=boxes_identification,
-                                                  subdivisions=13)
-        os.makedirs(output_folder, exist_ok=True)
-        ltspice.to_file(output_folder + image_file_name.split(".")[0] + ".asc")
+    os.makedirs(output_folder, exist_ok=True)
+
+    if args.pipelined:
+        for output_path in pipeline.predict_files_to_files([input_folder + x for x in image_file_names],
+                                                           [output_folder + x.split(".")[0] + ".asc" for x in image_file_names],
+                                                           batch_size=args.batch_size,
+                                                           decode_workers=args.decode_workers,
+                                                           write_workers=args.write_workers,
+                                                           queue_size=args.queue_size):
+            pass
+    else:
+        for batch_start in range(0, len(image_file_names), args.batch_size):
+            batch_file_names = image_file_names[batch_start:batch_start + args.batch_size]
+
+            ltspice_strings = pipeline.predict_strings_from_files([input_folder + x for x in batch_file_names])
+
+            for image_file_name, ltspice_string in zip(batch_file_names, ltspice_strings):
+                LTSpicePipeline.string_to_file(ltspice_string, output_folder + image_file_name.split(".")[0] + ".asc")
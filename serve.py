@@ -0,0 +1,103 @@
+if __name__ == "__main__":
+    import argparse
+    import os
+    from src.IdentificationNetwork import IdentificationNetwork
+    from src.TrackingNetwork import TrackingNetwork
+    from src.TFLiteModel import TFLiteModel
+    from src.LTSpicePipeline import LTSpicePipeline
+    from src.LTSpiceServer import LTSpiceServer
+    from src.Util import get_fixed_path
+    import tensorflow.keras.backend as K
+    import src.nets
+
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("-m", "--models_folder", help="From where to load the models' weights", type=str, required=True)
+
+    parser.add_argument("-c", "--confidence", help="Confidence threshold for the prediction", type=float, required=False, default=0.75)
+    parser.add_argument("-mh", "--multi_head", help="Use the identification model with one shared body and one head for each type",
+                        action="store_true")
+    parser.add_argument("-tfl", "--tflite", help="Use the .tflite models made by export_tflite.py", action="store_true")
+    parser.add_argument("-t", "--threads", help="Threads used by the TFLite interpreter", type=int, required=False, default=None)
+    parser.add_argument("-nco", "--no_compile", help="Use keras' predict instead of the compiled tf.function", action="store_true")
+    parser.add_argument("-xla", "--xla", help="Compile the tf.function with XLA", action="store_true")
+
+    parser.add_argument("-ho", "--host", help="Host to listen on", type=str, required=False, default="127.0.0.1")
+    parser.add_argument("-p", "--port", help="Port to listen on", type=int, required=False, default=8080)
+    parser.add_argument("-s", "--socket", help="If given, listen on this Unix socket instead of host:port", type=str, required=False, default=None)
+
+    parser.add_argument("-bs", "--max_batch_size", help="Max number of images in a micro-batch", type=int, required=False, default=8)
+    parser.add_argument("-mw", "--max_wait_ms", help="Max milliseconds to wait for a micro-batch to fill up", type=float, required=False, default=10.0)
+
+    args = parser.parse_args()
+
+    models_folder = get_fixed_path(args.models_folder, replace_backslash=True, add_backslash=True)
+
+    ####################################################################################################################
+    # Tracking network
+    ####################################################################################################################
+    K.clear_session()
+
+    if args.tflite:
+        net_tracking = TrackingNetwork(TFLiteModel.from_file(models_folder + "tracking.tflite", number_of_threads=args.threads))
+    else:
+        net_tracking = TrackingNetwork(src.nets.generate_tracking_model(input_shape=(416, 416, 1),
+                                                                        output_shape=(13, 13, 11),
+                                                                        number_of_classes=6))
+        net_tracking.load_weights(models_folder + "tracking.h5")
+
+    ####################################################################################################################
+    # Identification network
+    ####################################################################################################################
+
+    if args.tflite:
+        assert not args.multi_head, "The multi head model cannot be used with TFLite..."
+
+        net_identification = IdentificationNetwork(models=tuple(
+            TFLiteModel.from_file(models_folder + f"identification_{i}.tflite", number_of_threads=args.threads) for i in range(6)
+        ))
+    elif args.multi_head:
+        net_identification = IdentificationNetwork(multi_head_model=src.nets.generate_multi_head_identification_model(
+            numbers_of_classes=(9, 4, 2, 2, 4, 2),
+            input_shape=(50, 50, 1)
+        ))
+
+        #The weights of the single models are only a starting point for train.py, their heads never saw the shared body
+        if not os.path.isfile(models_folder + "identification_multi_head.h5"):
+            raise FileNotFoundError(f"{models_folder}identification_multi_head.h5 not found, train the multi head model with "
+                                    "train.py --identification_multi_head or serve the single models without --multi_head...")
+
+        net_identification.load_multi_head_weights(models_folder + "identification_multi_head.h5")
+    else:
+        net_identification = IdentificationNetwork(models=(
+            src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=9),
+            src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=4),
+            src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=2),
+            src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=2),
+            src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=4),
+            src.nets.generate_identification_model(input_shape=(50, 50, 1), number_of_classes=2)
+        ))
+
+        net_identification.load_all_weights(models_folder + "identification.h5", number_of_models=6)
+
+    if not args.tflite and not args.no_compile:
+        net_tracking.compile_predict(jit_compile=args.xla, warm_up_batch_sizes=tuple(sorted({1, args.max_batch_size})))
+        net_identification.compile_predict(jit_compile=args.xla, warm_up_batch_sizes=(1,))
+
+    ####################################################################################################################
+    # Server
+    ####################################################################################################################
+    pipeline = LTSpicePipeline(net_tracking, net_identification,
+                               confidence=args.confidence,
+                               number_of_models=6,
+                               image_input_size=(50, 50),
+                               subdivisions=13)
+
+    server = LTSpiceServer(pipeline, max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000.0)
+
+    if args.socket is not None:
+        print(f"Listening on {args.socket}")
+        server.serve_unix(args.socket)
+    else:
+        print(f"Listening on http://{args.host}:{args.port}")
+        server.serve_http(args.host, args.port)
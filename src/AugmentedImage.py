@@ -36,11 +36,30 @@ class AugmentedImage:
         return image
 
     @staticmethod
-    def from_files(image_path, box_path, grayscale=True):
-        """Generate an augmented image and boxes from file"""
+    def image_from_bytes(image_bytes, grayscale=True):
+        """Returns the cv2 image decoded from the bytes of an encoded image (ex. the content of a .png or .jpg file)"""
+        import numpy as np
+        import cv2
+
+        image_buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+
+        if grayscale:
+            image = cv2.imdecode(image_buffer, 0)
+        else:
+            image = cv2.imdecode(image_buffer, cv2.IMREAD_COLOR)
+        return image
+
+    @staticmethod
+    def from_files(image_path, box_path, grayscale=True, cache=None):
+        """Generate an augmented image and boxes from file, or from copies of the ones in a SourceCache if given"""
         from src.Boxes import Boxes
+
+        if cache is not None:
+            return AugmentedImage(*cache.get(image_path, box_path, grayscale))
+
         image = AugmentedImage.image_from_file(image_path, grayscale)
-        boxes = Boxes.from_files(image_path, box_path, augmented=True)
+        #The image is already decoded, so its size is taken from it
+        boxes = Boxes.from_file(box_path, AugmentedImage.get_image_width(image), AugmentedImage.get_image_height(image))
         return AugmentedImage(image, boxes)
 
     def zoom_image(self, factor):
@@ -140,6 +159,62 @@ class AugmentedImage:
         #Rotate the image by rad
         self.__image = imutils.rotate(self.__image, angle=degrees(rad))
 
+    def transform_image(self, rad=0.0, factor=1.0, flip_vertically=False, flip_horizontally=False):
+        """Same as rotate_image(rad), zoom_image(factor), flip_image_vertically() and flip_image_horizontally() (if
+        True) in this order, but the four are composed in one affine matrix and the image is resampled only once.
+        The boxes get the same centers, sizes and box classes they would get from the four calls"""
+
+        import numpy as np
+        import cv2
+        from src.AugmentedBox import AugmentedBox
+        from src.CircuitObject import CircuitObject
+
+        assert factor > 0.0, "Zoom factor should not be negative or zero..."
+        assert not self.__is_rotated, "The image has already been rotated once, a second rotation may lead to unexpected behaviors"
+
+        image_width = AugmentedImage.get_image_width(self.__image)
+        image_height = AugmentedImage.get_image_height(self.__image)
+        center_x = image_width / 2
+        center_y = image_height / 2
+
+        def around_center(linear):
+            """Returns the 3x3 matrix that applies a 2x2 linear transformation around the center of the image"""
+            matrix = np.eye(3)
+            matrix[:2, :2] = linear
+            matrix[:2, 2] = (center_x, center_y) - linear @ (center_x, center_y)
+            return matrix
+
+        rotation = np.array([[np.cos(rad), np.sin(rad)],
+                             [-np.sin(rad), np.cos(rad)]])
+
+        #As in rotate_image, the image is zoomed out before the rotation so that no information is lost
+        zoom_factor = 1.0
+        if rad != 0.0:
+            rotated_width, rotated_height = AugmentedBox.get_box_size_after_rotation_from_size(image_width, image_height, rad)
+            zoom_factor = max(image_width / rotated_width, image_height / rotated_height)
+
+        matrix = around_center(np.eye(2) * zoom_factor)
+        matrix = around_center(rotation) @ matrix
+        matrix = around_center(np.eye(2) * factor) @ matrix
+        if flip_vertically:
+            matrix = around_center(np.diag((1.0, -1.0))) @ matrix
+        if flip_horizontally:
+            matrix = around_center(np.diag((-1.0, 1.0))) @ matrix
+
+        #The boxes use continuous coordinates while cv2 puts the center of the pixel i at i, not at i + 0.5
+        to_pixels = np.eye(3)
+        to_pixels[:2, 2] = -0.5
+        matrix_pixels = to_pixels @ matrix @ np.linalg.inv(to_pixels)
+
+        self.__image = cv2.warpAffine(self.__image, matrix_pixels[:2], (image_width, image_height), flags=cv2.INTER_LINEAR,
+                                      borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+        #The box sizes are only changed by the rotation, as in rotate_image and zoom_image
+        box_class_lookup = CircuitObject.get_box_class_lookup(CircuitObject.get_rotation_step(rad) if rad != 0.0 else 0, flip_vertically, flip_horizontally)
+        self.__boxes.transform_boxes(matrix[:2], rotation, box_class_lookup)
+
+        self.__is_rotated = rad != 0.0
+
     def flip_image_horizontally(self):
         """Flip image and boxes horizontally"""
 
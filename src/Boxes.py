@@ -1,123 +1,200 @@
 class Boxes:
-    """Class that collects Box or AugmentedBox that lets you call functions on all its collected elemets"""
+    """Class that collects boxes as a structure of arrays (box classes, x, y, width, height, with x and y centered)
+    and lets you call functions on all of them at once"""
 
-    def __init__(self):
-        self.__boxes = []
+    def __init__(self, box_classes=(), xs=(), ys=(), widths=(), heights=()):
+        import numpy as np
+
+        self.__box_classes = np.array(box_classes, dtype=np.int64).reshape(-1)
+        self.__xs = np.array(xs, dtype=np.float64).reshape(-1)
+        self.__ys = np.array(ys, dtype=np.float64).reshape(-1)
+        self.__widths = np.array(widths, dtype=np.float64).reshape(-1)
+        self.__heights = np.array(heights, dtype=np.float64).reshape(-1)
+
+        assert len(self.__box_classes) == len(self.__xs) == len(self.__ys) == len(self.__widths) == len(self.__heights), "The arrays of the boxes have different lengths..."
+
+    def __len__(self):
+        return len(self.__box_classes)
 
     def add_box(self, box):
-        self.__boxes.append(box)
+        """Appends a Box (or AugmentedBox), prefer building Boxes from arrays when adding many boxes"""
+        import numpy as np
+
+        box_class, x, y, width, height = box.get_box_data()
+
+        self.__box_classes = np.append(self.__box_classes, box_class)
+        self.__xs = np.append(self.__xs, x)
+        self.__ys = np.append(self.__ys, y)
+        self.__widths = np.append(self.__widths, width)
+        self.__heights = np.append(self.__heights, height)
+
+    def get_boxes_data(self):
+        """Returns the arrays (box_classes, xs, ys, widths, heights) where x and y are centered, they are not copies"""
+        return self.__box_classes, self.__xs, self.__ys, self.__widths, self.__heights
+
+    def get_boxes(self, augmented=True):
+        """Returns a list of AugmentedBox (or Box if augmented is False), one for each box"""
+        from src.AugmentedBox import AugmentedBox
+        from src.Box import Box
+
+        box_type = AugmentedBox if augmented else Box
+        return [box_type(*box_data) for box_data in zip(*[x.tolist() for x in self.get_boxes_data()])]
+
+    def copy(self):
+        return Boxes(*[x.copy() for x in self.get_boxes_data()])
 
     def get_box_classes(self):
         """Retuns a list of all box classes"""
-        box_classes = []
-        for box in self.__boxes:
-            box_classes.append(box.get_box_class())
-        return box_classes
+        return self.__box_classes.tolist()
 
     def get_box_centers(self):
         """Retuns a list of all box centers"""
-        centers = []
-        for box in self.__boxes:
-            centers.append((box.get_x(), box.get_y()))
-        return centers
+        return list(zip(self.__xs.tolist(), self.__ys.tolist()))
 
     def get_box_sizes(self):
         """Retuns a list of all box sizes"""
-        sizes = []
-        for box in self.__boxes:
-            sizes.append((box.get_width(), box.get_height()))
-        return sizes
+        return list(zip(self.__widths.tolist(), self.__heights.tolist()))
 
     def rotate_boxes_around_a_point(self, x, y, rad):
-        from src.AugmentedBox import AugmentedBox
+        """Rotates the boxes around a point by rad, their sizes become the ones of their bounding boxes after the
+        rotation and their box classes are changed if needed (see AugmentedBox.rotate_box_around_a_point)"""
+        import math
+        from src.CircuitObject import CircuitObject
 
-        for box in self.__boxes:
-            assert isinstance(box, AugmentedBox), "Rotation on a Box cannot be done...Convert it to AugmentedBox?"
-            box.rotate_box_around_a_point(x, y, rad)
+        box_class_lookup = CircuitObject.get_box_class_lookup(rotation_step=CircuitObject.get_rotation_step(rad))
 
-    def zoom_boxes_around_a_point(self, x, y, factor):
-        from src.AugmentedBox import AugmentedBox
+        cos = math.cos(-rad)
+        sin = math.sin(-rad)
+
+        x_distances = self.__xs - x
+        y_distances = self.__ys - y
 
-        for box in self.__boxes:
-            assert isinstance(box, AugmentedBox), "Zoom on a Box cannot be done...Convert it to AugmentedBox?"
-            box.zoom_box_around_a_point(x, y, factor)
+        self.__box_classes = box_class_lookup[self.__box_classes]
+        self.__xs = x + cos * x_distances - sin * y_distances
+        self.__ys = y + sin * x_distances + cos * y_distances
+        self.__widths, self.__heights = (self.__widths * abs(math.cos(rad)) + self.__heights * abs(math.sin(rad)),
+                                         self.__widths * abs(math.sin(rad)) + self.__heights * abs(math.cos(rad)))
+
+    def zoom_boxes_around_a_point(self, x, y, factor):
+        """Zoom the box centers by a factor around a point, ex. 1.5 => 150%"""
+        self.__xs = x - (x - self.__xs) * factor
+        self.__ys = y - (y - self.__ys) * factor
 
     def flip_boxes_around_axis_vertically(self, y):
-        from src.AugmentedBox import AugmentedBox
+        """Flip the boxes around an axis vertically, changing their box classes if needed"""
+        from src.CircuitObject import CircuitObject
 
-        for box in self.__boxes:
-            assert isinstance(box, AugmentedBox), "Flip on a Box cannot be done...Convert it to AugmentedBox?"
-            box.flip_box_around_axis_vertically(y)
+        self.__ys = y + (y - self.__ys)
+        self.__box_classes = CircuitObject.get_box_class_lookup(flip_vertically=True)[self.__box_classes]
 
     def flip_boxes_around_axis_horizontally(self, x):
-        from src.AugmentedBox import AugmentedBox
+        """Flip the boxes around an axis horizontally, changing their box classes if needed"""
+        from src.CircuitObject import CircuitObject
 
-        for box in self.__boxes:
-            assert isinstance(box, AugmentedBox), "Flip on a Box cannot be done...Convert it to AugmentedBox?"
-            box.flip_box_around_axis_horizontally(x)
+        self.__xs = x + (x - self.__xs)
+        self.__box_classes = CircuitObject.get_box_class_lookup(flip_horizontally=True)[self.__box_classes]
 
-    def convert_boxes_to_augmented(self):
-        from src.AugmentedBox import AugmentedBox
+    def transform_boxes(self, matrix, size_matrix, box_class_lookup):
+        """Moves the centers of all the boxes with a 2x3 affine matrix, sets their sizes to abs(size_matrix) @ sizes
+        and remaps their box classes with a lookup array (see CircuitObject.get_box_class_lookup), all at once"""
+        import numpy as np
+
+        centers = np.stack((self.__xs, self.__ys), axis=-1) @ matrix[:, :2].T + matrix[:, 2]
+        sizes = np.stack((self.__widths, self.__heights), axis=-1) @ np.abs(size_matrix).T
 
-        for i in range(len(self.__boxes)):
-            self.__boxes[i] = AugmentedBox.from_box(self.__boxes[i])
+        self.__box_classes = box_class_lookup[self.__box_classes]
+        self.__xs, self.__ys = centers[:, 0], centers[:, 1]
+        self.__widths, self.__heights = sizes[:, 0], sizes[:, 1]
+
+    def convert_boxes_to_augmented(self):
+        """Kept for compatibility, every Boxes can be augmented"""
+        pass
 
     def get_topleft_boxes_data(self):
-        boxes_data = []
-        for box in self.__boxes:
-            boxes_data.append(box.get_topleft_box_data())
-        return boxes_data
+        """Returns a list of tuples (box_class, x, y, width, height) where x and y are topleft centered"""
+        return list(zip(self.__box_classes.tolist(),
+                        (self.__xs - self.__widths / 2).tolist(),
+                        (self.__ys - self.__heights / 2).tolist(),
+                        self.__widths.tolist(),
+                        self.__heights.tolist()))
 
     def to_string(self, image_width, image_height):
         """Returns a string containing all the to_string of its boxes"""
-        to_string = ""
-        for box in self.__boxes:
-            to_string += box.to_string(image_width, image_height) + "\n"
-        return to_string
+        return "".join(x + "\n" for x in self.to_strings(image_width, image_height))
 
     def to_strings(self, image_width, image_height):
-        """Returns a collection of to_string from its boxes"""
-        to_strings = []
-        for box in self.__boxes:
-            to_strings.append(box.to_string(image_width, image_height))
-        return to_strings
+        """Returns a collection of to_string from its boxes, the YOLO formatted strings"""
+        return [f"{box_class} {x} {y} {width} {height}"
+                for box_class, x, y, width, height in zip(self.__box_classes.tolist(),
+                                                          (self.__xs / image_width).tolist(),
+                                                          (self.__ys / image_height).tolist(),
+                                                          (self.__widths / image_width).tolist(),
+                                                          (self.__heights / image_height).tolist())]
 
     @staticmethod
-    def from_files(image_path, box_path, augmented=True):
-        import cv2
-        from src.AugmentedBox import AugmentedBox
-        from src.Box import Box
+    def from_string(boxes_string, image_width, image_height):
+        """Returns the Boxes of the YOLO formatted lines of a string, parsed all at once"""
+        import numpy as np
 
-        boxes = Boxes()
+        boxes_data = np.array(boxes_string.split(), dtype=np.float64).reshape((-1, 5))
 
-        image = cv2.imread(image_path)
-        image_height, image_width = image.shape[0:2]
+        return Boxes(boxes_data[:, 0].astype(np.int64),
+                     boxes_data[:, 1] * image_width,
+                     boxes_data[:, 2] * image_height,
+                     boxes_data[:, 3] * image_width,
+                     boxes_data[:, 4] * image_height)
 
+    @staticmethod
+    def from_file(box_path, image_width, image_height):
+        """Returns the Boxes of a YOLO formatted file, for an image of known size"""
         with open(box_path, "r") as f:
-            box_strings = f.readlines()
+            return Boxes.from_string(f.read(), image_width, image_height)
 
-            for box_string in box_strings:
-                if augmented:
-                    boxes.add_box(AugmentedBox.from_string(box_string, image_width, image_height))
-                else:
-                    boxes.add_box(Box.from_string(box_string, image_width, image_height))
-        return boxes
+    @staticmethod
+    def from_files(image_path, box_path, augmented=True):
+        """Returns the Boxes of a YOLO formatted file, the size of the image is read from its header (see
+        ImageHeaderUtil), augmented is kept for compatibility as every Boxes can be augmented"""
+        from src.ImageHeaderUtil import ImageHeaderUtil
+
+        image_width, image_height = ImageHeaderUtil.get_image_size(image_path)
+        return Boxes.from_file(box_path, image_width, image_height)
+
+    @staticmethod
+    def from_boxes(boxes):
+        """Returns the Boxes of a list of Box (or AugmentedBox)"""
+        boxes_data = [box.get_box_data() for box in boxes]
+        return Boxes(*zip(*boxes_data)) if len(boxes_data) > 0 else Boxes()
+
+    @staticmethod
+    def batch_from_boxes_data(boxes_data, number_of_boxes):
+        """Returns a list of number_of_boxes Boxes from the arrays (indices, box_classes, xs, ys, widths, heights),
+        where indices is the Boxes that gets each box"""
+        import numpy as np
+
+        indices = np.asarray(boxes_data[0])
+        order = np.argsort(indices, kind="stable")
+        splits = np.searchsorted(indices[order], np.arange(1, number_of_boxes))
+
+        arrays_of_boxes = [np.split(np.asarray(x)[order], splits) for x in boxes_data[1:]]
+        return [Boxes(*arrays) for arrays in zip(*arrays_of_boxes)]
 
     def clean_boxes(self, iou_threshold=0.2):
         from src.Box import Box
 
+        boxes = self.get_boxes(augmented=False)
+
         to_remove = []
 
-        for i in range(0, len(self.__boxes)):
-            for j in range(i+1, len(self.__boxes)-1):
+        for i in range(0, len(boxes)):
+            for j in range(i+1, len(boxes)-1):
 
-                box_first = self.__boxes[i]
-                box_second = self.__boxes[j]
+                box_first = boxes[i]
+                box_second = boxes[j]
 
                 if box_first.get_box_class() == box_second.get_box_class():
 
                     if Box.get_iou(box_first, box_second) > iou_threshold:
-                        self.add_box(Box.get_encompassing_box(box_first, box_second))
+                        boxes.append(Box.get_encompassing_box(box_first, box_second))
 
                         if box_first not in to_remove:
                             to_remove.append(box_first)
@@ -125,5 +202,7 @@ class Boxes:
                             to_remove.append(box_second)
 
         for box in to_remove:
-            self.__boxes.remove(box)
+            boxes.remove(box)
+
+        self.__box_classes, self.__xs, self.__ys, self.__widths, self.__heights = Boxes.from_boxes(boxes).get_boxes_data()
         return self
@@ -5,6 +5,8 @@ class CircuitObject:
     SOMETHING = 24
     NUMBER_OF_CLASSES = 6
 
+    __box_class_lookups = {}
+
     def __init__(self, box_class):
         self.__box_class = box_class
 
@@ -109,12 +111,17 @@ class CircuitObject:
         couple_np = np.array(couple)
 
         #Get the index of the value
-        value_index = np.where(couple_np==value)[0]
+        value_index = np.where(couple_np==value)[0][0]
 
         return couple[int((value_index + step) % len(couple))]
 
     def rotate(self, rad):
         """Rotates the object by rad, changing, if needed, its box class"""
+        self.rotate_by_step(CircuitObject.get_rotation_step(rad))
+
+    @staticmethod
+    def get_rotation_step(rad):
+        """Returns the number of quarter turns used to get the correct box class after a rotation by rad"""
 
         import math
 
@@ -129,7 +136,30 @@ class CircuitObject:
             step = 2
         elif (rad > math.pi * (5/4) and rad < math.pi * (7 / 4)):
             step = 3
+        return step
+
+    @staticmethod
+    def get_box_class_lookup(rotation_step=0, flip_vertically=False, flip_horizontally=False):
+        """Returns an array that maps every box class to its box class after a rotation by rotation_step quarter turns
+        followed by the given flips, ex. lookup[box_classes] remaps all the classes at once"""
+        import numpy as np
 
+        key = (rotation_step, flip_vertically, flip_horizontally)
+        if key not in CircuitObject.__box_class_lookups:
+            box_classes = []
+            for box_class in range(CircuitObject.SOMETHING + 1):
+                circuit_object = CircuitObject(box_class)
+                circuit_object.rotate_by_step(rotation_step)
+                if flip_vertically:
+                    circuit_object.flip_vertically()
+                if flip_horizontally:
+                    circuit_object.flip_horizontally()
+                box_classes.append(circuit_object.get_box_class())
+            CircuitObject.__box_class_lookups[key] = np.array(box_classes, dtype=np.int64)
+        return CircuitObject.__box_class_lookups[key]
+
+    def rotate_by_step(self, step):
+        """Rotates the object by a number of quarter turns, changing, if needed, its box class"""
         couples = ((0, 1, 2, 3),
                    (4, 7, 5, 6),
                    (9, 10, 11, 12),
@@ -0,0 +1,60 @@
+class CompiledModel:
+    """Class that runs a keras model through a tf.function with a fixed input signature (any batch size),
+    avoiding the per-call overhead of keras' predict. It has the same predict of a keras model, so that it can be
+    used by TrackingNetwork and IdentificationNetwork in place of their keras models.
+    With jit_compile the function is compiled by XLA, which compiles once for each batch shape, therefore the
+    batches are padded to the next power of 2 to bound the number of compilations"""
+
+    def __init__(self, model, jit_compile=False):
+        import tensorflow as tf
+
+        self.__model = model
+        self.__jit_compile = jit_compile
+
+        input_signature = [tf.TensorSpec(shape=(None,) + tuple(model.input_shape[1:]), dtype=tf.float32)]
+
+        #A local name, autograph does not support the mangled names of the attributes
+        self.__function = tf.function(lambda x: model(x, training=False),
+                                      input_signature=input_signature,
+                                      jit_compile=jit_compile)
+
+    def get_model(self):
+        return self.__model
+
+    def predict(self, batch_x, batch_size=None):
+        """Returns the output of the model for the whole batch, like keras' predict"""
+        import numpy as np
+
+        number_of_inputs = batch_x.shape[0]
+        batch_x = batch_x.astype(np.float32)
+
+        if self.__jit_compile:
+            batch_x = CompiledModel.__pad_batch(batch_x)
+
+        outputs = self.__function(batch_x)
+
+        if isinstance(outputs, (list, tuple)):
+            return [output.numpy()[:number_of_inputs] for output in outputs]
+        return outputs.numpy()[:number_of_inputs]
+
+    def warm_up(self, batch_sizes=(1,)):
+        """Runs the function once for each batch size, so that the tracing (and the XLA compilation) is not paid
+        by the first real call"""
+        import numpy as np
+
+        for batch_size in batch_sizes:
+            self.predict(np.zeros((batch_size,) + tuple(self.__model.input_shape[1:]), dtype=np.float32))
+
+    @staticmethod
+    def __pad_batch(batch_x):
+        """Pads the batch with zeros to the next power of 2"""
+        import numpy as np
+
+        number_of_inputs = batch_x.shape[0]
+        padded_size = 1 << max(0, number_of_inputs - 1).bit_length()
+
+        if padded_size == number_of_inputs:
+            return batch_x
+
+        padding = np.zeros((padded_size - number_of_inputs,) + batch_x.shape[1:], dtype=batch_x.dtype)
+        return np.concatenate((batch_x, padding), axis=0)
@@ -1,32 +1,50 @@
 class DatasetGenerator:
-    def __init__(self, folder_images, folder_boxes):
+    """Generates the datasets of the networks from images and boxes. Every output index has its own random generator
+    derived from the seed (random if None), so a dataset is the same whether it is made in this process or split in
+    chunks of indices between the processes of an executor (ex. a ProcessPoolExecutor)"""
+
+    def __init__(self, folder_images, folder_boxes, cache_bytes=256 * 1024 * 1024):
+        """The source images and boxes are kept in the SourceCache of cache_bytes of the process (disabled if 0)"""
+        from src.SourceCache import SourceCache
+
         self.__folder_images = folder_images
         self.__folder_boxes = folder_boxes
         self.__image_exts = (".jpg", ".png")
         self.__box_ext = ".txt"
+        self.__images_and_boxes_file_names = None
+        self.__cache = SourceCache.get_process_cache(cache_bytes) if cache_bytes > 0 else None
+
+    def get_cache(self):
+        """Returns the SourceCache of the source images (None if disabled), the one of this process"""
+        return self.__cache
 
     def set_exts(self, image_exts=(".jpg", ".png"), box_ext=(".txt")):
         self.__image_exts = image_exts
         self.__box_ext = box_ext
+        self.__images_and_boxes_file_names = None
 
-    def generate_pre_tracking_dataset(self, folder_images_output, number_of_images):
-        import random
+    def generate_pre_tracking_dataset(self, folder_images_output, number_of_images, shard_writer=None, seed=None, executor=None, chunk_size=64):
+        """Generates the images of each type, if a ShardWriter is given they are packed in it (group 0,
+        label = type) instead of being saved in folder_images_output"""
+        self.__generate(self.generate_pre_tracking_samples, number_of_images, shard_writer, seed, executor, chunk_size,
+                        folder_images_output=folder_images_output)
+
+    def generate_pre_tracking_samples(self, indices, seed, shard_writer=None, folder_images_output=None):
+        """Generates the outputs of the given indices of generate_pre_tracking_dataset, returns the records kept by
+        shard_writer if it only keeps them in memory"""
         from src.AugmentedImage import AugmentedImage
-        from src.AugmentedImagesUtil import AugmentedImagesUtil
         from src.CircuitObject import CircuitObject
         import cv2
         import os
         import numpy as np
 
-        images_and_boxes_file_names = AugmentedImagesUtil.get_images_and_boxes_file_names_from_folder(self.__folder_images,
-                                                                                                 self.__folder_boxes,
-                                                                                                 self.__image_exts,
-                                                                                                 self.__box_ext)
-        done = 0
+        images_and_boxes_file_names = self.__get_images_and_boxes_file_names()
+
+        for index in indices:
+            rng = DatasetGenerator.__get_random(seed, "pre_tracking", index)
 
-        while done < number_of_images:
-            image_file, box_file = random.choice(images_and_boxes_file_names)
-            augmented_image = AugmentedImage.from_files(self.__folder_images + image_file, self.__folder_boxes + box_file)
+            image_file, box_file = rng.choice(images_and_boxes_file_names)
+            augmented_image = AugmentedImage.from_files(self.__folder_images + image_file, self.__folder_boxes + box_file, cache=self.__cache)
 
             #Get sections from the image of each box in the image
             image = augmented_image.get_image()
@@ -47,72 +65,99 @@ class DatasetGenerator:
                 #Add the image section, pertain to the box, to the new black image
                 image_new[int(y):int(y+height), int(x):int(x+width)] = image[int(y):int(y+height), int(x):int(x+width)]
 
+                if shard_writer is not None:
+                    shard_writer.write_image(image_new, "." + image_file.split(".")[1], label=CircuitObject.get_type_from_box_class(box_class))
+                    continue
+
                 #Save it in the correct folder
-                from src.CircuitObject import CircuitObject
                 image_path_new = folder_images_output + f"{CircuitObject.get_type_from_box_class(box_class)}/"
                 os.makedirs(image_path_new, exist_ok=True)
 
-                image_path_new += f"{done}." + image_file.split(".")[1]
+                image_path_new += f"{index}." + image_file.split(".")[1]
 
                 cv2.imwrite(image_path_new, image_new)
 
-            done += 1
+        return shard_writer.pop_records() if shard_writer is not None else None
 
-    def generate_tracking_dataset(self, folder_images_output, folder_grids_output, number_of_images):
-        import random
+    def generate_tracking_dataset(self, folder_images_output, folder_grids_output, number_of_images, grid_ext=".grid", shard_writer=None,
+                                  seed=None, executor=None, chunk_size=64):
+        """Generates the images and their grids, the grids are binary (GridBoxesUtil.BINARY_EXT) unless a different
+        grid_ext is given, in which case they are saved as text. If a ShardWriter is given the images are packed in it,
+        with their binary grids as label bytes, instead of being saved in the folders"""
+        import os
+
+        if shard_writer is None:
+            os.makedirs(folder_images_output, exist_ok=True)
+            os.makedirs(folder_grids_output, exist_ok=True)
+
+        self.__generate(self.generate_tracking_samples, number_of_images, shard_writer, seed, executor, chunk_size,
+                        folder_images_output=folder_images_output, folder_grids_output=folder_grids_output, grid_ext=grid_ext)
+
+    def generate_tracking_samples(self, indices, seed, shard_writer=None, folder_images_output=None, folder_grids_output=None, grid_ext=".grid"):
+        """Generates the outputs of the given indices of generate_tracking_dataset, returns the records kept by
+        shard_writer if it only keeps them in memory"""
         from src.AugmentedImage import AugmentedImage
-        from src.AugmentedImagesUtil import AugmentedImagesUtil
         from src.GridBoxesUtil import GridBoxesUtil
-        import os
 
-        images_and_boxes_file_names = AugmentedImagesUtil.get_images_and_boxes_file_names_from_folder(self.__folder_images,
-                                                                                                      self.__folder_boxes,
-                                                                                                      self.__image_exts,
-                                                                                                      self.__box_ext)
-        os.makedirs(folder_images_output, exist_ok=True)
-        os.makedirs(folder_grids_output, exist_ok=True)
-        done = 0
-
-        while done < number_of_images:
-            image_file, box_file = random.choice(images_and_boxes_file_names)
-            augmented_image = AugmentedImage.from_files(self.__folder_images + image_file, self.__folder_boxes + box_file)
-
-            grid = GridBoxesUtil.to_grid_from_augmented_image(augmented_image)
-            ########################
-            # The method to_grid_from_augmented_image returns None if a collision has happened
-            # therefore we skip this grid
-            ########################
-            if grid is None:
+        images_and_boxes_file_names = self.__get_images_and_boxes_file_names()
+
+        for index in indices:
+            rng = DatasetGenerator.__get_random(seed, "tracking", index)
+
+            grid = None
+            while grid is None:
+                image_file, box_file = rng.choice(images_and_boxes_file_names)
+                augmented_image = AugmentedImage.from_files(self.__folder_images + image_file, self.__folder_boxes + box_file, cache=self.__cache)
+
+                grid = GridBoxesUtil.to_grid_from_augmented_image(augmented_image)
+                ########################
+                # The method to_grid_from_augmented_image returns None if a collision has happened
+                # therefore we skip this grid
+                ########################
+
+            if shard_writer is not None:
+                shard_writer.write_image(augmented_image.get_image(), "." + image_file.split(".")[1], label_bytes=GridBoxesUtil.to_binary_bytes(grid))
                 continue
 
             image_path_new = folder_images_output
             grid_path_new = folder_grids_output
 
-            image_path_new += f"{done}." + image_file.split(".")[1]
-            grid_path_new += f"{done}." + box_file.split(".")[1]
+            image_path_new += f"{index}." + image_file.split(".")[1]
+            grid_path_new += f"{index}" + grid_ext
 
             AugmentedImage.image_to_file(augmented_image.get_image(), image_path_new)
-            GridBoxesUtil.to_file(grid, grid_path_new)
-
-            done += 1
 
-    def generate_identification_dataset(self, folder_images_output, number_of_images, image_output_size=50, translation_values=(-0.01, 0.01), deformation_values=(-0.01, 0.01)):
-        import random
+            if grid_ext == GridBoxesUtil.BINARY_EXT:
+                GridBoxesUtil.to_binary_file(grid, grid_path_new)
+            else:
+                GridBoxesUtil.to_file(grid, grid_path_new)
+
+        return shard_writer.pop_records() if shard_writer is not None else None
+
+    def generate_identification_dataset(self, folder_images_output, number_of_images, image_output_size=50, translation_values=(-0.01, 0.01), deformation_values=(-0.01, 0.01),
+                                        shard_writer=None, seed=None, executor=None, chunk_size=64):
+        """Generates the image sections of each type and class, if a ShardWriter is given they are packed in it
+        (group = type, label = class) instead of being saved in folder_images_output"""
+        self.__generate(self.generate_identification_samples, number_of_images, shard_writer, seed, executor, chunk_size,
+                        folder_images_output=folder_images_output, image_output_size=image_output_size,
+                        translation_values=translation_values, deformation_values=deformation_values)
+
+    def generate_identification_samples(self, indices, seed, shard_writer=None, folder_images_output=None, image_output_size=50,
+                                        translation_values=(-0.01, 0.01), deformation_values=(-0.01, 0.01)):
+        """Generates the outputs of the given indices of generate_identification_dataset, returns the records kept by
+        shard_writer if it only keeps them in memory"""
         from src.AugmentedImage import AugmentedImage
-        from src.AugmentedImagesUtil import AugmentedImagesUtil
         from src.CircuitObject import CircuitObject
         import cv2
         import os
 
-        images_and_boxes_file_names = AugmentedImagesUtil.get_images_and_boxes_file_names_from_folder(self.__folder_images,
-                                                                                                      self.__folder_boxes,
-                                                                                                      self.__image_exts,
-                                                                                                      self.__box_ext)
-        done = 0
+        images_and_boxes_file_names = self.__get_images_and_boxes_file_names()
+
+        for index in indices:
+            rng = DatasetGenerator.__get_random(seed, "identification", index)
 
-        while done < number_of_images:
-            image_file, box_file = random.choice(images_and_boxes_file_names)
-            augmented_image = AugmentedImage.from_files(self.__folder_images + image_file, self.__folder_boxes + box_file)
+            image_file, box_file = rng.choice(images_and_boxes_file_names)
+            augmented_image = AugmentedImage.from_files(self.__folder_images + image_file, self.__folder_boxes + box_file, cache=self.__cache)
 
             #Get sections from the image of each box in the image
             image = augmented_image.get_image()
@@ -125,12 +170,11 @@ class DatasetGenerator:
                 if CircuitObject.is_an_unknown_object(box_class) or not CircuitObject.is_an_object(box_class):
                     continue
 
-                import random
-                x_translation = int(x + x * random.uniform(translation_values[0], translation_values[1]))
-                y_translation = int(y + y * random.uniform(translation_values[0], translation_values[1]))
+                x_translation = int(x + x * rng.uniform(translation_values[0], translation_values[1]))
+                y_translation = int(y + y * rng.uniform(translation_values[0], translation_values[1]))
 
-                width_deformation = int(width + width * random.uniform(deformation_values[0], deformation_values[1]))
-                height_deformation = int(height + height * random.uniform(deformation_values[0], deformation_values[1]))
+                width_deformation = int(width + width * rng.uniform(deformation_values[0], deformation_values[1]))
+                height_deformation = int(height + height * rng.uniform(deformation_values[0], deformation_values[1]))
 
                 x_translation = max(0, x_translation)
                 y_translation = max(0, y_translation)
@@ -150,11 +194,56 @@ class DatasetGenerator:
                 box_type = CircuitObject.get_type_from_box_class(box_class)
                 box_class -= CircuitObject.get_box_class_from_type(box_type)
 
+                if shard_writer is not None:
+                    shard_writer.write_image(image_section, "." + image_file.split(".")[1], group=box_type, label=box_class)
+                    continue
+
                 image_path_new = folder_images_output + f"/{box_type}/{box_class}/"
                 os.makedirs(image_path_new, exist_ok=True)
 
-                image_path_new += f"{done}." + image_file.split(".")[1]
+                image_path_new += f"{index}." + image_file.split(".")[1]
 
                 cv2.imwrite(image_path_new, image_section)
 
-            done += 1
+        return shard_writer.pop_records() if shard_writer is not None else None
+
+    def __generate(self, generate_samples, number_of_images, shard_writer, seed, executor, chunk_size, **kwargs):
+        """Runs generate_samples on all the indices, here if executor is None or else in chunks of chunk_size indices.
+        The records of the chunks made in memory are written to shard_writer in the order of the indices"""
+        import random
+        from src.ShardWriter import ShardWriter
+
+        seed = random.randrange(2 ** 32) if seed is None else seed
+
+        #Listed here so that the copies of this generator sent to the executor already have them
+        self.__get_images_and_boxes_file_names()
+
+        if executor is None:
+            generate_samples(range(number_of_images), seed, shard_writer, **kwargs)
+            return
+
+        futures = [executor.submit(generate_samples, range(start, min(start + chunk_size, number_of_images)), seed,
+                                   ShardWriter() if shard_writer is not None else None, **kwargs)
+                   for start in range(0, number_of_images, chunk_size)]
+
+        for future in futures:
+            records = future.result()
+            if shard_writer is not None:
+                shard_writer.write_records(records)
+
+    def __get_images_and_boxes_file_names(self):
+        from src.AugmentedImagesUtil import AugmentedImagesUtil
+
+        if self.__images_and_boxes_file_names is None:
+            #Sorted so that the same seed gives the same dataset on any file system
+            self.__images_and_boxes_file_names = sorted(AugmentedImagesUtil.get_images_and_boxes_file_names_from_folder(self.__folder_images,
+                                                                                                                       self.__folder_boxes,
+                                                                                                                       self.__image_exts,
+                                                                                                                       self.__box_ext))
+        return self.__images_and_boxes_file_names
+
+    @staticmethod
+    def __get_random(seed, dataset_name, index):
+        """Returns the independent random generator of an output index of a dataset"""
+        import random
+        return random.Random(f"{seed}_{dataset_name}_{index}")
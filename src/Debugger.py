@@ -63,7 +63,7 @@ class Debugger:
 
         #Get image and boxes from files
         image = cv2.imread(image_path)
-        grid = GridBoxesUtil.to_grid_from_file(file_path=box_path)
+        grid = GridBoxesUtil.to_grid_from_any_file(file_path=box_path)
         boxes = GridBoxesUtil.to_boxes(grid, image_width=AugmentedImage.get_image_width(image), image_height=AugmentedImage.get_image_height(image))
 
         return Debugger.show_boxes_from_image_and_boxes(image, boxes, color)
@@ -8,7 +8,12 @@ class GeneratorAugmentedImages:
                  flip_horizontal_probability=0.2,
                  rotation_values=(-0.26, 0.26),
                  zoom_values=(0.99, 1.01),
-                 seed=42):
+                 seed=42,
+                 fused=False,
+                 cache_bytes=256 * 1024 * 1024):
+        """If fused is True each image is transformed with a single resampling (see AugmentedImage.transform_image).
+        The source images and boxes are kept in the SourceCache of cache_bytes of the process (disabled if 0)"""
+        from src.SourceCache import SourceCache
 
         self.__folder_images = folder_images
         self.__folder_boxes = folder_boxes
@@ -24,6 +29,10 @@ class GeneratorAugmentedImages:
 
         self.__zoom_values = zoom_values
 
+        self.__fused = fused
+
+        self.__cache = SourceCache.get_process_cache(cache_bytes) if cache_bytes > 0 else None
+
         self.__image_exts = (".png", ".jpg")
         self.__box_ext = ".txt"
 
@@ -66,6 +75,16 @@ class GeneratorAugmentedImages:
     def set_seed(self, seed):
         self.__seed = seed
 
+    def get_cache(self):
+        """Returns the SourceCache of the source images (None if disabled), the one of this process"""
+        return self.__cache
+
+    def get_fused(self):
+        return self.__fused
+
+    def set_fused(self, fused):
+        self.__fused = fused
+
     def set_rotation_values(self, values):
         """Set possible rotation values ex. => (-0.26, 0.26) => rotate by (a value from -0.26, 0.26) radians"""
         self.__rotation_values = values
@@ -74,57 +93,96 @@ class GeneratorAugmentedImages:
         """Set possible zoom values ex. => (-0.01, 0.01) => size of the image * (a value from 0.99 to 1.01)"""
         self.__zoom_values = values
 
-    def generate_augmented_images_to_folder(self, folder_ouput, number_of_images, image_size=(416, 416), information_loss_checker_method=None):
+    def generate_augmented_images_to_folder(self, folder_ouput, number_of_images, image_size=(416, 416), information_loss_checker_method=None,
+                                            executor=None, chunk_size=16):
         """Generates augmented images with the four random transformation and saves them in a specific folder.
         An InformationLossChecker method can be given to check for data loss while still guaranteeing the specified number of images"""
-        self.generate_augmented_images_to_folders(folder_ouput, folder_ouput, number_of_images, image_size=image_size, information_loss_checker_method=information_loss_checker_method)
+        self.generate_augmented_images_to_folders(folder_ouput, folder_ouput, number_of_images, image_size=image_size, information_loss_checker_method=information_loss_checker_method,
+                                                  executor=executor, chunk_size=chunk_size)
 
-    def generate_augmented_images_to_folders(self, folder_images_ouput, folder_boxes_output, number_of_images, image_size=(416, 416), information_loss_checker_method=None):
+    def generate_augmented_images_to_folders(self, folder_images_ouput, folder_boxes_output, number_of_images, image_size=(416, 416), information_loss_checker_method=None,
+                                             executor=None, chunk_size=16):
         """Generates augmented images with the four random transformation and saves them in specific folders.
-        An InformationLossChecker method can be given to check for data loss while still guaranteeing the specified number of images"""
-
-        import random
-        from src.AugmentedImage import AugmentedImage
-        from src.AugmentedImagesUtil import AugmentedImagesUtil
+        An InformationLossChecker method can be given to check for data loss while still guaranteeing the specified number of images.
+        Each output index has its own random generator derived from the seed, so the images are the same whether they
+        are made here or split in chunks of chunk_size indices between the processes of an executor (ex. a ProcessPoolExecutor)"""
         import os
 
         os.makedirs(folder_images_ouput, exist_ok=True)
         os.makedirs(folder_boxes_output, exist_ok=True)
 
-        random.seed(self.__seed)
+        images_and_boxes_file_names = self.get_images_and_boxes_file_names()
+
+        if executor is None:
+            self.generate_augmented_images_of_indices(range(number_of_images), images_and_boxes_file_names, folder_images_ouput, folder_boxes_output,
+                                                      image_size, information_loss_checker_method)
+            return
 
-        images_and_boxes_file_names = AugmentedImagesUtil.get_images_and_boxes_file_names_from_folder(self.__folder_images,
-                                                                                                      self.__folder_boxes,
-                                                                                                      self.__image_exts,
-                                                                                                      self.__box_ext)
-        done = 0
+        futures = [executor.submit(self.generate_augmented_images_of_indices, range(start, min(start + chunk_size, number_of_images)),
+                                   images_and_boxes_file_names, folder_images_ouput, folder_boxes_output, image_size, information_loss_checker_method)
+                   for start in range(0, number_of_images, chunk_size)]
 
-        while done < number_of_images:
-            image_file, box_file = random.choice(images_and_boxes_file_names)
-            augmented_image = AugmentedImage.from_files(self.__folder_images + image_file, self.__folder_boxes + box_file)
+        for future in futures:
+            future.result()
 
-            r = random.random()
+    def generate_augmented_images_of_indices(self, indices, images_and_boxes_file_names, folder_images_ouput, folder_boxes_output, image_size=(416, 416),
+                                             information_loss_checker_method=None):
+        """Generates and saves the augmented images of the given output indices of generate_augmented_images_to_folders"""
+        for index in indices:
+            augmented_image, image_file, box_file = self.augment(self.get_random(index), images_and_boxes_file_names, information_loss_checker_method)
+
+            image_path_new = folder_images_ouput + image_file.replace(".", f"_{index}.")
+            box_path_new = folder_boxes_output + box_file.replace(".", f"_{index}.")
+            augmented_image.to_files(image_path_new, box_path_new, image_size=image_size, grayscale=True)
+
+    def augment(self, rng, images_and_boxes_file_names, information_loss_checker_method=None):
+        """Returns (augmented_image, image_file, box_file) of an image chosen with the random generator rng and
+        transformed with it, trying again while information_loss_checker_method (if given) finds a data loss"""
+        from src.AugmentedImage import AugmentedImage
+
+        while True:
+            image_file, box_file = rng.choice(images_and_boxes_file_names)
+            augmented_image = AugmentedImage.from_files(self.__folder_images + image_file, self.__folder_boxes + box_file, cache=self.__cache)
+
+            rad = 0.0
+            r = rng.random()
             if r <= self.__rotation_probability:
-                augmented_image.rotate_image(random.uniform(self.__rotation_values[0], self.__rotation_values[1]))
+                rad = rng.uniform(self.__rotation_values[0], self.__rotation_values[1])
 
-            r = random.random()
+            factor = 1.0
+            r = rng.random()
             if r <= self.__zoom_probability:
-                augmented_image.zoom_image(random.uniform(self.__zoom_values[0], self.__zoom_values[1]))
+                factor = rng.uniform(self.__zoom_values[0], self.__zoom_values[1])
 
-            r = random.random()
-            if r <= self.__flip_vertical_probability:
-                augmented_image.flip_image_vertically()
+            r = rng.random()
+            flip_vertically = r <= self.__flip_vertical_probability
 
-            r = random.random()
-            if r <= self.__flip_horizontal_probability:
-                augmented_image.flip_image_horizontally()
+            r = rng.random()
+            flip_horizontally = r <= self.__flip_horizontal_probability
 
-            if information_loss_checker_method is not None:
-                if information_loss_checker_method(augmented_image):
-                    continue
+            if self.__fused:
+                augmented_image.transform_image(rad, factor, flip_vertically, flip_horizontally)
+            else:
+                augmented_image.rotate_image(rad)
+                augmented_image.zoom_image(factor)
+                if flip_vertically:
+                    augmented_image.flip_image_vertically()
+                if flip_horizontally:
+                    augmented_image.flip_image_horizontally()
 
-            image_path_new = folder_images_ouput + image_file.replace(".", f"_{done}.")
-            box_path_new = folder_boxes_output + box_file.replace(".", f"_{done}.")
-            augmented_image.to_files(image_path_new, box_path_new, image_size=image_size, grayscale=True)
+            if information_loss_checker_method is None or not information_loss_checker_method(augmented_image):
+                return augmented_image, image_file, box_file
 
-            done += 1
+    def get_random(self, index):
+        """Returns the random generator of an output index, derived from the seed"""
+        import random
+        return random.Random(f"{self.__seed}_{index}")
+
+    def get_images_and_boxes_file_names(self):
+        """Returns the sorted file names of the images and boxes to augment, sorted so that the same seed gives the
+        same images on any file system"""
+        from src.AugmentedImagesUtil import AugmentedImagesUtil
+        return sorted(AugmentedImagesUtil.get_images_and_boxes_file_names_from_folder(self.__folder_images,
+                                                                                      self.__folder_boxes,
+                                                                                      self.__image_exts,
+                                                                                      self.__box_ext))
@@ -1,96 +1,157 @@
 class GridBoxesUtil:
+    #Binary grids: a header (magic, subdivisions, number of classes) followed by one fixed-width record for each
+    #occupied cell => (cell index, x, y, width, height, type), all little endian
+    BINARY_EXT = ".grid"
+    BINARY_MAGIC = b"GR"
+    BINARY_RECORD_FORMAT = [("cell", "<u2"), ("x", "<f4"), ("y", "<f4"), ("width", "<f4"), ("height", "<f4"), ("type", "u1")]
+
     @staticmethod
     def to_grid(image, boxes, subdivisions=13):
         """Returns an array of shape subdivisions*subdivisions*5 where each cell
         can only contain one object"""
 
-        from src.CircuitObject import CircuitObject
         from src.AugmentedImage import AugmentedImage
+        import numpy as np
+
+        assert AugmentedImage.get_image_width(image) == AugmentedImage.get_image_height(image), "Image width and height are not equal..."
+
+        grids, collisions = GridBoxesUtil.to_grids_from_boxes_data(GridBoxesUtil.boxes_to_boxes_data([boxes]),
+                                                                   number_of_grids=1,
+                                                                   image_width=AugmentedImage.get_image_width(image),
+                                                                   image_height=AugmentedImage.get_image_height(image),
+                                                                   subdivisions=subdivisions,
+                                                                   dtype=np.float64)
+
+        #Return None if there is more than one object in the same cell
+        if collisions[0]:
+            return None
+        return grids[0]
+
+    @staticmethod
+    def to_grids_from_boxes_data(boxes_data, number_of_grids, image_width, image_height, subdivisions=13, dtype="float32"):
+        """Returns a tuple (grids, collisions) where grids is an array of shape
+        number_of_grids*subdivisions*subdivisions*(5 + classes) and collisions is a boolean array
+        that is True for each grid with more than one object in the same cell (those grids are left empty).
+        boxes_data is a tuple of arrays (grid_indices, box_classes, box_xs, box_ys, box_widths, box_heights),
+        the same returned by to_boxes_data"""
+
+        from src.CircuitObject import CircuitObject
+        import numpy as np
 
         ########################
-        # Create a 2D grid of subdivisions*subdivisions*5
-        # Where the tuple of size 5 is => (o, x, y, w, h)
+        # Each cell of the grid is a tuple of size 5 + classes => (o, x, y, w, h, t...)
         #    Where o => is there an object or not
         #          x => box x in relation with its grid cell
         #          y => box y in relation with its grid cell
-        #          w => box width in relation with its grid cell
-        #          h => box height in relation with its grid cell
+        #          w => box width in relation with half of the image width
+        #          h => box height in relation with half of the image height
+        #          t => one hot encoding of the type of the object
         ########################
 
-        import numpy as np
+        assert image_width == image_height, "Image width and height are not equal..."
 
-        assert AugmentedImage.get_image_width(image) == AugmentedImage.get_image_height(image), "Image width and height are not equal..."
+        grid_indices, box_classes, box_xs, box_ys, box_widths, box_heights = [np.asarray(x) for x in boxes_data]
+        grid_indices = grid_indices.astype(np.int64)
+        box_classes = box_classes.astype(np.int64)
 
-        grid = np.full((subdivisions, subdivisions, 5 + CircuitObject.NUMBER_OF_CLASSES), 0.0)
+        grids = np.zeros((number_of_grids, subdivisions, subdivisions, 5 + CircuitObject.NUMBER_OF_CLASSES), dtype=dtype)
+        collisions = np.zeros(number_of_grids, dtype=bool)
 
         #Get the size of each grid cell
-        step = AugmentedImage.get_image_width(image) / subdivisions
+        step = image_width / subdivisions
 
-        box_classes = boxes.get_box_classes()
-        box_centers = boxes.get_box_centers()
-        box_sizes = boxes.get_box_sizes()
+        #Type of each box class, unknown objects and anything that is not an object are skipped
+        types_of_box_classes = np.array([CircuitObject.get_type_from_box_class(i) for i in range(max(CircuitObject.SOMETHING, np.max(box_classes, initial=0)) + 1)])
+        box_types = types_of_box_classes[box_classes]
+        is_an_object = box_types < CircuitObject.NUMBER_OF_CLASSES
 
-        for box_class, box_center, box_size in zip(box_classes, box_centers, box_sizes):
-            box_x, box_y = box_center
-            box_width, box_height = box_size
+        grid_indices = grid_indices[is_an_object]
+        box_types = box_types[is_an_object]
+        box_xs = box_xs[is_an_object].astype(np.float64)
+        box_ys = box_ys[is_an_object].astype(np.float64)
+        box_widths = box_widths[is_an_object].astype(np.float64)
+        box_heights = box_heights[is_an_object].astype(np.float64)
 
-            #todo: Fix this problem, both in the generator and here
-            # -> skip what is not an object
+        #Find the cell that contains the center of each box
+        cell_xs = np.floor_divide(box_xs, step).astype(np.int64)
+        cell_ys = np.floor_divide(box_ys, step).astype(np.int64)
 
-            #Check if box_class is associated with an unknown object and if it is, skip it
-            if CircuitObject.is_an_unknown_object(box_class) or not CircuitObject.is_an_object(box_class):
-                continue
+        #Find the grids that have more than one object in the same cell
+        cells = (grid_indices * subdivisions + np.mod(cell_ys, subdivisions)) * subdivisions + np.mod(cell_xs, subdivisions)
+        cells_unique, cells_count = np.unique(cells, return_counts=True)
+        collisions[cells_unique[cells_count > 1] // (subdivisions * subdivisions)] = True
 
-            #Check if box_class is associated with a circuit object or not
-            box_is_an_object = 1.0
-            box_type = CircuitObject.get_type_from_box_class(box_class)
+        grids[grid_indices, cell_ys, cell_xs, 0] = 1.0
+        grids[grid_indices, cell_ys, cell_xs, 1] = (box_xs - (cell_xs * step)) / step
+        grids[grid_indices, cell_ys, cell_xs, 2] = (box_ys - (cell_ys * step)) / step
+        grids[grid_indices, cell_ys, cell_xs, 3] = box_widths / (image_width / 2)
+        grids[grid_indices, cell_ys, cell_xs, 4] = box_heights / (image_height / 2)
+        grids[grid_indices, cell_ys, cell_xs, 5 + box_types] = 1.0
 
-            #Find the cell that contains the center of the box
-            cell_x = int(box_x // step)
-            cell_y = int(box_y // step)
+        grids[collisions] = 0.0
 
-            #Make sure that there isn't already an object in that cell, else return None
-            if grid[cell_y, cell_x, 0] != 0.0:
-                return None
+        return grids, collisions
 
-            box_x_new = (box_x - (cell_x * step)) / step
-            box_y_new = (box_y - (cell_y * step)) / step
+    @staticmethod
+    def boxes_to_boxes_data(boxes_of_grids):
+        """Returns the tuple of arrays (grid_indices, box_classes, box_xs, box_ys, box_widths, box_heights)
+        from a list of Boxes, one for each grid"""
+        from src.Boxes import Boxes
+        import numpy as np
 
-            box_width_new = box_width / (AugmentedImage.get_image_width(image) / 2)
-            box_height_new = box_height / (AugmentedImage.get_image_height(image) / 2)
+        #Empty arrays first, so that the concatenation always has the right types
+        grid_indices = [np.zeros(0, dtype=np.int64)] + [np.full(len(boxes), grid_index, dtype=np.int64) for grid_index, boxes in enumerate(boxes_of_grids)]
+        boxes_data = [Boxes().get_boxes_data()] + [boxes.get_boxes_data() for boxes in boxes_of_grids]
 
-            grid[cell_y, cell_x, 0] = box_is_an_object
-            grid[cell_y, cell_x, 1:3] = (box_x_new, box_y_new)
-            grid[cell_y, cell_x, 3:5] = (box_width_new, box_height_new)
-            grid[cell_y, cell_x, 5 + box_type] = 1.0
-        return grid
+        return (np.concatenate(grid_indices),) + tuple(np.concatenate(x) for x in zip(*boxes_data))
 
     @staticmethod
     def to_boxes(grid, image_width, image_height, subdivisions=13, confidence=0.5):
-        from src.Boxes import Boxes
-        from src.Box import Box
+        boxes_data = GridBoxesUtil.to_boxes_data(grid, image_width, image_height, subdivisions, confidence)
+        return GridBoxesUtil.boxes_data_to_boxes(boxes_data, number_of_grids=1)[0]
+
+    @staticmethod
+    def to_boxes_batch(grids, image_width, image_height, subdivisions=13, confidence=0.5):
+        """Returns a list of Boxes, one for each grid of the batch of shape (N, subdivisions, subdivisions, 5 + classes)"""
+        boxes_data = GridBoxesUtil.to_boxes_data(grids, image_width, image_height, subdivisions, confidence)
+        return GridBoxesUtil.boxes_data_to_boxes(boxes_data, number_of_grids=grids.shape[0])
+
+    @staticmethod
+    def to_boxes_data(grids, image_width, image_height, subdivisions=13, confidence=0.5):
+        """Returns the boxes of a grid, or of a batch of grids, as a tuple of arrays
+        (grid_indices, box_classes, box_xs, box_ys, box_widths, box_heights) where grid_indices
+        is the index of the grid that contains each box (always 0 for a single grid)"""
+
         from src.CircuitObject import CircuitObject
         import numpy as np
 
         assert image_width == image_height, "Image width and height are not equal..."
 
+        if len(grids.shape) == 3:
+            grids = np.expand_dims(grids, axis=0)
+
         step = image_width / subdivisions
 
-        boxes = Boxes()
+        #Box class associated with each type
+        box_classes_of_types = np.array([CircuitObject.get_box_class_from_type(i) for i in range(grids.shape[-1] - 5)])
+
+        #Boxes are returned in the same order of the cells (grid by grid, row by row)
+        grid_indices, cell_ys, cell_xs = np.nonzero(grids[..., 0] >= confidence)
+        cells = grids[grid_indices, cell_ys, cell_xs].astype(np.float64)
 
-        for i in range(grid.shape[0]):
-            for j in range(grid.shape[1]):
-                box_class, box_x, box_y, box_width, box_height = grid[i, j, 0:5]
-                box_class_new = CircuitObject.get_box_class_from_type(np.argmax(grid[i, j, 5:]))
+        box_classes = box_classes_of_types[np.argmax(cells[:, 5:], axis=-1)]
+        box_xs = cells[:, 1] * step + (cell_xs * step)
+        box_ys = cells[:, 2] * step + (cell_ys * step)
+        box_widths = cells[:, 3] * (image_width / 2)
+        box_heights = cells[:, 4] * (image_height / 2)
 
-                if box_class >= confidence:
-                    box_x_new = box_x * step + (j * step)
-                    box_y_new = box_y * step + (i * step)
-                    box_width_new = box_width * (image_width / 2)
-                    box_height_new = box_height * (image_height / 2)
+        return grid_indices, box_classes, box_xs, box_ys, box_widths, box_heights
 
-                    boxes.add_box(Box(box_class_new, box_x_new, box_y_new, box_width_new, box_height_new))
-        return boxes
+    @staticmethod
+    def boxes_data_to_boxes(boxes_data, number_of_grids):
+        """Returns a list of Boxes, one for each grid, from the arrays returned by to_boxes_data"""
+        from src.Boxes import Boxes
+        return Boxes.batch_from_boxes_data(boxes_data, number_of_grids)
 
     @staticmethod
     def to_grid_from_augmented_image(augmented_image, subdivisions=13):
@@ -115,6 +176,108 @@ class GridBoxesUtil:
         grid_flat = np.loadtxt(file_path)
         return np.reshape(grid_flat, (subdivisions, subdivisions, 5 + CircuitObject.NUMBER_OF_CLASSES))
 
+    @staticmethod
+    def to_binary_bytes(grid):
+        """Returns the binary representation of a grid made by to_grid, only its occupied cells are stored"""
+        import numpy as np
+
+        subdivisions = grid.shape[0]
+
+        cell_ys, cell_xs = np.nonzero(grid[..., 0] != 0.0)
+        cells = grid[cell_ys, cell_xs]
+
+        records = np.zeros(len(cells), dtype=GridBoxesUtil.BINARY_RECORD_FORMAT)
+        records["cell"] = cell_ys * subdivisions + cell_xs
+        records["x"] = cells[:, 1]
+        records["y"] = cells[:, 2]
+        records["width"] = cells[:, 3]
+        records["height"] = cells[:, 4]
+        records["type"] = np.argmax(cells[:, 5:], axis=-1)
+
+        header = GridBoxesUtil.BINARY_MAGIC + bytes((subdivisions, grid.shape[-1] - 5))
+        return header + records.tobytes()
+
+    @staticmethod
+    def to_binary_file(grid, file_path):
+        with open(file_path, "wb") as f:
+            f.write(GridBoxesUtil.to_binary_bytes(grid))
+
+    @staticmethod
+    def to_grids_from_binary_bytes(grids_bytes, dtype="float32"):
+        """Returns an array of shape len(grids_bytes)*subdivisions*subdivisions*(5 + classes) rebuilt from the
+        binary representations of the grids, all at once"""
+        import numpy as np
+
+        header_size = len(GridBoxesUtil.BINARY_MAGIC) + 2
+
+        subdivisions, number_of_classes = None, None
+        records = []
+        for grid_bytes in grids_bytes:
+            assert grid_bytes[:len(GridBoxesUtil.BINARY_MAGIC)] == GridBoxesUtil.BINARY_MAGIC, "Not a binary grid..."
+
+            subdivisions_of_grid, number_of_classes_of_grid = grid_bytes[len(GridBoxesUtil.BINARY_MAGIC):header_size]
+            assert subdivisions in (None, subdivisions_of_grid) and number_of_classes in (None, number_of_classes_of_grid), "Grids have different shapes..."
+            subdivisions, number_of_classes = subdivisions_of_grid, number_of_classes_of_grid
+
+            records.append(np.frombuffer(grid_bytes, dtype=GridBoxesUtil.BINARY_RECORD_FORMAT, offset=header_size))
+
+        grids = np.zeros((len(grids_bytes), subdivisions or 0, subdivisions or 0, 5 + (number_of_classes or 0)), dtype=dtype)
+
+        if len(records) == 0:
+            return grids
+
+        grid_indices = np.repeat(np.arange(len(records)), [len(x) for x in records])
+        records = np.concatenate(records)
+
+        cell_ys, cell_xs = np.divmod(records["cell"].astype(np.int64), subdivisions)
+
+        grids[grid_indices, cell_ys, cell_xs, 0] = 1.0
+        grids[grid_indices, cell_ys, cell_xs, 1] = records["x"]
+        grids[grid_indices, cell_ys, cell_xs, 2] = records["y"]
+        grids[grid_indices, cell_ys, cell_xs, 3] = records["width"]
+        grids[grid_indices, cell_ys, cell_xs, 4] = records["height"]
+        grids[grid_indices, cell_ys, cell_xs, 5 + records["type"].astype(np.int64)] = 1.0
+        return grids
+
+    @staticmethod
+    def to_grids_from_binary_files(file_paths, dtype="float32"):
+        grids_bytes = []
+        for file_path in file_paths:
+            with open(file_path, "rb") as f:
+                grids_bytes.append(f.read())
+        return GridBoxesUtil.to_grids_from_binary_bytes(grids_bytes, dtype=dtype)
+
+    @staticmethod
+    def to_grid_from_binary_file(file_path, dtype="float32"):
+        return GridBoxesUtil.to_grids_from_binary_files([file_path], dtype=dtype)[0]
+
+    @staticmethod
+    def to_grids_from_any_files(file_paths, subdivisions=13, dtype="float32"):
+        """Returns the grids from binary files (BINARY_EXT) or from text files (to_file)"""
+        import numpy as np
+
+        if all(x.endswith(GridBoxesUtil.BINARY_EXT) for x in file_paths):
+            return GridBoxesUtil.to_grids_from_binary_files(file_paths, dtype=dtype)
+        return np.array([GridBoxesUtil.to_grid_from_any_file(x, subdivisions) for x in file_paths], dtype=dtype)
+
+    @staticmethod
+    def to_grid_from_any_file(file_path, subdivisions=13):
+        """Returns the grid from a binary file (BINARY_EXT) or from a text file (to_file)"""
+        if file_path.endswith(GridBoxesUtil.BINARY_EXT):
+            return GridBoxesUtil.to_grid_from_binary_file(file_path)
+        return GridBoxesUtil.to_grid_from_file(file_path, subdivisions)
+
+    @staticmethod
+    def text_files_to_binary_files(folder_grids_input, folder_grids_output, subdivisions=13, grid_ext=".txt"):
+        """Converts every text grid (to_file) of a folder to a binary grid with the same name"""
+        import os
+
+        os.makedirs(folder_grids_output, exist_ok=True)
+
+        for grid_file in [x for x in os.listdir(folder_grids_input) if x.endswith(grid_ext)]:
+            grid = GridBoxesUtil.to_grid_from_file(folder_grids_input + grid_file, subdivisions)
+            GridBoxesUtil.to_binary_file(grid, folder_grids_output + grid_file[:-len(grid_ext)] + GridBoxesUtil.BINARY_EXT)
+
     @staticmethod
     def get_images_and_grids_file_names_from_folder(folder_images, folder_grids, image_exts=(".png", ".jpg"), grid_ext=".txt"):
         """Returns the file names of images and boxes as a list of tuples"""
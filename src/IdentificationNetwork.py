@@ -1,7 +1,10 @@
 class IdentificationNetwork:
-    def __init__(self, model=None, models=None):
+    def __init__(self, model=None, models=None, multi_head_model=None):
         self.__model = model
         self.__models = models
+        self.__multi_head_model = multi_head_model
+        self.__compiled_models = None
+        self.__compiled_multi_head_model = None
 
     def get_model(self):
         return self.__model
@@ -14,9 +17,32 @@ class IdentificationNetwork:
 
     def set_models(self, models):
         self.__models = models
+        self.__compiled_models = None
+
+    def get_multi_head_model(self):
+        return self.__multi_head_model
+
+    def set_multi_head_model(self, multi_head_model):
+        self.__multi_head_model = multi_head_model
+        self.__compiled_multi_head_model = None
+
+    def compile_predict(self, jit_compile=False, warm_up_batch_sizes=(1,)):
+        """Makes the predictions of the models (and of the multi head model) go through a tf.function with a fixed
+        input signature (see CompiledModel), warming it up on the given batch sizes. Weights loaded afterwards are still used"""
+        from src.CompiledModel import CompiledModel
+
+        if self.__models is not None:
+            self.__compiled_models = tuple(CompiledModel(model, jit_compile=jit_compile) for model in self.__models)
+            for compiled_model in self.__compiled_models:
+                compiled_model.warm_up(warm_up_batch_sizes)
+
+        if self.__multi_head_model is not None:
+            self.__compiled_multi_head_model = CompiledModel(self.__multi_head_model, jit_compile=jit_compile)
+            self.__compiled_multi_head_model.warm_up(warm_up_batch_sizes)
 
     def train_models(self, number_of_models, epochs, steps_per_epoch, generators, weights_save_path,
-                     weights_load_path=None, do_checkpoint=True, optimizer=None, loss_function=None):
+                     weights_load_path=None, do_checkpoint=True, optimizer=None, loss_function=None,
+                     workers=1, use_multiprocessing=False, max_queue_size=10):
         assert self.__models is not None, "The list of \"models\" given is None..."
         assert len(self.__models) == number_of_models, "The number of models given is different from the actual models to use"
 
@@ -25,11 +51,69 @@ class IdentificationNetwork:
             self.__model = self.__models[i]
             self.train_model(epochs, steps_per_epoch, generators[i], weights_save_path.replace(".", f"_{i}."),
                              weights_load_path.replace(".", f"_{i}.") if weights_load_path is not None else None,
-                             do_checkpoint, optimizer, loss_function)
+                             do_checkpoint, optimizer, loss_function, workers, use_multiprocessing, max_queue_size)
         self.__model = old_model
 
-    def train_model(self, epochs, steps_per_epoch, generator, weights_save_path, weights_load_path=None, do_checkpoint=True, optimizer=None, loss_function=None):
+    def train_joint_models(self, number_of_models, epochs, steps_per_epoch, generators, weights_save_path,
+                           weights_load_path=None, do_checkpoint=True, optimizer=None, loss_function=None,
+                           workers=1, use_multiprocessing=False, max_queue_size=10):
+        """Like train_models, but the models are trained together by a single fit of a joint model with one input and
+        one output for each of them (see get_joint_model), fed by joint_generator(generators). The models share no
+        weights, so each one is trained only by its own loss. The weights of each model are saved, and checkpointed
+        when its own loss improves, in the same files of train_models"""
+        from tensorflow.keras.callbacks import LambdaCallback
+        from src.Util import get_fit_arguments
+
+        assert self.__models is not None, "The list of \"models\" given is None..."
+        assert len(self.__models) == number_of_models, "The number of models given is different from the actual models to use"
+
+        loss_function = IdentificationNetwork.loss_function if loss_function is None else loss_function
+        optimizer = IdentificationNetwork.optimizer() if optimizer is None else optimizer
+
+        joint_model = IdentificationNetwork.get_joint_model(self.__models)
+        joint_model.compile(optimizer, loss=[loss_function] * number_of_models, metrics=[["acc"]] * number_of_models)
+
+        if weights_load_path is not None:
+            old_model = self.__model
+            for i in range(number_of_models):
+                self.__model = self.__models[i]
+                try:
+                    self.load_weights(weights_load_path.replace(".", f"_{i}."))
+                except Exception as e:
+                    print("Could not load the weights: " + weights_load_path.replace(".", f"_{i}.") + " not found, skipping...")
+            self.__model = old_model
+
+        best_losses = [float("inf")] * number_of_models
+
+        def checkpoint_models(epoch, logs):
+            for i in range(number_of_models):
+                #The loss of each output is logged with the name of the output
+                loss = logs.get(f"identification_{i}_loss", logs.get("loss"))
+                if loss < best_losses[i]:
+                    print(f"\nEpoch {epoch + 1}: identification_{i}_loss improved from {best_losses[i]:.5f} to {loss:.5f}, saving model {i}")
+                    best_losses[i] = loss
+                    self.__models[i].save_weights(filepath=weights_save_path.replace(".", f"_{i}."))
+
+        checkpoint = [LambdaCallback(on_epoch_end=checkpoint_models)] if do_checkpoint else None
+
+        generator = IdentificationNetwork.joint_generator(generators)
+
+        joint_model.fit(generator,
+                        steps_per_epoch=steps_per_epoch,
+                        epochs=epochs,
+                        callbacks=checkpoint,
+                        verbose=1,
+                        **get_fit_arguments(joint_model, generator, workers, use_multiprocessing, max_queue_size))
+
+        for i in range(number_of_models):
+            self.__models[i].save_weights(filepath=weights_save_path.replace(".", f"_{i}."))
+
+    def train_model(self, epochs, steps_per_epoch, generator, weights_save_path, weights_load_path=None, do_checkpoint=True, optimizer=None, loss_function=None,
+                    workers=1, use_multiprocessing=False, max_queue_size=10):
+        """Train the model on a generator, a tf.data.Dataset or a Sequence. The batches of a Sequence are made by
+        workers threads (processes if use_multiprocessing) into a queue of max_queue_size batches"""
         from tensorflow.keras.callbacks import ModelCheckpoint
+        from src.Util import get_fit_arguments
 
         loss_function = IdentificationNetwork.loss_function if loss_function is None else loss_function
         optimizer = IdentificationNetwork.optimizer() if optimizer is None else optimizer
@@ -47,14 +131,48 @@ class IdentificationNetwork:
         else:
             checkpoint = None
 
-        self.__model.fit_generator(generator=generator,
-                                   steps_per_epoch=steps_per_epoch,
-                                   epochs=epochs,
-                                   callbacks=checkpoint,
-                                   verbose=1)
+        self.__model.fit(generator,
+                         steps_per_epoch=steps_per_epoch,
+                         epochs=epochs,
+                         callbacks=checkpoint,
+                         verbose=1,
+                         **get_fit_arguments(self.__model, generator, workers, use_multiprocessing, max_queue_size))
 
         self.__model.save_weights(filepath=weights_save_path)
 
+    def train_multi_head_model(self, epochs, steps_per_epoch, generator, weights_save_path, weights_load_path=None, do_checkpoint=True, optimizer=None, loss_function=None):
+        """Train the multi head model, the generator should yield (batch_x, batch_y, batch_weights) with one batch_y and
+        one batch_weights per head, where the weights are 0.0 for the heads that do not match the type of the input"""
+        from tensorflow.keras.callbacks import ModelCheckpoint
+
+        assert self.__multi_head_model is not None, "The \"multi_head_model\" given is None..."
+
+        loss_function = IdentificationNetwork.loss_function if loss_function is None else loss_function
+        optimizer = IdentificationNetwork.optimizer() if optimizer is None else optimizer
+
+        number_of_heads = len(self.__multi_head_model.outputs)
+
+        self.__multi_head_model.compile(optimizer, loss=[loss_function] * number_of_heads, metrics=[["acc"]] * number_of_heads)
+
+        if weights_load_path is not None:
+            try:
+                self.load_multi_head_weights(weights_load_path)
+            except Exception as e:
+                print("Could not load the weights: " + weights_load_path + " not found, skipping...")
+
+        if do_checkpoint:
+            checkpoint = [ModelCheckpoint(weights_save_path, monitor="loss", verbose=1, save_best_only=True, save_weights_only=True)]
+        else:
+            checkpoint = None
+
+        self.__multi_head_model.fit(generator,
+                                    steps_per_epoch=steps_per_epoch,
+                                    epochs=epochs,
+                                    callbacks=checkpoint,
+                                    verbose=1)
+
+        self.__multi_head_model.save_weights(filepath=weights_save_path)
+
     def load_weights(self, weights_load_path):
         self.__model.load_weights(weights_load_path, by_name=True)
 
@@ -62,51 +180,119 @@ class IdentificationNetwork:
         for i in range(number_of_models):
             self.__models[i].load_weights(weights_load_path.replace(".", f"_{i}."), by_name=False)
 
+    def load_multi_head_weights(self, weights_load_path):
+        self.__multi_head_model.load_weights(weights_load_path, by_name=False)
+
+    def load_multi_head_weights_from_models_weights(self, weights_load_path, numbers_of_classes=(9, 4, 2, 2, 4, 2), input_shape=(50, 50, 1), body_index=0):
+        """Import the weights saved by load_all_weights' models (identification_{i}.h5) into the multi head model.
+        Each head gets the out_id weights of its own model while the shared body gets the weights of the model at
+        body_index, therefore the multi head model should be fine-tuned afterwards with train_multi_head_model"""
+        import src.nets
+
+        assert self.__multi_head_model is not None, "The \"multi_head_model\" given is None..."
+
+        for i, number_of_classes in enumerate(numbers_of_classes):
+            model = src.nets.generate_identification_model(number_of_classes=number_of_classes, input_shape=input_shape)
+            model.load_weights(weights_load_path.replace(".", f"_{i}."), by_name=False)
+
+            if i == body_index:
+                #The body is built in the same way in both models, so its layers are in the same order
+                for layer, layer_multi_head in zip(model.layers, self.__multi_head_model.layers):
+                    if layer.name == "out_id":
+                        break
+                    layer_multi_head.set_weights(layer.get_weights())
+
+            self.__multi_head_model.get_layer("out_id_" + str(i)).set_weights(model.get_layer("out_id").get_weights())
+
     def predict_boxes_from_file_and_tracking_output(self, image_path, boxes, number_of_models, image_input_size=(50, 50)):
-        import numpy as np
-        import cv2
-        from src.CircuitObject import CircuitObject
         from src.AugmentedImage import AugmentedImage
+
+        image = AugmentedImage.image_from_file(image_path, grayscale=True)
+        return self.predict_boxes_from_image_and_tracking_output(image, boxes, number_of_models, image_input_size)
+
+    def predict_boxes_from_image_and_tracking_output(self, image, boxes, number_of_models, image_input_size=(50, 50)):
+        """Returns the identified Boxes from a grayscale image (cv2) and the Boxes predicted by the tracking network"""
+        return self.predict_boxes_from_images_and_tracking_outputs([image], [boxes], number_of_models, image_input_size)[0]
+
+    def predict_boxes_from_images_and_tracking_outputs(self, images, boxes_of_images, number_of_models, image_input_size=(50, 50)):
+        """Returns a list of identified Boxes, one for each grayscale image (cv2) and its Boxes predicted by the
+        tracking network. The sections of all the images are taken at once and each model is called only once"""
+        from src.ImageSectionsUtil import ImageSectionsUtil
         from src.Boxes import Boxes
-        from src.Box import Box
 
-        image = AugmentedImage.image_from_file(image_path, grayscale=True) / 255.0
+        batch_x, image_indices, box_types, boxes_data = ImageSectionsUtil.to_image_sections(images,
+                                                                                            boxes_of_images,
+                                                                                            number_of_types=number_of_models,
+                                                                                            image_section_size=image_input_size)
 
-        boxes_new = Boxes()
+        box_classes_new = self.predict_box_classes_from_image_sections(batch_x, box_types, number_of_models)
 
-        rectangles = boxes.get_topleft_boxes_data()
-        for i in range(number_of_models):
-            batch_x = []
-            boxes_data = []
+        return Boxes.batch_from_boxes_data((image_indices, box_classes_new, boxes_data[:, 0], boxes_data[:, 1], boxes_data[:, 2], boxes_data[:, 3]),
+                                           len(images))
+
+    def predict_box_classes_from_image_sections(self, batch_x, box_types, number_of_models):
+        """Returns the array of the box classes identified for the image sections of ImageSectionsUtil.to_image_sections,
+        each one by the model (or the head of the multi head model) of its type"""
+        import numpy as np
+        from src.CircuitObject import CircuitObject
+
+        box_classes_new = np.zeros(len(box_types), dtype=np.int64)
 
-            for rect in rectangles:
-                box_class, x, y, width, height = rect
+        if len(box_types) > 0 and self.__multi_head_model is not None:
+            #Every section goes through the shared body once and is then read from the head of its type
+            multi_head_model = self.__multi_head_model if self.__compiled_multi_head_model is None else self.__compiled_multi_head_model
+            batch_y = multi_head_model.predict(batch_x, batch_size=None)
 
-                if CircuitObject.get_type_from_box_class(box_class) != i:
+            for i in range(number_of_models):
+                mask = box_types == i
+                box_classes_new[mask] = np.argmax(batch_y[i][mask], axis=-1) + CircuitObject.get_box_class_from_type(i)
+
+        elif len(box_types) > 0:
+            models = self.__models if self.__compiled_models is None else self.__compiled_models
+
+            for i in range(number_of_models):
+                mask = box_types == i
+
+                if not np.any(mask):
                     continue
 
-                x = max(0, x)
-                y = max(0, y)
+                batch_y = models[i].predict(batch_x[mask], batch_size=None)
+                box_classes_new[mask] = np.argmax(batch_y, axis=-1) + CircuitObject.get_box_class_from_type(i)
 
-                image_section = image[int(y): int(y + height), int(x): int(x + width)]
+        return box_classes_new
 
-                # Resize to match input size
-                image_section = np.expand_dims(cv2.resize(image_section, image_input_size), axis=-1)
+    @staticmethod
+    def get_joint_model(models):
+        """Returns a keras model with one input and one output (named identification_{i}) for each model, made by
+        calling the models themselves, so that training it trains their weights"""
+        from tensorflow.keras.layers import Activation, Input
+        from tensorflow.keras.models import Model
+
+        inputs = [Input(shape=model.input_shape[1:], name=f"input_identification_{i}") for i, model in enumerate(models)]
+        outputs = [Activation("linear", name=f"identification_{i}")(model(inp)) for i, (model, inp) in enumerate(zip(models, inputs))]
 
-                batch_x += [image_section / 255.0]
-                boxes_data.append((x+width/2, y+height/2, width, height))
+        return Model(inputs=inputs, outputs=outputs)
 
-            if len(batch_x) == 0:
-                continue
+    @staticmethod
+    def joint_generator(generators):
+        """Returns the batches ((x_0, ..., x_n), (y_0, ..., y_n)) of the joint model from one generator for each
+        model, a JointSequence if they are all Sequences, a zipped tf.data.Dataset if they are all datasets or a
+        generator otherwise"""
+        from tensorflow.keras.utils import Sequence
+        import tensorflow as tf
 
-            batch_x = np.array(batch_x)
-            batch_y = self.__models[i].predict(batch_x, batch_size=None)
+        if all(isinstance(generator, Sequence) for generator in generators):
+            from src.JointSequence import JointSequence
+            return JointSequence(generators)
 
-            for j in range(len(boxes_data)):
-                box_class_new = np.argmax(batch_y[j]) + CircuitObject.get_box_class_from_type(i)
+        if all(isinstance(generator, tf.data.Dataset) for generator in generators):
+            return tf.data.Dataset.zip(tuple(generators)).map(lambda *batches: (tuple(x for x, __ in batches), tuple(y for __, y in batches)))
 
-                boxes_new.add_box(Box(int(box_class_new), boxes_data[j][0], boxes_data[j][1], boxes_data[j][2], boxes_data[j][3]))
-        return boxes_new
+        def generator():
+            for batches in zip(*generators):
+                yield tuple(x for x, __ in batches), tuple(y for __, y in batches)
+
+        return generator()
 
     @staticmethod
     def optimizer(lr=0.001, amsgrad=True):
@@ -127,6 +313,104 @@ class IdentificationNetwork:
             generators.append(IdentificationNetwork.generator(folder_images + str(i) + "/", batch_size, image_ext))
         return generators
 
+    @staticmethod
+    def generators_from_shards(folder_shards, batch_size=64, numbers_of_classes=(9, 4, 2, 2, 4, 2)):
+        """Get a list of generators, one for each type of object (group) of a dataset packed by ShardWriter, where
+        numbers_of_classes are the classes of the model of each type, so that a class missing from the shards does not
+        change the size of the labels"""
+        from src.ShardReader import ShardReader
+        groups = ShardReader(folder_shards).get_groups()
+        return [IdentificationNetwork.generator_from_shards(folder_shards, batch_size, group=int(group), number_of_classes=numbers_of_classes[int(group)])
+                for group in groups]
+
+    @staticmethod
+    def generator_from_shards(folder_shards, batch_size=64, group=None, number_of_classes=None):
+        """Like generator, but the images are read from a dataset packed by ShardWriter. Only the samples of the given
+        group are used (all if None) and their labels are one hot encoded with number_of_classes (max label + 1 if None)"""
+        from src.ShardReader import ShardReader
+        import numpy as np
+        import random
+
+        shard_reader = ShardReader(folder_shards)
+        indices = range(len(shard_reader)) if group is None else shard_reader.get_indices_of_group(group).tolist()
+        labels = shard_reader.get_index()["label"]
+
+        if number_of_classes is None:
+            number_of_classes = int(labels[indices].max()) + 1
+
+        while True:
+            batch_indices = random.choices(indices, k=batch_size)
+
+            batch_x = np.expand_dims(np.array([shard_reader.read_image(i)[0] for i in batch_indices]), axis=-1) / 255.0
+            batch_y = np.eye(number_of_classes)[labels[batch_indices]]
+
+            yield batch_x, batch_y
+
+    @staticmethod
+    def datasets(folder_images, batch_size=64, image_ext=(".jpg", ".png"), num_parallel_calls=None, shuffle_buffer_size=1024, cache=None, seed=None):
+        """Get a list of tf.data.Dataset, one for each type of object"""
+        import os
+        datasets = []
+        for i in range(len(os.listdir(folder_images))):
+            datasets.append(IdentificationNetwork.dataset(folder_images + str(i) + "/", batch_size, image_ext,
+                                                          num_parallel_calls=num_parallel_calls,
+                                                          shuffle_buffer_size=shuffle_buffer_size,
+                                                          cache=cache if not cache else cache + f"_{i}",
+                                                          seed=seed))
+        return datasets
+
+    @staticmethod
+    def sequences(folder_images, batch_size=64, image_ext=(".jpg", ".png"), number_of_batches=None, seed=None,
+                  numbers_of_classes=(9, 4, 2, 2, 4, 2)):
+        """Get a list of IdentificationSequence, one for each type of object, where numbers_of_classes are the classes
+        of the model of each type, so that a class never generated does not change the size of the labels"""
+        import os
+        sequences = []
+        for i in range(len(os.listdir(folder_images))):
+            sequences.append(IdentificationNetwork.sequence(folder_images + str(i) + "/", batch_size, image_ext,
+                                                            number_of_classes=numbers_of_classes[i],
+                                                            number_of_batches=number_of_batches, seed=seed))
+        return sequences
+
+    @staticmethod
+    def sequence(folder_images, batch_size=64, image_ext=(".jpg", ".png"), number_of_classes=None, number_of_batches=None, seed=None):
+        """Returns an IdentificationSequence of batches like the ones of generator, that train_model can make with many workers"""
+        from src.IdentificationSequence import IdentificationSequence
+        return IdentificationSequence(folder_images, batch_size, image_ext, number_of_classes, number_of_batches, seed)
+
+    @staticmethod
+    def dataset(folder_images, batch_size=64, image_ext=(".jpg", ".png"), num_parallel_calls=None, shuffle_buffer_size=1024, cache=None, seed=None):
+        """Returns an endless tf.data.Dataset of batches (batch_x, batch_y) like the ones of generator, where the files
+        are read in parallel by num_parallel_calls calls (AUTOTUNE if None), shuffled from a buffer of
+        shuffle_buffer_size samples and prefetched. cache can be "" (in memory) or a file path, None disables it"""
+        import tensorflow as tf
+        import os
+
+        num_parallel_calls = tf.data.AUTOTUNE if num_parallel_calls is None else num_parallel_calls
+
+        folders = os.listdir(folder_images)
+
+        image_paths = []
+        box_types = []
+        for folder in folders:
+            image_files_of_folder = [x for x in os.listdir(folder_images + folder) if x.endswith(image_ext)]
+            image_paths += [folder_images + folder + "/" + x for x in image_files_of_folder]
+            box_types += [int(folder)] * len(image_files_of_folder)
+
+        def read(image_path, box_type):
+            image = tf.io.decode_image(tf.io.read_file(image_path), channels=1, expand_animations=False)
+            image = tf.cast(image, tf.float32) / 255.0
+            return image, tf.one_hot(box_type, len(folders))
+
+        dataset = tf.data.Dataset.from_tensor_slices((image_paths, box_types))
+        dataset = dataset.map(read, num_parallel_calls=num_parallel_calls)
+
+        if cache is not None:
+            dataset = dataset.cache(cache)
+
+        dataset = dataset.shuffle(shuffle_buffer_size, seed=seed, reshuffle_each_iteration=True).repeat()
+        return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
     @staticmethod
     def generator(folder_images, batch_size=64, image_ext=(".jpg", ".png")):
         import numpy as np
@@ -140,6 +424,8 @@ class IdentificationNetwork:
             for image_file_of_folder in image_files_of_folder:
                 image_files_and_type += [(folder + "/" + image_file_of_folder, int(folder))]
 
+        number_of_classes = len(os.listdir(folder_images))
+
         while True:
             batch_files = random.choices(image_files_and_type, k=batch_size)
             batch_input = []
@@ -149,7 +435,7 @@ class IdentificationNetwork:
                 image_file, box_type = batch_file
 
                 inp = np.expand_dims(cv2.imread(folder_images + image_file, 0), axis=-1)
-                output = np.zeros(shape=(len(os.listdir(folder_images))))
+                output = np.zeros(shape=(number_of_classes))
                 output[box_type] = 1.0
 
                 if np.isnan(np.sum(inp)) or np.isnan(np.sum(output)):
@@ -164,3 +450,194 @@ class IdentificationNetwork:
             batch_y = np.array(batch_output)
 
             yield batch_x, batch_y
+
+    @staticmethod
+    def load_images_and_labels(folder_images, image_ext=(".jpg", ".png"), cache_path=None, workers=8):
+        """Reads all the images of a folder made like the one of generator into one contiguous uint8 array of shape
+        N*height*width and their classes into an array of N labels. If cache_path (.npy) is given the arrays are saved
+        there, with the labels in the same path ending with "_labels.npy", and loaded from it the next time. The number
+        of files, the newest modification time and a hash of the files of the folder are saved in the same path ending
+        with "_source.json", the cache is made again when they do not match the folder anymore"""
+        from concurrent.futures import ThreadPoolExecutor
+        import numpy as np
+        import hashlib
+        import json
+        import cv2
+        import os
+
+        image_paths = []
+        labels = []
+        for folder in sorted(os.listdir(folder_images)):
+            image_files_of_folder = sorted(x for x in os.listdir(folder_images + folder) if x.endswith(image_ext))
+            image_paths += [folder_images + folder + "/" + x for x in image_files_of_folder]
+            labels += [int(folder)] * len(image_files_of_folder)
+
+        if cache_path is not None:
+            labels_cache_path = os.path.splitext(cache_path)[0] + "_labels.npy"
+            source_cache_path = os.path.splitext(cache_path)[0] + "_source.json"
+
+            #Name, size and modification time of every file, so that any regenerated image changes the hash
+            file_stats = [os.stat(image_path) for image_path in image_paths]
+            file_list = "\n".join(f"{os.path.relpath(image_path, folder_images)} {stat.st_size} {stat.st_mtime_ns}"
+                                   for image_path, stat in zip(image_paths, file_stats))
+            source = {"files": len(image_paths),
+                      "newest_mtime_ns": max((stat.st_mtime_ns for stat in file_stats), default=0),
+                      "hash": hashlib.sha1(file_list.encode("utf-8")).hexdigest()}
+
+            if os.path.isfile(cache_path) and os.path.isfile(labels_cache_path) and os.path.isfile(source_cache_path):
+                with open(source_cache_path, "r") as f:
+                    if json.load(f) == source:
+                        return np.load(cache_path), np.load(labels_cache_path)
+
+        assert len(image_paths) > 0, f"No images found in {folder_images}..."
+
+        #The first image gives the shape of the array, the others are decoded by the threads straight into it
+        first_image = cv2.imread(image_paths[0], 0)
+        images = np.empty((len(image_paths),) + first_image.shape, dtype=np.uint8)
+        images[0] = first_image
+
+        def read(i):
+            images[i] = cv2.imread(image_paths[i], 0)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(read, range(1, len(image_paths))))
+
+        labels = np.array(labels, dtype=np.int32)
+
+        if cache_path is not None:
+            np.save(cache_path, images)
+            np.save(labels_cache_path, labels)
+
+            #Written last, so that a cache saved only in part is never used
+            with open(source_cache_path, "w") as f:
+                json.dump(source, f)
+
+        return images, labels
+
+    @staticmethod
+    def in_memory_generators(folder_images, batch_size=64, image_ext=(".jpg", ".png"), cache_folder=None, seed=None):
+        """Get a list of in_memory_generator, one for each type of object, cached in cache_folder if given"""
+        import os
+
+        if cache_folder is not None:
+            os.makedirs(cache_folder, exist_ok=True)
+
+        generators = []
+        for i in range(len(os.listdir(folder_images))):
+            generators.append(IdentificationNetwork.in_memory_generator(folder_images + str(i) + "/", batch_size, image_ext,
+                                                                        cache_path=cache_folder + f"identification_{i}.npy" if cache_folder is not None else None,
+                                                                        seed=seed))
+        return generators
+
+    @staticmethod
+    def in_memory_generator(folder_images, batch_size=64, image_ext=(".jpg", ".png"), cache_path=None, number_of_classes=None, seed=None):
+        """Like generator, but all the images are read once with load_images_and_labels and the batches are drawn from
+        memory. number_of_classes is the size of the one hot labels (the number of folders if None)"""
+        import numpy as np
+        import os
+
+        images, labels = IdentificationNetwork.load_images_and_labels(folder_images, image_ext, cache_path)
+        number_of_classes = len(os.listdir(folder_images)) if number_of_classes is None else number_of_classes
+
+        one_hot = np.eye(number_of_classes, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+
+        while True:
+            batch_indices = rng.integers(0, len(images), size=batch_size)
+
+            batch_x = images[batch_indices, ..., np.newaxis].astype(np.float32) / 255.0
+            batch_y = one_hot[labels[batch_indices]]
+
+            yield batch_x, batch_y
+
+    @staticmethod
+    def multi_head_generator(folder_images, batch_size=64, image_ext=(".jpg", ".png")):
+        """Generator for the multi head model, each input is drawn from a random type (one folder for each type) and
+        only the head of that type gets a weight of 1.0"""
+        import numpy as np
+        import random
+        import cv2
+        import os
+
+        number_of_types = len(os.listdir(folder_images))
+
+        image_files_and_type_of_types = []
+        numbers_of_classes = []
+        for i in range(number_of_types):
+            folder_type = folder_images + str(i) + "/"
+
+            image_files_and_type = []
+            for folder in os.listdir(folder_type):
+                image_files_of_folder = [x for x in os.listdir(folder_type + folder) if x.endswith(image_ext)]
+                for image_file_of_folder in image_files_of_folder:
+                    image_files_and_type += [(str(i) + "/" + folder + "/" + image_file_of_folder, int(folder))]
+
+            image_files_and_type_of_types.append(image_files_and_type)
+            numbers_of_classes.append(len(os.listdir(folder_type)))
+
+        while True:
+            batch_input = []
+            batch_outputs = [[] for _ in range(number_of_types)]
+            batch_weights = [[] for _ in range(number_of_types)]
+
+            for _ in range(batch_size):
+                object_type = random.randrange(number_of_types)
+                image_file, box_type = random.choice(image_files_and_type_of_types[object_type])
+
+                inp = np.expand_dims(cv2.imread(folder_images + image_file, 0), axis=-1)
+
+                if np.isnan(np.sum(inp)):
+                    print("Found an NaN in input and/or output, skipping the file...")
+                    continue
+
+                inp = (inp / 255.0)
+                batch_input += [inp]
+
+                for i in range(number_of_types):
+                    output = np.zeros(shape=(numbers_of_classes[i]))
+                    if i == object_type:
+                        output[box_type] = 1.0
+                    batch_outputs[i] += [output]
+                    batch_weights[i] += [1.0 if i == object_type else 0.0]
+
+            batch_x = np.array(batch_input)
+            batch_y = tuple(np.array(x) for x in batch_outputs)
+            batch_w = tuple(np.array(x) for x in batch_weights)
+
+            yield batch_x, batch_y, batch_w
+
+    @staticmethod
+    def multi_head_generator_from_shards(folder_shards, batch_size=64, numbers_of_classes=None):
+        """Like multi_head_generator, but the images are read from a dataset packed by ShardWriter, where the group of
+        each sample is its type. numbers_of_classes are the classes of each head (max label + 1 of each group if None)"""
+        from src.ShardReader import ShardReader
+        import numpy as np
+        import random
+
+        shard_reader = ShardReader(folder_shards)
+        labels = shard_reader.get_index()["label"]
+
+        indices_of_types = [shard_reader.get_indices_of_group(group).tolist() for group in range(int(shard_reader.get_groups().max()) + 1)]
+        number_of_types = len(indices_of_types)
+
+        if numbers_of_classes is None:
+            numbers_of_classes = [int(labels[indices].max()) + 1 if len(indices) > 0 else 1 for indices in indices_of_types]
+
+        while True:
+            object_types = [random.randrange(number_of_types) for _ in range(batch_size)]
+            batch_indices = [random.choice(indices_of_types[object_type]) for object_type in object_types]
+
+            batch_x = np.expand_dims(np.array([shard_reader.read_image(i)[0] for i in batch_indices]), axis=-1) / 255.0
+
+            batch_outputs = []
+            batch_weights = []
+            for i in range(number_of_types):
+                is_of_type = np.array(object_types) == i
+
+                output = np.zeros(shape=(batch_size, numbers_of_classes[i]))
+                output[is_of_type, labels[batch_indices][is_of_type]] = 1.0
+
+                batch_outputs.append(output)
+                batch_weights.append(is_of_type.astype(np.float64))
+
+            yield batch_x, tuple(batch_outputs), tuple(batch_weights)
@@ -0,0 +1,37 @@
+from src.ShuffledSequence import ShuffledSequence
+
+
+class IdentificationSequence(ShuffledSequence):
+    """Sequence of the batches (batch_x, batch_y) of IdentificationNetwork.generator, read from a folder with one sub
+    folder of images for each class. It can be fed to fit with any number of workers (see ShuffledSequence).
+    number_of_classes is the size of the one hot labels (the number of folders if None)"""
+
+    def __init__(self, folder_images, batch_size=64, image_ext=(".jpg", ".png"), number_of_classes=None,
+                 number_of_batches=None, seed=None):
+        import numpy as np
+        import os
+
+        self.__folder_images = folder_images
+
+        #Sorted, so that the same seed gives the same batches on any file system
+        self.__image_files = []
+        labels = []
+        for folder in sorted(os.listdir(folder_images), key=int):
+            image_files_of_folder = sorted(x for x in os.listdir(folder_images + folder) if x.endswith(image_ext))
+            self.__image_files += [folder + "/" + x for x in image_files_of_folder]
+            labels += [int(folder)] * len(image_files_of_folder)
+        self.__labels = np.array(labels, dtype=np.int64)
+
+        number_of_classes = len(os.listdir(folder_images)) if number_of_classes is None else number_of_classes
+        self.__one_hot = np.eye(number_of_classes, dtype=np.float32)
+
+        super().__init__(len(self.__image_files), batch_size, number_of_batches, seed)
+
+    def get_batch(self, sample_indices):
+        import numpy as np
+        import cv2
+
+        batch_x = np.array([cv2.imread(self.__folder_images + self.__image_files[i], 0) for i in sample_indices])
+        batch_y = self.__one_hot[self.__labels[sample_indices]]
+
+        return np.expand_dims(batch_x, axis=-1).astype(np.float32) / 255.0, batch_y
@@ -0,0 +1,109 @@
+class ImageHeaderUtil:
+    """Reads the size of PNG and JPEG images from their headers, without decoding the pixels"""
+
+    PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+    JPEG_SOI = b"\xff\xd8"
+
+    #Start of frame markers, the ones that hold the size of a JPEG image
+    JPEG_SOF_MARKERS = (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF)
+
+    #Markers without a length (TEM, RST0-RST7)
+    JPEG_STANDALONE_MARKERS = (0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7)
+
+    @staticmethod
+    def get_image_size(image_path):
+        """Returns (width, height) of an image as cv2.imread would load it, read from the header of PNG and JPEG
+        files (JPEG EXIF orientations that swap the sides included) or by decoding any other image"""
+        with open(image_path, "rb") as f:
+            signature = f.read(8)
+            f.seek(0)
+
+            image_size = None
+            if signature == ImageHeaderUtil.PNG_SIGNATURE:
+                image_size = ImageHeaderUtil.__get_png_size(f)
+            elif signature[:2] == ImageHeaderUtil.JPEG_SOI:
+                image_size = ImageHeaderUtil.__get_jpeg_size(f)
+
+        if image_size is None:
+            import cv2
+
+            image = cv2.imread(image_path)
+            assert image is not None, f"The image {image_path} could not be read..."
+            image_size = (image.shape[1], image.shape[0])
+        return image_size
+
+    @staticmethod
+    def __get_png_size(f):
+        """The first chunk of a PNG is IHDR, which starts with the width and the height"""
+        import struct
+
+        header = f.read(24)
+        if len(header) < 24 or header[12:16] != b"IHDR":
+            return None
+        return struct.unpack(">II", header[16:24])
+
+    @staticmethod
+    def __get_jpeg_size(f):
+        import struct
+
+        f.read(2)
+
+        swap_sides = False
+        while True:
+            byte = f.read(1)
+            #Skip the fill bytes before a marker
+            while byte == b"\xff":
+                byte = f.read(1)
+                if byte != b"\xff":
+                    break
+            if len(byte) == 0:
+                return None
+
+            marker = byte[0]
+            if marker in ImageHeaderUtil.JPEG_STANDALONE_MARKERS or marker == 0xFF:
+                continue
+
+            length_bytes = f.read(2)
+            if len(length_bytes) < 2:
+                return None
+            length = struct.unpack(">H", length_bytes)[0]
+
+            if marker in ImageHeaderUtil.JPEG_SOF_MARKERS:
+                segment = f.read(5)
+                if len(segment) < 5:
+                    return None
+                height, width = struct.unpack(">HH", segment[1:5])
+                return (height, width) if swap_sides else (width, height)
+
+            segment = f.read(length - 2)
+
+            #APP1 may hold the EXIF orientation, that cv2 applies when reading the image
+            if marker == 0xE1 and segment[:6] == b"Exif\x00\x00":
+                swap_sides = ImageHeaderUtil.__get_exif_orientation(segment[6:]) in (5, 6, 7, 8)
+
+            #Start of scan, the size should have been found before
+            if marker == 0xDA:
+                return None
+
+    @staticmethod
+    def __get_exif_orientation(tiff):
+        """Returns the orientation tag of the first IFD of an EXIF block (1 if missing)"""
+        import struct
+
+        if len(tiff) < 8 or tiff[:2] not in (b"II", b"MM"):
+            return 1
+        byte_order = "<" if tiff[:2] == b"II" else ">"
+
+        ifd_offset = struct.unpack(byte_order + "I", tiff[4:8])[0]
+        if ifd_offset + 2 > len(tiff):
+            return 1
+
+        number_of_entries = struct.unpack(byte_order + "H", tiff[ifd_offset:ifd_offset + 2])[0]
+        for i in range(number_of_entries):
+            entry_offset = ifd_offset + 2 + i * 12
+            if entry_offset + 12 > len(tiff):
+                break
+            tag, __, __ = struct.unpack(byte_order + "HHI", tiff[entry_offset:entry_offset + 8])
+            if tag == 0x0112:
+                return struct.unpack(byte_order + "H", tiff[entry_offset + 8:entry_offset + 10])[0]
+        return 1
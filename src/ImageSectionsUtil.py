@@ -0,0 +1,63 @@
+class ImageSectionsUtil:
+    @staticmethod
+    def to_image_sections(images, boxes_of_images, number_of_types=6, image_section_size=(50, 50), dtype="float32"):
+        """Returns a tuple (image_sections, image_indices, box_types, boxes_data) where image_sections is an array of
+        shape K*height*width*1 with the resized sections of every box of the given types, in all the grayscale images (cv2).
+        image_indices and box_types are the index of the image and the type of each section while boxes_data is an
+        array of shape K*4 with the (x, y, width, height) of each section, where x and y are centered.
+        Sections are sorted by image, then by type, then by the order of the boxes.
+        This is the only place where the pixels are normalized to [0.0, 1.0]"""
+
+        import numpy as np
+        import cv2
+        from src.CircuitObject import CircuitObject
+        from src.Boxes import Boxes
+
+        image_section_width, image_section_height = image_section_size
+
+        #Boxes of all the images at once, as arrays
+        boxes_data = [Boxes().get_boxes_data()] + [boxes.get_boxes_data() for boxes in boxes_of_images]
+        box_classes, box_xs, box_ys, box_widths, box_heights = [np.concatenate(x) for x in zip(*boxes_data)]
+        image_indices = np.concatenate([np.zeros(0, dtype=np.int64)] + [np.full(len(boxes), image_index, dtype=np.int64) for image_index, boxes in enumerate(boxes_of_images)])
+
+        rectangles = np.stack((box_xs - box_widths / 2, box_ys - box_heights / 2, box_widths, box_heights), axis=-1)
+
+        #Type of each box class, from a lookup of all the box classes
+        types_of_box_classes = np.array([CircuitObject.get_type_from_box_class(x) for x in range(CircuitObject.SOMETHING + 1)], dtype=np.int64)
+        box_types = types_of_box_classes[box_classes]
+
+        #Keep only the boxes of the given types, sorted by image and then by type
+        order = np.lexsort((np.arange(len(box_types)), box_types, image_indices))
+        order = order[box_types[order] < number_of_types]
+
+        rectangles = rectangles[order]
+        image_indices = image_indices[order]
+        box_types = box_types[order]
+
+        xs = np.maximum(0, rectangles[:, 0])
+        ys = np.maximum(0, rectangles[:, 1])
+        widths = rectangles[:, 2]
+        heights = rectangles[:, 3]
+
+        boxes_data = np.stack((xs + widths / 2, ys + heights / 2, widths, heights), axis=-1)
+
+        image_sections = np.zeros((len(order), image_section_height, image_section_width), dtype=dtype)
+
+        image_index_normalized = None
+        image_normalized = None
+        for k in range(len(order)):
+            #Normalize each image once, before taking its sections
+            if image_indices[k] != image_index_normalized:
+                image_index_normalized = image_indices[k]
+                image_normalized = images[image_index_normalized].astype(dtype) / 255.0
+
+            image_section = image_normalized[int(ys[k]): int(ys[k] + heights[k]), int(xs[k]): int(xs[k] + widths[k])]
+
+            #An empty section is left black
+            if image_section.size == 0:
+                continue
+
+            # Resize to match input size
+            image_sections[k] = cv2.resize(image_section, image_section_size)
+
+        return np.expand_dims(image_sections, axis=-1), image_indices, box_types, boxes_data
@@ -0,0 +1,21 @@
+from tensorflow.keras.utils import Sequence
+
+
+class JointSequence(Sequence):
+    """Sequence that joins the batches of many Sequences, the index-th batch is ((x_0, ..., x_n), (y_0, ..., y_n))
+    made of the index-th batches of each Sequence, for models with one input and one output for each of them"""
+
+    def __init__(self, sequences):
+        super().__init__()
+        self.__sequences = tuple(sequences)
+
+    def __len__(self):
+        return min(len(sequence) for sequence in self.__sequences)
+
+    def __getitem__(self, index):
+        batches = [sequence[index] for sequence in self.__sequences]
+        return tuple(batch_x for batch_x, __ in batches), tuple(batch_y for __, batch_y in batches)
+
+    def on_epoch_end(self):
+        for sequence in self.__sequences:
+            sequence.on_epoch_end()
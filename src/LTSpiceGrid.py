@@ -105,22 +105,16 @@ class LTSpiceGrid:
 
     def to_boxes(self, image_width, image_height, subdivisions=13):
         from src.Boxes import Boxes
-        from src.Box import Box
-
-        boxes = Boxes()
 
         #Get the size of each grid cell
         step = image_width / subdivisions
 
-        for component in self.__components:
-            box_class = component.get_component_class()
-            box_x = component.get_component_x() * step
-            box_y = component.get_component_y() * step
-            box_width = step
-            box_height = step
+        box_classes = [component.get_component_class() for component in self.__components]
+        box_xs = [component.get_component_x() * step for component in self.__components]
+        box_ys = [component.get_component_y() * step for component in self.__components]
+        box_sizes = [step] * len(self.__components)
 
-            boxes.add_box(Box(box_class=box_class, x=box_x, y=box_y, width=box_width, height=box_height))
-        return boxes
+        return Boxes(box_classes, box_xs, box_ys, box_sizes, box_sizes)
 
     @staticmethod
     def from_boxes(boxes, image_width, image_height, subdivisions=13):
@@ -151,6 +145,12 @@ class LTSpiceGrid:
         from src.AugmentedImage import AugmentedImage
 
         image = AugmentedImage.image_from_file(image_path, grayscale=True)
+        return LTSpiceGrid.from_image_and_boxes(image, boxes, subdivisions)
+
+    @staticmethod
+    def from_image_and_boxes(image, boxes, subdivisions=13):
+        from src.AugmentedImage import AugmentedImage
+
         image_width = AugmentedImage.get_image_width(image)
         image_height = AugmentedImage.get_image_height(image)
 
@@ -163,11 +163,16 @@ class LTSpiceGrid:
                                       image_height=augmented_image.get_image_height(augmented_image.get_image()),
                                       subdivisions=subdivisions)
 
-    def to_file(self, file_path, subdivisions=13):
-        with open(file_path, "w") as f:
-            f.write("Version 4\nSHEET 1 {} {}\n".format(subdivisions * 80, subdivisions * 80))
+    def to_string(self, subdivisions=13):
+        """Returns the content of the .asc file as a string"""
+        to_string = "Version 4\nSHEET 1 {} {}\n".format(subdivisions * 80, subdivisions * 80)
+
+        strings = self.__get_lines_as_ltspice_strings() + self.__get_components_as_ltspice_strings()
 
-            strings = self.__get_lines_as_ltspice_strings() + self.__get_components_as_ltspice_strings()
+        for s in strings:
+            to_string += s + "\n"
+        return to_string
 
-            for s in strings:
-                f.write(s + "\n")
+    def to_file(self, file_path, subdivisions=13):
+        with open(file_path, "w") as f:
+            f.write(self.to_string(subdivisions))
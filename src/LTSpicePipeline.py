@@ -0,0 +1,144 @@
+class LTSpicePipeline:
+    """Class that converts images to LTSpice schematics (.asc) decoding each image only once"""
+
+    def __init__(self, net_tracking, net_identification, confidence=0.5, number_of_models=6, image_input_size=(50, 50), subdivisions=13):
+        self.__net_tracking = net_tracking
+        self.__net_identification = net_identification
+
+        self.__confidence = confidence
+        self.__number_of_models = number_of_models
+        self.__image_input_size = image_input_size
+        self.__subdivisions = subdivisions
+
+    def get_confidence(self):
+        return self.__confidence
+
+    def set_confidence(self, confidence):
+        self.__confidence = confidence
+
+    def get_subdivisions(self):
+        return self.__subdivisions
+
+    def predict_boxes_from_images(self, images, batch_size=None):
+        """Returns a list of identified Boxes, one for each grayscale image (cv2)"""
+        boxes_tracking = self.__net_tracking.predict_boxes_from_images(images, confidence=self.__confidence, batch_size=batch_size)
+
+        return self.__net_identification.predict_boxes_from_images_and_tracking_outputs(images,
+                                                                                        boxes_tracking,
+                                                                                        self.__number_of_models,
+                                                                                        self.__image_input_size)
+
+    def predict_ltspice_grids_from_images(self, images, batch_size=None):
+        """Returns a list of LTSpiceGrid, one for each grayscale image (cv2)"""
+        from src.LTSpiceGrid import LTSpiceGrid
+
+        boxes_identification = self.predict_boxes_from_images(images, batch_size=batch_size)
+
+        return [LTSpiceGrid.from_image_and_boxes(image, boxes, self.__subdivisions) for image, boxes in zip(images, boxes_identification)]
+
+    def predict_strings_from_images(self, images, batch_size=None):
+        """Returns a list of .asc contents, one for each grayscale image (cv2)"""
+        ltspice_grids = self.predict_ltspice_grids_from_images(images, batch_size=batch_size)
+        return [ltspice_grid.to_string(self.__subdivisions) for ltspice_grid in ltspice_grids]
+
+    def predict_string_from_image(self, image):
+        """Returns the .asc content from a grayscale image (cv2)"""
+        return self.predict_strings_from_images([image])[0]
+
+    def predict_strings_from_bytes(self, images_bytes, batch_size=None):
+        """Returns a list of .asc contents, one for each encoded image (ex. the content of a .png or .jpg file)"""
+        from src.AugmentedImage import AugmentedImage
+
+        images = [AugmentedImage.image_from_bytes(image_bytes, grayscale=True) for image_bytes in images_bytes]
+        return self.predict_strings_from_images(images, batch_size=batch_size)
+
+    def predict_string_from_bytes(self, image_bytes):
+        """Returns the .asc content from an encoded image (ex. the content of a .png or .jpg file)"""
+        return self.predict_strings_from_bytes([image_bytes])[0]
+
+    def predict_strings_from_files(self, image_paths, batch_size=None):
+        """Returns a list of .asc contents, one for each image path"""
+        from src.AugmentedImage import AugmentedImage
+
+        images = [AugmentedImage.image_from_file(image_path, grayscale=True) for image_path in image_paths]
+        return self.predict_strings_from_images(images, batch_size=batch_size)
+
+    def predict_string_from_file(self, image_path):
+        """Returns the .asc content from an image path"""
+        return self.predict_strings_from_files([image_path])[0]
+
+    def predict_files_to_files(self, image_paths, output_paths, batch_size=8, decode_workers=4, write_workers=4, queue_size=64):
+        """Predicts the images and writes their .asc files overlapping the decode, the inference and the writes:
+        a pool of threads decodes the images, the inference runs on batches of batch_size images and another pool
+        of threads writes the .asc files. At most queue_size images wait for the inference and at most queue_size
+        .asc files wait to be written. Yields the output paths, in the same order of the image paths, once written"""
+        import threading
+        import queue
+        from collections import deque
+        from concurrent.futures import ThreadPoolExecutor
+        from src.AugmentedImage import AugmentedImage
+
+        assert len(image_paths) == len(output_paths), "The number of image paths and output paths is different..."
+
+        decoded = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+
+        def put(item):
+            #Wait for a free slot (backpressure) unless the pipeline has been stopped
+            while not stop.is_set():
+                try:
+                    decoded.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def read(decode_pool):
+            for image_path, output_path in zip(image_paths, output_paths):
+                if not put((decode_pool.submit(AugmentedImage.image_from_file, image_path, True), output_path)):
+                    return
+            put(None)
+
+        def write(ltspice_grid, output_path):
+            LTSpicePipeline.string_to_file(ltspice_grid.to_string(self.__subdivisions), output_path)
+            return output_path
+
+        with ThreadPoolExecutor(max_workers=decode_workers) as decode_pool, ThreadPoolExecutor(max_workers=write_workers) as write_pool:
+            reader = threading.Thread(target=read, args=(decode_pool,), daemon=True)
+            reader.start()
+
+            writes = deque()
+            try:
+                done = False
+                while not done:
+                    #Futures are queued in order, so the batches keep the order of the image paths
+                    batch = []
+                    while len(batch) < batch_size:
+                        item = decoded.get()
+                        if item is None:
+                            done = True
+                            break
+                        batch.append(item)
+
+                    if len(batch) == 0:
+                        continue
+
+                    images = [future.result() for future, __ in batch]
+                    ltspice_grids = self.predict_ltspice_grids_from_images(images)
+
+                    for ltspice_grid, (__, output_path) in zip(ltspice_grids, batch):
+                        writes.append(write_pool.submit(write, ltspice_grid, output_path))
+
+                    while len(writes) > queue_size:
+                        yield writes.popleft().result()
+
+                while len(writes) > 0:
+                    yield writes.popleft().result()
+            finally:
+                stop.set()
+                reader.join()
+
+    @staticmethod
+    def string_to_file(string, file_path):
+        with open(file_path, "w") as f:
+            f.write(string)
@@ -0,0 +1,269 @@
+class LTSpiceServer:
+    """Class that keeps an LTSpicePipeline loaded and serves it over localhost HTTP or a Unix socket.
+    Concurrent requests are grouped in micro-batches of at most max_batch_size images, waiting at most
+    max_wait seconds (from the first request of the batch) for the batch to fill up.
+
+    Endpoints:
+        POST /asc   => body: encoded image (.png or .jpg), returns the .asc content
+        POST /boxes => body: encoded image (.png or .jpg), returns the boxes as YOLO formatted strings
+        GET /stats  => returns queue depth, batch and latency stats as JSON"""
+
+    def __init__(self, pipeline, max_batch_size=8, max_wait=0.01, number_of_latencies=1000):
+        import threading
+        import queue
+        from collections import deque
+
+        self.__pipeline = pipeline
+
+        self.__max_batch_size = max_batch_size
+        self.__max_wait = max_wait
+
+        self.__requests = queue.Queue()
+        self.__worker = None
+        self.__stop = threading.Event()
+
+        #Stats
+        self.__stats_lock = threading.Lock()
+        self.__number_of_requests = 0
+        self.__number_of_batches = 0
+        self.__latencies = deque(maxlen=number_of_latencies)
+        self.__batch_sizes = deque(maxlen=number_of_latencies)
+
+    def start(self):
+        """Starts the thread that runs the micro-batches"""
+        import threading
+
+        if self.__worker is not None:
+            return
+
+        self.__stop.clear()
+        self.__worker = threading.Thread(target=self.__run_batches, daemon=True)
+        self.__worker.start()
+
+    def stop(self):
+        if self.__worker is None:
+            return
+
+        self.__stop.set()
+        self.__worker.join()
+        self.__worker = None
+
+        #The requests still queued would never be answered
+        self.__cancel_requests()
+
+    def submit(self, image):
+        """Queues a grayscale image (cv2) and returns a Future of its identified Boxes"""
+        import time
+        import numpy as np
+        from concurrent.futures import Future
+
+        if not isinstance(image, np.ndarray) or image.ndim not in (2, 3):
+            raise ValueError("The image should be a grayscale image (cv2)...")
+
+        future = Future()
+        self.__requests.put((image, future, time.perf_counter()))
+
+        #Stopped while queuing, the worker will not take it
+        if self.__stop.is_set():
+            self.__cancel_requests()
+        return future
+
+    def predict_boxes_from_bytes(self, image_bytes):
+        """Returns the identified Boxes and the image decoded from an encoded image, waiting for its micro-batch"""
+        from src.AugmentedImage import AugmentedImage
+
+        image = AugmentedImage.image_from_bytes(image_bytes, grayscale=True)
+        if image is None:
+            raise ValueError("The image could not be decoded...")
+
+        return self.submit(image).result(), image
+
+    def predict_string_from_bytes(self, image_bytes):
+        """Returns the .asc content of an encoded image, waiting for its micro-batch"""
+        from src.LTSpiceGrid import LTSpiceGrid
+
+        boxes, image = self.predict_boxes_from_bytes(image_bytes)
+
+        subdivisions = self.__pipeline.get_subdivisions()
+        return LTSpiceGrid.from_image_and_boxes(image, boxes, subdivisions).to_string(subdivisions)
+
+    def predict_boxes_string_from_bytes(self, image_bytes):
+        """Returns the identified boxes, as YOLO formatted strings, of an encoded image, waiting for its micro-batch"""
+        from src.AugmentedImage import AugmentedImage
+
+        boxes, image = self.predict_boxes_from_bytes(image_bytes)
+
+        return boxes.to_string(AugmentedImage.get_image_width(image), AugmentedImage.get_image_height(image))
+
+    def get_stats(self):
+        """Returns a dict with the queue depth, the number of requests and batches, the mean batch size
+        and the p50/p95/p99 latencies (in milliseconds) of the last requests"""
+        import numpy as np
+
+        with self.__stats_lock:
+            latencies = np.array(self.__latencies) * 1000.0
+            batch_sizes = np.array(self.__batch_sizes)
+            stats = {
+                "queue_depth": self.__requests.qsize(),
+                "requests": self.__number_of_requests,
+                "batches": self.__number_of_batches,
+                "mean_batch_size": float(np.mean(batch_sizes)) if len(batch_sizes) > 0 else 0.0,
+            }
+
+        for percentile in (50, 95, 99):
+            stats[f"latency_p{percentile}_ms"] = float(np.percentile(latencies, percentile)) if len(latencies) > 0 else 0.0
+        return stats
+
+    def __get_batch(self):
+        """Returns the next micro-batch, waiting at most max_wait seconds after its first request"""
+        import queue
+        import time
+
+        try:
+            batch = [self.__requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.perf_counter() + self.__max_wait
+
+        while len(batch) < self.__max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.__requests.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def __run_batches(self):
+        while not self.__stop.is_set():
+            batch = self.__get_batch()
+
+            if len(batch) == 0:
+                continue
+
+            #Any error goes to the futures of the batch, so that the worker keeps running
+            try:
+                self.__run_batch(batch)
+            except Exception as e:
+                for __, future, __ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def __run_batch(self, batch):
+        import time
+
+        #Images of different sizes cannot go in the same forward pass
+        batches_by_size = {}
+        for request in batch:
+            batches_by_size.setdefault(request[0].shape, []).append(request)
+
+        for requests in batches_by_size.values():
+            try:
+                boxes_of_images = self.__pipeline.predict_boxes_from_images([image for image, __, __ in requests])
+            except Exception as e:
+                for __, future, __ in requests:
+                    future.set_exception(e)
+                continue
+
+            time_end = time.perf_counter()
+
+            with self.__stats_lock:
+                self.__number_of_requests += len(requests)
+                self.__number_of_batches += 1
+                self.__batch_sizes.append(len(requests))
+                for __, __, time_start in requests:
+                    self.__latencies.append(time_end - time_start)
+
+            for boxes, (__, future, __) in zip(boxes_of_images, requests):
+                future.set_result(boxes)
+
+    def __cancel_requests(self):
+        """Fails the futures of all the queued requests"""
+        import queue
+
+        while True:
+            try:
+                __, future, __ = self.__requests.get_nowait()
+            except queue.Empty:
+                return
+            if not future.done():
+                future.set_exception(RuntimeError("The server has been stopped..."))
+
+    def __get_handler(self):
+        """Returns the HTTP request handler class bound to this server"""
+        from http.server import BaseHTTPRequestHandler
+        import json
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def address_string(self):
+                #Unix sockets have no client address
+                return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+            def log_message(self, format, *args):
+                pass
+
+            def __respond(self, code, body, content_type="text/plain"):
+                body = body.encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/stats":
+                    self.__respond(200, json.dumps(server.get_stats()), content_type="application/json")
+                else:
+                    self.__respond(404, "Not found")
+
+            def do_POST(self):
+                if self.path not in ("/asc", "/boxes"):
+                    self.__respond(404, "Not found")
+                    return
+
+                image_bytes = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+                try:
+                    if self.path == "/asc":
+                        self.__respond(200, server.predict_string_from_bytes(image_bytes))
+                    else:
+                        self.__respond(200, server.predict_boxes_string_from_bytes(image_bytes))
+                except Exception as e:
+                    self.__respond(400, str(e))
+
+        return Handler
+
+    def serve_http(self, host="127.0.0.1", port=8080):
+        """Serves the endpoints over HTTP until interrupted"""
+        from http.server import ThreadingHTTPServer
+
+        with ThreadingHTTPServer((host, port), self.__get_handler()) as http_server:
+            self.__serve(http_server)
+
+    def serve_unix(self, socket_path):
+        """Serves the endpoints over HTTP on a Unix socket until interrupted"""
+        from socketserver import ThreadingUnixStreamServer
+        import os
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+        with ThreadingUnixStreamServer(socket_path, self.__get_handler()) as unix_server:
+            unix_server.daemon_threads = True
+            try:
+                self.__serve(unix_server)
+            finally:
+                os.remove(socket_path)
+
+    def __serve(self, server):
+        self.start()
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
@@ -0,0 +1,105 @@
+class ShardReader:
+    """Class that reads a dataset packed by ShardWriter, either by random access or streaming the shards in order.
+    It is safe to read from multiple threads"""
+
+    def __init__(self, folder_shards):
+        import numpy as np
+        import threading
+        import os
+        from src.ShardWriter import ShardWriter
+
+        self.__shard_files = {}
+        self.__shard_files_lock = threading.Lock()
+
+        self.__folder_shards = folder_shards
+        self.__index = np.load(os.path.join(folder_shards, ShardWriter.INDEX_NAME))
+
+    def __len__(self):
+        return len(self.__index)
+
+    def __del__(self):
+        self.close()
+
+    def close(self):
+        import os
+
+        #__init__ may have failed before creating them
+        shard_files_lock = getattr(self, "_ShardReader__shard_files_lock", None)
+        if shard_files_lock is None:
+            return
+
+        with shard_files_lock:
+            for shard_file in self.__shard_files.values():
+                os.close(shard_file)
+            self.__shard_files = {}
+
+    def get_index(self):
+        """Returns the index, a structured array with the fields of ShardWriter.INDEX_FORMAT"""
+        return self.__index
+
+    def get_indices_of_group(self, group):
+        import numpy as np
+        return np.nonzero(self.__index["group"] == group)[0]
+
+    def get_groups(self):
+        import numpy as np
+        return np.unique(self.__index["group"])
+
+    def read(self, i):
+        """Returns the tuple (image_bytes, label_bytes, group, label) of the i-th sample"""
+        import os
+
+        shard, offset, image_length, label_length, group, label = self.__index[i].tolist()
+
+        data = os.pread(self.__get_shard_file(shard), image_length + label_length, offset)
+        return data[:image_length], data[image_length:], group, label
+
+    def read_image(self, i, grayscale=True):
+        """Returns the tuple (image, label_bytes, group, label) of the i-th sample with the image decoded (cv2)"""
+        from src.AugmentedImage import AugmentedImage
+
+        image_bytes, label_bytes, group, label = self.read(i)
+        return AugmentedImage.image_from_bytes(image_bytes, grayscale=grayscale), label_bytes, group, label
+
+    def stream(self, indices=None, chunk_size=16 * 1024 * 1024):
+        """Yields (i, image_bytes, label_bytes, group, label) for the given samples (all if None) reading the shards
+        sequentially, in chunks of about chunk_size bytes. The samples are yielded in the order they are stored"""
+        import numpy as np
+        import os
+
+        indices = np.arange(len(self.__index)) if indices is None else np.asarray(indices)
+        indices = indices[np.lexsort((self.__index["offset"][indices], self.__index["shard"][indices]))]
+
+        start = 0
+        while start < len(indices):
+            #Read all the consecutive samples of the same shard that fit in a chunk
+            shard = self.__index["shard"][indices[start]]
+            chunk_start = int(self.__index["offset"][indices[start]])
+
+            end = start
+            while (end < len(indices) and self.__index["shard"][indices[end]] == shard and
+                   self.__index["offset"][indices[end]] - chunk_start < chunk_size):
+                end += 1
+
+            last = self.__index[indices[end - 1]]
+            chunk_end = int(last["offset"]) + int(last["image_length"]) + int(last["label_length"])
+            chunk = os.pread(self.__get_shard_file(shard), chunk_end - chunk_start, chunk_start)
+
+            for i in indices[start:end].tolist():
+                __, offset, image_length, label_length, group, label = self.__index[i].tolist()
+                offset -= chunk_start
+                yield i, chunk[offset:offset + image_length], chunk[offset + image_length:offset + image_length + label_length], group, label
+
+            start = end
+
+    def __get_shard_file(self, shard):
+        import os
+        from src.ShardWriter import ShardWriter
+
+        shard = int(shard)
+
+        #Checked and opened under the lock, so that concurrent first reads of a shard open it only once
+        with self.__shard_files_lock:
+            if shard not in self.__shard_files:
+                self.__shard_files[shard] = os.open(os.path.join(self.__folder_shards, ShardWriter.SHARD_NAME.format(shard)), os.O_RDONLY)
+            return self.__shard_files[shard]
@@ -0,0 +1,95 @@
+class ShardWriter:
+    """Class that packs a dataset in a folder of a few large shard files plus an index, instead of one small file
+    for each sample. Each sample is an encoded image, optional label bytes and two integers (group and label),
+    ex. the type and the class of an identification image. Read it with ShardReader.
+    Without a folder_output the samples are only kept in memory, to be taken with pop_records and written by another
+    ShardWriter with write_records (ex. when they are made by other processes)"""
+
+    SHARD_NAME = "shard_{:05d}.bin"
+    INDEX_NAME = "index.npy"
+    INDEX_FORMAT = [("shard", "<u4"), ("offset", "<u8"), ("image_length", "<u4"), ("label_length", "<u4"), ("group", "<i4"), ("label", "<i4")]
+
+    def __init__(self, folder_output=None, shard_size=256 * 1024 * 1024):
+        import os
+
+        if folder_output is not None:
+            os.makedirs(folder_output, exist_ok=True)
+
+        self.__folder_output = folder_output
+        self.__shard_size = shard_size
+
+        self.__shard = -1
+        self.__shard_file = None
+        self.__offset = 0
+
+        self.__index = []
+        self.__records = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.__index) + len(self.__records)
+
+    def write(self, image_bytes, label_bytes=b"", group=0, label=-1):
+        """Appends a sample to the current shard, starting a new shard when the current one is full"""
+        if self.__folder_output is None:
+            self.__records.append((image_bytes, label_bytes, group, label))
+            return
+
+        if self.__shard_file is None or self.__offset >= self.__shard_size:
+            self.__next_shard()
+
+        self.__shard_file.write(image_bytes)
+        self.__shard_file.write(label_bytes)
+
+        self.__index.append((self.__shard, self.__offset, len(image_bytes), len(label_bytes), group, label))
+        self.__offset += len(image_bytes) + len(label_bytes)
+
+    def write_image(self, image, image_ext=".png", label_bytes=b"", group=0, label=-1):
+        """Encodes a cv2 image with the given extension and appends it as a sample"""
+        import cv2
+
+        success, image_encoded = cv2.imencode(image_ext, image)
+        assert success, "The image could not be encoded..."
+
+        self.write(image_encoded.tobytes(), label_bytes=label_bytes, group=group, label=label)
+
+    def write_records(self, records):
+        """Appends the records (image_bytes, label_bytes, group, label) taken from another ShardWriter"""
+        for record in records:
+            self.write(*record)
+
+    def pop_records(self):
+        """Returns and forgets the records kept in memory"""
+        records = self.__records
+        self.__records = []
+        return records
+
+    def close(self):
+        """Closes the last shard and writes the index"""
+        import numpy as np
+        import os
+
+        if self.__folder_output is None:
+            return
+
+        if self.__shard_file is not None:
+            self.__shard_file.close()
+            self.__shard_file = None
+
+        index = np.array(self.__index, dtype=ShardWriter.INDEX_FORMAT)
+        np.save(os.path.join(self.__folder_output, ShardWriter.INDEX_NAME), index)
+
+    def __next_shard(self):
+        import os
+
+        if self.__shard_file is not None:
+            self.__shard_file.close()
+
+        self.__shard += 1
+        self.__offset = 0
+        self.__shard_file = open(os.path.join(self.__folder_output, ShardWriter.SHARD_NAME.format(self.__shard)), "wb")
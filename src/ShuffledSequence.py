@@ -0,0 +1,60 @@
+from tensorflow.keras.utils import Sequence
+
+
+class ShuffledSequence(Sequence):
+    """Base keras Sequence that serves the samples in batches of batch_size, going through a new random permutation
+    of all the samples every time it runs out of them. The samples of a batch depend only on the seed, the epoch and
+    the index of the batch, so keras can make the batches in any order with any number of threads or processes.
+    number_of_batches is the length of an epoch (all the samples once if None). Subclasses implement get_batch"""
+
+    def __init__(self, number_of_samples, batch_size=64, number_of_batches=None, seed=None):
+        import numpy as np
+
+        super().__init__()
+
+        assert number_of_samples > 0, "There are no samples for the sequence..."
+
+        self.__number_of_samples = number_of_samples
+        self.__batch_size = batch_size
+        self.__number_of_batches = -(-number_of_samples // batch_size) if number_of_batches is None else number_of_batches
+
+        #Drawn here if not given, so that every worker gets the same seed
+        self.__seed = int(np.random.SeedSequence().entropy % (2 ** 32)) if seed is None else seed
+        self.__epoch = 0
+
+    def __len__(self):
+        return self.__number_of_batches
+
+    def __getitem__(self, index):
+        return self.get_batch(self.get_sample_indices(index))
+
+    def on_epoch_end(self):
+        self.__epoch += 1
+
+    def get_seed(self):
+        return self.__seed
+
+    def get_epoch(self):
+        return self.__epoch
+
+    def set_epoch(self, epoch):
+        self.__epoch = epoch
+
+    def get_sample_indices(self, index):
+        """Returns the indices of the samples of a batch of the current epoch"""
+        import numpy as np
+
+        start = (self.__epoch * self.__number_of_batches + index) * self.__batch_size
+        positions = np.arange(start, start + self.__batch_size)
+
+        permutations = positions // self.__number_of_samples
+        sample_indices = np.empty(self.__batch_size, dtype=np.int64)
+        for permutation in np.unique(permutations):
+            mask = permutations == permutation
+            order = np.random.default_rng((self.__seed, int(permutation))).permutation(self.__number_of_samples)
+            sample_indices[mask] = order[positions[mask] % self.__number_of_samples]
+        return sample_indices
+
+    def get_batch(self, sample_indices):
+        """Returns (batch_x, batch_y) of the samples with the given indices"""
+        raise NotImplementedError
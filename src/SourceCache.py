@@ -0,0 +1,102 @@
+import threading
+
+
+class SourceCache:
+    """Least recently used cache of decoded source images and their parsed Boxes, bounded by the bytes of the arrays
+    it holds. get returns copies, so the transformations never change the cached originals. It is safe to use from
+    multiple threads. It is pickled by its max_bytes only and unpickled as the cache of the receiving process with
+    that max_bytes (see get_process_cache), so the tasks sent to the same worker process share one cache"""
+
+    __process_caches = {}
+    __process_caches_lock = threading.Lock()
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        from collections import OrderedDict
+
+        self.__max_bytes = max_bytes
+
+        self.__entries = OrderedDict()
+        self.__bytes = 0
+        self.__lock = threading.Lock()
+
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def __reduce__(self):
+        return SourceCache.get_process_cache, (self.__max_bytes,)
+
+    @staticmethod
+    def get_process_cache(max_bytes=256 * 1024 * 1024):
+        """Returns the cache of this process with the given max_bytes, made the first time it is asked for"""
+        with SourceCache.__process_caches_lock:
+            cache = SourceCache.__process_caches.get(max_bytes)
+            if cache is None:
+                cache = SourceCache(max_bytes)
+                SourceCache.__process_caches[max_bytes] = cache
+            return cache
+
+    def get(self, image_path, box_path, grayscale=True):
+        """Returns (image, boxes), copies of the decoded image (cv2) and of its Boxes, reading them if not cached"""
+        from src.AugmentedImage import AugmentedImage
+        from src.Boxes import Boxes
+
+        key = (image_path, box_path, grayscale)
+
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                self.__entries.move_to_end(key)
+                self.__hits += 1
+            else:
+                self.__misses += 1
+
+        if entry is None:
+            #Read outside of the lock, two threads may read the same files but the cache stays consistent
+            image = AugmentedImage.image_from_file(image_path, grayscale)
+            entry = (image, Boxes.from_file(box_path, AugmentedImage.get_image_width(image), AugmentedImage.get_image_height(image)))
+            self.__put(key, entry)
+
+        image, boxes = entry
+        return image.copy(), boxes.copy()
+
+    def get_stats(self):
+        """Returns a dictionary with the hits, misses, hit rate, evictions, entries and bytes of the cache"""
+        with self.__lock:
+            requests = self.__hits + self.__misses
+            return {"hits": self.__hits,
+                    "misses": self.__misses,
+                    "hit_rate": self.__hits / requests if requests > 0 else 0.0,
+                    "evictions": self.__evictions,
+                    "entries": len(self.__entries),
+                    "bytes": self.__bytes,
+                    "max_bytes": self.__max_bytes}
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__bytes = 0
+
+    def __put(self, key, entry):
+        entry_bytes = SourceCache.__get_entry_bytes(entry)
+
+        #An entry bigger than the whole cache is never kept
+        if entry_bytes > self.__max_bytes:
+            return
+
+        with self.__lock:
+            if key in self.__entries:
+                return
+
+            while self.__bytes + entry_bytes > self.__max_bytes:
+                __, evicted_entry = self.__entries.popitem(last=False)
+                self.__bytes -= SourceCache.__get_entry_bytes(evicted_entry)
+                self.__evictions += 1
+
+            self.__entries[key] = entry
+            self.__bytes += entry_bytes
+
+    @staticmethod
+    def __get_entry_bytes(entry):
+        image, boxes = entry
+        return image.nbytes + sum(x.nbytes for x in boxes.get_boxes_data())
@@ -0,0 +1,107 @@
+class TFLiteModel:
+    """Class that runs a TFLite model through the TFLite interpreter with the same predict of a keras model,
+    so that it can be given to TrackingNetwork and IdentificationNetwork in place of their keras models.
+    Only models with a single input and a single output are supported"""
+
+    def __init__(self, model_path=None, model_content=None, number_of_threads=None):
+        import tensorflow as tf
+
+        assert (model_path is None) != (model_content is None), "Give either the model path or the model content..."
+
+        self.__interpreter = tf.lite.Interpreter(model_path=model_path, model_content=model_content, num_threads=number_of_threads)
+        self.__interpreter.allocate_tensors()
+
+        assert len(self.__interpreter.get_input_details()) == 1, "Only models with a single input are supported..."
+        assert len(self.__interpreter.get_output_details()) == 1, "Only models with a single output are supported..."
+
+    def predict(self, batch_x, batch_size=None):
+        """Returns the output of the model for the whole batch, like keras' predict"""
+        import numpy as np
+
+        input_details = self.__interpreter.get_input_details()[0]
+
+        #Resize the input only when the batch shape changes
+        if tuple(input_details["shape"]) != batch_x.shape:
+            self.__interpreter.resize_tensor_input(input_details["index"], batch_x.shape)
+            self.__interpreter.allocate_tensors()
+            input_details = self.__interpreter.get_input_details()[0]
+
+        self.__interpreter.set_tensor(input_details["index"], TFLiteModel.__quantize(batch_x, input_details))
+        self.__interpreter.invoke()
+
+        output_details = self.__interpreter.get_output_details()[0]
+        return TFLiteModel.__dequantize(self.__interpreter.get_tensor(output_details["index"]), output_details)
+
+    @staticmethod
+    def __quantize(x, details):
+        import numpy as np
+
+        scale, zero_point = details["quantization"]
+
+        if scale == 0.0:
+            return x.astype(details["dtype"])
+
+        info = np.iinfo(details["dtype"])
+        return np.clip(np.round(x / scale + zero_point), info.min, info.max).astype(details["dtype"])
+
+    @staticmethod
+    def __dequantize(x, details):
+        import numpy as np
+
+        scale, zero_point = details["quantization"]
+
+        if scale == 0.0:
+            return x.astype(np.float32)
+        return (x.astype(np.float32) - zero_point) * scale
+
+    @staticmethod
+    def from_file(model_path, number_of_threads=None):
+        return TFLiteModel(model_path=model_path, number_of_threads=number_of_threads)
+
+    @staticmethod
+    def convert(model, representative_images=None, quantize=True):
+        """Returns the content of the .tflite file of a keras model. If quantize is True the weights and the
+        activations are quantized to int8, calibrated on the representative images (already normalized)"""
+        import tensorflow as tf
+        import numpy as np
+
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+        if quantize:
+            assert representative_images is not None and len(representative_images) > 0, "Quantization needs representative images..."
+
+            def representative_dataset():
+                for image in representative_images:
+                    yield [np.expand_dims(image, axis=0).astype(np.float32)]
+
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+        return converter.convert()
+
+    @staticmethod
+    def get_images_and_labels_from_folder(folder_images, number_of_images, image_exts=(".png", ".jpg"), seed=42):
+        """Returns a tuple (images, labels) of at most number_of_images random images (normalized, with the channel
+        axis) found in the folder and in its sub folders, the label of each image is the name of its sub folder"""
+        import numpy as np
+        import random
+        import cv2
+        import os
+
+        image_paths_and_labels = []
+        for root, __, files in sorted(os.walk(folder_images)):
+            label = os.path.basename(os.path.normpath(root))
+            image_paths_and_labels += [(os.path.join(root, x), label) for x in sorted(files) if x.endswith(image_exts)]
+
+        random.Random(seed).shuffle(image_paths_and_labels)
+        image_paths_and_labels = image_paths_and_labels[:number_of_images]
+
+        images = [np.expand_dims(cv2.imread(image_path, 0), axis=-1) / 255.0 for image_path, __ in image_paths_and_labels]
+        labels = [label for __, label in image_paths_and_labels]
+        return np.array(images, dtype=np.float32), labels
+
+    @staticmethod
+    def to_file(model_content, model_path):
+        with open(model_path, "wb") as f:
+            f.write(model_content)
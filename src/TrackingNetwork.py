@@ -1,15 +1,29 @@
 class TrackingNetwork:
     def __init__(self, model=None):
         self.__model = model
+        self.__compiled_model = None
 
     def get_model(self):
         return self.__model
 
     def set_model(self, model):
         self.__model = model
+        self.__compiled_model = None
 
-    def train_model(self, epochs, steps_per_epoch, generator, weights_save_path, weights_load_path=None, do_checkpoint=True, optimizer=None, loss_function=None):
+    def compile_predict(self, jit_compile=False, warm_up_batch_sizes=(1,)):
+        """Makes the predictions go through a tf.function with a fixed input signature (see CompiledModel),
+        warming it up on the given batch sizes. Weights loaded afterwards are still used"""
+        from src.CompiledModel import CompiledModel
+
+        self.__compiled_model = CompiledModel(self.__model, jit_compile=jit_compile)
+        self.__compiled_model.warm_up(warm_up_batch_sizes)
+
+    def train_model(self, epochs, steps_per_epoch, generator, weights_save_path, weights_load_path=None, do_checkpoint=True, optimizer=None, loss_function=None,
+                    workers=1, use_multiprocessing=False, max_queue_size=10):
+        """Train the model on a generator, a tf.data.Dataset or a Sequence. The batches of a Sequence are made by
+        workers threads (processes if use_multiprocessing) into a queue of max_queue_size batches"""
         from tensorflow.keras.callbacks import ModelCheckpoint
+        from src.Util import get_fit_arguments
 
         loss_function = TrackingNetwork.loss_function if loss_function is None else loss_function
         optimizer = TrackingNetwork.optimizer() if optimizer is None else optimizer
@@ -28,11 +42,12 @@ class TrackingNetwork:
         else:
             checkpoint = None
 
-        self.__model.fit_generator(generator=generator,
-                                   steps_per_epoch=steps_per_epoch,
-                                   epochs=epochs,
-                                   callbacks=checkpoint,
-                                   verbose=1)
+        self.__model.fit(generator,
+                         steps_per_epoch=steps_per_epoch,
+                         epochs=epochs,
+                         callbacks=checkpoint,
+                         verbose=1,
+                         **get_fit_arguments(self.__model, generator, workers, use_multiprocessing, max_queue_size))
 
         self.__model.save_weights(filepath=weights_save_path)
 
@@ -43,24 +58,51 @@ class TrackingNetwork:
             self.__model.load_weights(weights_load_path, by_name=True)
 
     def predict_boxes_from_file(self, image_path, confidence=0.5):
+        return self.predict_boxes_from_files([image_path], confidence=confidence)[0]
+
+    def predict_boxes_from_files(self, image_paths, confidence=0.5, batch_size=None):
+        """Returns a list of Boxes, one for each image path, running a single forward pass on all the images"""
+        from src.AugmentedImage import AugmentedImage
+
+        images = [AugmentedImage.image_from_file(image_path, grayscale=True) for image_path in image_paths]
+        return self.predict_boxes_from_images(images, confidence=confidence, batch_size=batch_size)
+
+    def predict_boxes_from_images(self, images, confidence=0.5, batch_size=None):
+        """Returns a list of Boxes, one for each grayscale image (cv2), running a single forward pass on all the images"""
         from src.AugmentedImage import AugmentedImage
         from src.GridBoxesUtil import GridBoxesUtil
+
+        if len(images) == 0:
+            return []
+
+        image_width = AugmentedImage.get_image_width(images[0])
+        image_height = AugmentedImage.get_image_height(images[0])
+
+        grids = self.predict_grids_from_images(images, batch_size=batch_size)
+        subdivisions = grids.shape[1]
+
+        return GridBoxesUtil.to_boxes_batch(grids,
+                                            image_width,
+                                            image_height,
+                                            subdivisions,
+                                            confidence)
+
+    def predict_grids_from_images(self, images, batch_size=None):
+        """Returns the grids predicted for the grayscale images (cv2), that must all have the same size"""
         import numpy as np
 
-        image = AugmentedImage.image_from_file(image_path, grayscale=True) / 255.0
-        batch_x = np.expand_dims(image, axis=0)
+        image_height, image_width = images[0].shape[0:2]
+
+        for image in images:
+            assert image.shape[0:2] == (image_height, image_width), "Images in the same batch must have the same size..."
+
+        batch_x = np.array(images) / 255.0
 
         if len(batch_x.shape) == 3:
             batch_x = np.expand_dims(batch_x, axis=-1)
 
-        grid = self.__model.predict(batch_x, batch_size=None)
-        subdivisions = grid.shape[1]
-
-        return GridBoxesUtil.to_boxes(grid[0],
-                                      AugmentedImage.get_image_width(image),
-                                      AugmentedImage.get_image_height(image),
-                                      subdivisions,
-                                      confidence)
+        model = self.__model if self.__compiled_model is None else self.__compiled_model
+        return model.predict(batch_x, batch_size=batch_size)
 
     @staticmethod
     def optimizer(lr=0.001, amsgrad=True):
@@ -130,7 +172,7 @@ class TrackingNetwork:
         return K.mean(K.equal(y_true_class, y_pred_class))
 
     @staticmethod
-    def generator(folder_images, folder_grids, batch_size=64, image_exts=(".png", ".jpg"), grid_ext=".txt"):
+    def generator(folder_images, folder_grids, batch_size=64, image_exts=(".png", ".jpg"), grid_ext=".grid"):
         from src.GridBoxesUtil import GridBoxesUtil
         import numpy as np
         import random
@@ -144,13 +186,15 @@ class TrackingNetwork:
         while True:
             batch_files = random.choices(images_and_grids_file_names, k=batch_size)
             batch_input = []
+
+            #Grids of the whole batch are read at once
+            batch_outputs = GridBoxesUtil.to_grids_from_any_files([folder_grids + grid_file for __, grid_file in batch_files])
             batch_output = []
 
-            for batch_file in batch_files:
+            for batch_file, output in zip(batch_files, batch_outputs):
                 image_file, grid_file = batch_file
 
                 inp = np.expand_dims(cv2.imread(folder_images + image_file, 0), axis=-1)
-                output = GridBoxesUtil.to_grid_from_file(folder_grids + grid_file)
 
                 if np.isnan(np.sum(inp)) or np.isnan(np.sum(output)):
                     print("Found an NaN in input and/or output, skipping the file...")
@@ -164,3 +208,147 @@ class TrackingNetwork:
             batch_y = np.array(batch_output)
 
             yield batch_x, batch_y
+
+    @staticmethod
+    def generator_from_shards(folder_shards, batch_size=64):
+        """Like generator, but the images and their binary grids are read from a dataset packed by ShardWriter"""
+        from src.GridBoxesUtil import GridBoxesUtil
+        from src.ShardReader import ShardReader
+        import numpy as np
+        import random
+
+        shard_reader = ShardReader(folder_shards)
+        indices = range(len(shard_reader))
+
+        while True:
+            batch_samples = [shard_reader.read_image(i) for i in random.choices(indices, k=batch_size)]
+
+            batch_x = np.expand_dims(np.array([image for image, __, __, __ in batch_samples]), axis=-1) / 255.0
+            batch_y = GridBoxesUtil.to_grids_from_binary_bytes([grid_bytes for __, grid_bytes, __, __ in batch_samples])
+
+            yield batch_x, batch_y
+
+    @staticmethod
+    def augmentation_generator(generator_augmented_images, batch_size=64, image_size=(416, 416), subdivisions=13, information_loss_checker_method=None,
+                               workers=4, prefetch=None, start_index=0):
+        """Endless generator of batches like the ones of generator, made on the fly from the labeled images of a
+        GeneratorAugmentedImages by workers processes (in this process if 0), with nothing written to disk.
+        The k-th batch holds the augmented images of the indices from start_index + k * batch_size, so the stream is the
+        same for any number of workers. prefetch (2 * workers if None) is the number of batches made in advance"""
+        from concurrent.futures import ProcessPoolExecutor
+        from collections import deque
+        import numpy as np
+
+        images_and_boxes_file_names = generator_augmented_images.get_images_and_boxes_file_names()
+
+        def batch_indices(k):
+            return range(start_index + k * batch_size, start_index + (k + 1) * batch_size)
+
+        if workers == 0:
+            k = 0
+            while True:
+                batch_x, batch_y = TrackingNetwork.augmentation_batch(generator_augmented_images, images_and_boxes_file_names, batch_indices(k),
+                                                                      image_size, subdivisions, information_loss_checker_method)
+                k += 1
+                yield np.expand_dims(batch_x, axis=-1) / 255.0, batch_y
+
+        prefetch = 2 * workers if prefetch is None else prefetch
+
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = deque()
+            k = 0
+            while True:
+                while len(futures) < prefetch:
+                    futures.append(executor.submit(TrackingNetwork.augmentation_batch, generator_augmented_images, images_and_boxes_file_names,
+                                                   batch_indices(k), image_size, subdivisions, information_loss_checker_method))
+                    k += 1
+
+                #The images travel between the processes as uint8 and are normalized here
+                batch_x, batch_y = futures.popleft().result()
+                yield np.expand_dims(batch_x, axis=-1) / 255.0, batch_y
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def augmentation_batch(generator_augmented_images, images_and_boxes_file_names, indices, image_size=(416, 416), subdivisions=13, information_loss_checker_method=None):
+        """Returns (batch_x, batch_y) of the augmented images (uint8, without the channel axis) of the given indices
+        and their grids. The images are resized to image_size and their boxes scaled with them, like AugmentedImage.to_files
+        does, before making the grids. An index whose boxes collide in the grid is augmented again with its next random values"""
+        from src.GridBoxesUtil import GridBoxesUtil
+        from src.AugmentedImage import AugmentedImage
+        from src.Boxes import Boxes
+        import numpy as np
+        import cv2
+
+        batch_x = np.empty((len(indices), image_size[1], image_size[0]), dtype=np.uint8)
+        batch_y = []
+
+        for i, index in enumerate(indices):
+            rng = generator_augmented_images.get_random(index)
+
+            grid = None
+            while grid is None:
+                augmented_image, __, __ = generator_augmented_images.augment(rng, images_and_boxes_file_names, information_loss_checker_method)
+
+                image = augmented_image.get_image()
+                scale_x = image_size[0] / AugmentedImage.get_image_width(image)
+                scale_y = image_size[1] / AugmentedImage.get_image_height(image)
+                image = cv2.resize(image, image_size, interpolation=cv2.INTER_AREA)
+
+                box_classes, xs, ys, widths, heights = augmented_image.get_boxes().get_boxes_data()
+                boxes = Boxes(box_classes, xs * scale_x, ys * scale_y, widths * scale_x, heights * scale_y)
+
+                grid = GridBoxesUtil.to_grid(image, boxes, subdivisions=subdivisions)
+
+            batch_x[i] = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            batch_y.append(grid)
+
+        return batch_x, np.array(batch_y, dtype=np.float32)
+
+    @staticmethod
+    def sequence(folder_images, folder_grids, batch_size=64, image_exts=(".png", ".jpg"), grid_ext=".grid", number_of_batches=None, seed=None):
+        """Returns a TrackingSequence of batches like the ones of generator, that train_model can make with many workers"""
+        from src.TrackingSequence import TrackingSequence
+        return TrackingSequence(folder_images, folder_grids, batch_size, image_exts, grid_ext, number_of_batches, seed)
+
+    @staticmethod
+    def dataset(folder_images, folder_grids, batch_size=64, image_exts=(".png", ".jpg"), grid_ext=".grid", subdivisions=13,
+                num_parallel_calls=None, shuffle_buffer_size=1024, cache=None, seed=None):
+        """Returns an endless tf.data.Dataset of batches (batch_x, batch_y) like the ones of generator, where the files
+        are read and parsed in parallel by num_parallel_calls calls (AUTOTUNE if None), shuffled from a buffer of
+        shuffle_buffer_size samples and prefetched. cache can be "" (in memory) or a file path, None disables it"""
+        import tensorflow as tf
+        from src.GridBoxesUtil import GridBoxesUtil
+        from src.CircuitObject import CircuitObject
+
+        num_parallel_calls = tf.data.AUTOTUNE if num_parallel_calls is None else num_parallel_calls
+
+        images_and_grids_file_names = GridBoxesUtil.get_images_and_grids_file_names_from_folder(folder_images,
+                                                                                                folder_grids,
+                                                                                                image_exts=image_exts,
+                                                                                                grid_ext=grid_ext)
+
+        image_paths = [folder_images + image_file for image_file, __ in images_and_grids_file_names]
+        grid_paths = [folder_grids + grid_file for __, grid_file in images_and_grids_file_names]
+
+        def read(image_path, grid_path):
+            image = tf.io.decode_image(tf.io.read_file(image_path), channels=1, expand_animations=False)
+            image = tf.cast(image, tf.float32) / 255.0
+
+            if grid_ext == GridBoxesUtil.BINARY_EXT:
+                grid = tf.numpy_function(lambda x: GridBoxesUtil.to_grids_from_binary_bytes([x])[0], [tf.io.read_file(grid_path)], tf.float32)
+            else:
+                #Text grids are saved with np.savetxt, one value for each line
+                grid = tf.strings.to_number(tf.strings.split(tf.strings.strip(tf.io.read_file(grid_path)), "\n"), out_type=tf.float32)
+            grid = tf.reshape(grid, (subdivisions, subdivisions, 5 + CircuitObject.NUMBER_OF_CLASSES))
+            return image, grid
+
+        dataset = tf.data.Dataset.from_tensor_slices((image_paths, grid_paths))
+        dataset = dataset.map(read, num_parallel_calls=num_parallel_calls)
+
+        if cache is not None:
+            dataset = dataset.cache(cache)
+
+        dataset = dataset.shuffle(shuffle_buffer_size, seed=seed, reshuffle_each_iteration=True).repeat()
+        return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,33 @@
+from src.ShuffledSequence import ShuffledSequence
+
+
+class TrackingSequence(ShuffledSequence):
+    """Sequence of the batches (batch_x, batch_y) of TrackingNetwork.generator, read from the images and grids of the
+    folders. It can be fed to fit with any number of workers (see ShuffledSequence)"""
+
+    def __init__(self, folder_images, folder_grids, batch_size=64, image_exts=(".png", ".jpg"), grid_ext=".grid",
+                 number_of_batches=None, seed=None):
+        from src.GridBoxesUtil import GridBoxesUtil
+
+        self.__folder_images = folder_images
+        self.__folder_grids = folder_grids
+
+        #Sorted, so that the same seed gives the same batches on any file system
+        self.__images_and_grids_file_names = sorted(GridBoxesUtil.get_images_and_grids_file_names_from_folder(folder_images,
+                                                                                                              folder_grids,
+                                                                                                              image_exts=image_exts,
+                                                                                                              grid_ext=grid_ext))
+
+        super().__init__(len(self.__images_and_grids_file_names), batch_size, number_of_batches, seed)
+
+    def get_batch(self, sample_indices):
+        from src.GridBoxesUtil import GridBoxesUtil
+        import numpy as np
+        import cv2
+
+        batch_files = [self.__images_and_grids_file_names[i] for i in sample_indices]
+
+        batch_x = np.array([cv2.imread(self.__folder_images + image_file, 0) for image_file, __ in batch_files])
+        batch_y = GridBoxesUtil.to_grids_from_any_files([self.__folder_grids + grid_file for __, grid_file in batch_files])
+
+        return np.expand_dims(batch_x, axis=-1).astype(np.float32) / 255.0, batch_y
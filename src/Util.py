@@ -6,3 +6,22 @@ def get_fixed_path(path, replace_backslash=False, add_backslash=False):
         if not path.endswith("/"):
             path += "/"
     return path
+
+
+def get_fit_arguments(model, data, workers=1, use_multiprocessing=False, max_queue_size=10):
+    """Returns the keyword arguments of model.fit that make keras prepare the batches of a Sequence with workers
+    threads (processes if use_multiprocessing) and a queue of max_queue_size batches. Keras 3 takes them from the
+    Sequence itself, so there they are set on data. Plain generators are not safe to share, so they get none"""
+    import inspect
+    from tensorflow.keras.utils import Sequence
+
+    if not isinstance(data, Sequence):
+        return {}
+
+    if "workers" in inspect.signature(model.fit).parameters:
+        return {"workers": workers, "use_multiprocessing": use_multiprocessing, "max_queue_size": max_queue_size}
+
+    data.workers = workers
+    data.use_multiprocessing = use_multiprocessing
+    data.max_queue_size = max_queue_size
+    return {}
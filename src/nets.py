@@ -207,3 +207,27 @@ def generate_identification_model(number_of_classes, input_shape=(50, 50, 1), L2
     )
 
     return model
+
+def generate_multi_head_identification_model(numbers_of_classes=(9, 4, 2, 2, 4, 2), input_shape=(50, 50, 1), L2=0.0):
+    from tensorflow.keras.layers import Activation, Dense, GlobalAveragePooling2D
+    from tensorflow.keras.initializers import glorot_normal
+    from tensorflow.keras.regularizers import l2
+    from tensorflow.keras.models import Model
+
+    inp, features = __generate_body(input_shape, L2)
+
+    features = GlobalAveragePooling2D()(features)
+
+    # One head for each type of object, all sharing the same body
+    outputs = []
+    for i, number_of_classes in enumerate(numbers_of_classes):
+        output = Dense(number_of_classes, kernel_initializer=glorot_normal(42), kernel_regularizer=l2(L2), name="out_id_" + str(i))(features)
+        output = Activation("softmax", name="out_id_" + str(i) + "_softmax")(output)
+        outputs.append(output)
+
+    model = Model(
+        inputs=inp,
+        outputs=outputs,
+    )
+
+    return model
@@ -1,6 +1,9 @@
 if __name__ == "__main__":
     import argparse
+    import os
+    from src.GeneratorAugmentedImages import GeneratorAugmentedImages
     from src.IdentificationNetwork import IdentificationNetwork
+    from src.InformationLossChecker import InformationLossChecker
     from src.TrackingNetwork import TrackingNetwork
     from src.Util import get_fixed_path
     import tensorflow.keras.backend as K
@@ -24,13 +27,50 @@ if __name__ == "__main__":
     parser.add_argument("-spe", "--steps_per_epoch", help="Steps per epoch", type=int, required=False, default=128)
     parser.add_argument("-bs", "--batch_size", help="Batch size", type=int, required=False, default=2)
 
+    parser.add_argument("-imh", "--identification_multi_head", help="Train a single identification model with one shared body and one head for each type",
+                        action="store_true")
+
+    parser.add_argument("-ij", "--identification_joint", help="Train the six identification models together in a single run, not with --identification_multi_head",
+                        action="store_true")
+
+    parser.add_argument("-ge", "--grid_ext", help="Extension of the tracking grids, \".grid\" for binary grids or \".txt\" for text grids", type=str,
+                        required=False, default=".grid")
+
+    parser.add_argument("-tfd", "--tf_data", help="Feed the networks with tf.data pipelines instead of Python generators", action="store_true")
+    parser.add_argument("-npc", "--num_parallel_calls", help="Files read in parallel by the tf.data pipelines (AUTOTUNE if not given)", type=int,
+                        required=False, default=None)
+    parser.add_argument("-sbs", "--shuffle_buffer_size", help="Shuffle buffer size of the tf.data pipelines", type=int, required=False, default=1024)
+    parser.add_argument("-ca", "--cache", help="Cache of the tf.data pipelines, \"\" for memory or a file path", type=str, required=False, default=None)
+
+    parser.add_argument("-seq", "--sequence", help="Feed the networks with keras Sequences, whose batches are made by --workers in parallel", action="store_true")
+    parser.add_argument("-wo", "--workers", help="Threads (processes with --use_multiprocessing) that make the batches of the Sequences", type=int,
+                        required=False, default=1)
+    parser.add_argument("-ump", "--use_multiprocessing", help="Make the batches of the Sequences in processes instead of threads", action="store_true")
+    parser.add_argument("-mqs", "--max_queue_size", help="Batches of the Sequences made in advance", type=int, required=False, default=10)
+    parser.add_argument("-se", "--seed", help="Seed of the shuffling of the Sequences (random if not given)", type=int, required=False, default=None)
+
+    parser.add_argument("-sh", "--sharded", help="Read the datasets packed in shards by generate_dataset.py --sharded", action="store_true")
+
+    parser.add_argument("-inm", "--in_memory", help="Keep all the identification images in memory and draw the batches from there", action="store_true")
+    parser.add_argument("-inmc", "--in_memory_cache", help="If given, folder where to cache the in memory identification images as .npy files", type=str,
+                        required=False, default=None)
+
+    parser.add_argument("-af", "--augment_folder", help="If given, train the tracking network on images augmented on the fly from this folder of labeled images",
+                        type=str, required=False, default=None)
+    parser.add_argument("-aw", "--augment_workers", help="Processes that augment the images on the fly", type=int, required=False, default=4)
+    parser.add_argument("-afu", "--augment_fused", help="Transform each image augmented on the fly with a single resampling", action="store_true")
+
     parser.add_argument("-dc", "--do_checkpoint", help="Should save checkpoints", type=bool, required=False, default=True)
 
     args = parser.parse_args()
 
+    if args.identification_joint and args.identification_multi_head:
+        parser.error("--identification_joint trains the six separate identification models, it cannot be used with --identification_multi_head")
+
     datasets_folder = get_fixed_path(args.datasets_folder, replace_backslash=True, add_backslash=True)
     save_folder = get_fixed_path(args.save_folder, replace_backslash=True, add_backslash=True)
     load_folder = get_fixed_path(args.load_folder, replace_backslash=True, add_backslash=True) if args.load_folder is not None else None
+    in_memory_cache_folder = get_fixed_path(args.in_memory_cache, replace_backslash=True, add_backslash=True) if args.in_memory_cache is not None else None
 
     ####################################################################################################################
     # Pre-tracking network
@@ -41,16 +81,38 @@ if __name__ == "__main__":
         if load_folder is None:
             net_pre_tracking = IdentificationNetwork(src.nets.generate_pre_tracking_model(input_shape=(416, 416, 1), number_of_classes=7))
 
+            if args.sharded:
+                generator = IdentificationNetwork.generator_from_shards(folder_shards=datasets_folder + "PreTracking/",
+                                                                        batch_size=args.batch_size,
+                                                                        number_of_classes=7)
+            elif args.tf_data:
+                generator = IdentificationNetwork.dataset(folder_images=datasets_folder + "PreTracking/",
+                                                          batch_size=args.batch_size,
+                                                          image_ext=(".jpg", ".png"),
+                                                          num_parallel_calls=args.num_parallel_calls,
+                                                          shuffle_buffer_size=args.shuffle_buffer_size,
+                                                          cache=args.cache if not args.cache else args.cache + "_pre_tracking")
+            elif args.sequence:
+                generator = IdentificationNetwork.sequence(folder_images=datasets_folder + "PreTracking/",
+                                                           batch_size=args.batch_size,
+                                                           image_ext=(".jpg", ".png"),
+                                                           number_of_classes=7,
+                                                           number_of_batches=args.steps_per_epoch,
+                                                           seed=args.seed)
+            else:
+                generator = IdentificationNetwork.generator(folder_images=datasets_folder + "PreTracking/",
+                                                            batch_size=args.batch_size,
+                                                            image_ext=(".jpg", ".png"))
+
             net_pre_tracking.train_model(epochs=args.pre_tracking_epochs,
                                          steps_per_epoch=args.steps_per_epoch,
                                          weights_save_path=save_folder + "pre_tracking.h5",
                                          weights_load_path=None,
                                          do_checkpoint=args.do_checkpoint,
-                                         generator=IdentificationNetwork.generator(
-                                             folder_images=datasets_folder + "PreTracking/",
-                                             batch_size=args.batch_size,
-                                             image_ext=(".jpg", ".png")
-                                         ))
+                                         generator=generator,
+                                         workers=args.workers,
+                                         use_multiprocessing=args.use_multiprocessing,
+                                         max_queue_size=args.max_queue_size)
 
     ####################################################################################################################
     # Tracking network
@@ -66,21 +128,85 @@ if __name__ == "__main__":
 
         net_tracking.get_model().summary()
 
+        if args.augment_folder is not None:
+            augment_folder = get_fixed_path(args.augment_folder, replace_backslash=True, add_backslash=True)
+            generator = TrackingNetwork.augmentation_generator(GeneratorAugmentedImages(augment_folder, augment_folder, fused=args.augment_fused),
+                                                               batch_size=args.batch_size,
+                                                               information_loss_checker_method=InformationLossChecker.box_centers_out_of_bounds,
+                                                               workers=args.augment_workers)
+        elif args.sharded:
+            generator = TrackingNetwork.generator_from_shards(folder_shards=datasets_folder + "Tracking/",
+                                                              batch_size=args.batch_size)
+        elif args.tf_data:
+            generator = TrackingNetwork.dataset(folder_images=datasets_folder + "Tracking/",
+                                                folder_grids=datasets_folder + "Tracking/",
+                                                batch_size=args.batch_size,
+                                                grid_ext=args.grid_ext,
+                                                num_parallel_calls=args.num_parallel_calls,
+                                                shuffle_buffer_size=args.shuffle_buffer_size,
+                                                cache=args.cache if not args.cache else args.cache + "_tracking")
+        elif args.sequence:
+            generator = TrackingNetwork.sequence(folder_images=datasets_folder + "Tracking/",
+                                                 folder_grids=datasets_folder + "Tracking/",
+                                                 batch_size=args.batch_size,
+                                                 grid_ext=args.grid_ext,
+                                                 number_of_batches=args.steps_per_epoch,
+                                                 seed=args.seed)
+        else:
+            generator = TrackingNetwork.generator(folder_images=datasets_folder + "Tracking/",
+                                                  folder_grids=datasets_folder + "Tracking/",
+                                                  batch_size=args.batch_size,
+                                                  grid_ext=args.grid_ext)
+
         net_tracking.train_model(epochs=args.tracking_epochs,
                                  steps_per_epoch=args.steps_per_epoch,
                                  weights_save_path=save_folder + "tracking.h5",
                                  weights_load_path=load_path_tracking,
                                  do_checkpoint=args.do_checkpoint,
-                                 generator=TrackingNetwork.generator(
-                                     folder_images=datasets_folder + "Tracking/",
-                                     folder_grids=datasets_folder + "Tracking/",
-                                     batch_size=args.batch_size
-                                 ))
+                                 generator=generator,
+                                 workers=args.workers,
+                                 use_multiprocessing=args.use_multiprocessing,
+                                 max_queue_size=args.max_queue_size)
 
     ####################################################################################################################
     # Identification network
     ####################################################################################################################
-    if args.identification_epochs > 0:
+    if args.identification_epochs > 0 and args.identification_multi_head:
+        K.clear_session()
+
+        net_identification = IdentificationNetwork(multi_head_model=src.nets.generate_multi_head_identification_model(
+            numbers_of_classes=(9, 4, 2, 2, 4, 2),
+            input_shape=(50, 50, 1)
+        ))
+
+        load_path_identification = None
+        if load_folder is not None:
+            load_path_identification = load_folder + "identification_multi_head.h5"
+
+            #Start from the weights of the single models if the multi head model has never been trained
+            if not os.path.isfile(load_path_identification) and os.path.isfile(load_folder + "identification_0.h5"):
+                net_identification.load_multi_head_weights_from_models_weights(load_folder + "identification.h5",
+                                                                               numbers_of_classes=(9, 4, 2, 2, 4, 2),
+                                                                               input_shape=(50, 50, 1))
+                load_path_identification = None
+
+        if args.sharded:
+            generator = IdentificationNetwork.multi_head_generator_from_shards(folder_shards=datasets_folder + "Identification/",
+                                                                               batch_size=args.batch_size,
+                                                                               numbers_of_classes=(9, 4, 2, 2, 4, 2))
+        else:
+            generator = IdentificationNetwork.multi_head_generator(folder_images=datasets_folder + "Identification/",
+                                                                   batch_size=args.batch_size,
+                                                                   image_ext=(".jpg", ".png"))
+
+        net_identification.train_multi_head_model(epochs=args.identification_epochs,
+                                                  steps_per_epoch=args.steps_per_epoch,
+                                                  weights_save_path=save_folder + "identification_multi_head.h5",
+                                                  weights_load_path=load_path_identification,
+                                                  do_checkpoint=args.do_checkpoint,
+                                                  generator=generator)
+
+    elif args.identification_epochs > 0:
         K.clear_session()
 
         net_identification = IdentificationNetwork(models=(
@@ -94,14 +220,43 @@ if __name__ == "__main__":
 
         load_path_identification = load_folder + "identification.h5" if load_folder is not None else None
 
-        net_identification.train_models(number_of_models=6,
-                                        epochs=args.identification_epochs,
-                                        steps_per_epoch=args.steps_per_epoch,
-                                        weights_save_path=save_folder + "identification.h5",
-                                        weights_load_path=None,
-                                        do_checkpoint=args.do_checkpoint,
-                                        generators=IdentificationNetwork.generators(
-                                            folder_images=datasets_folder + "Identification/",
-                                            batch_size=args.batch_size,
-                                            image_ext=(".jpg", ".png")
-                                        ))
+        if args.sharded:
+            generators = IdentificationNetwork.generators_from_shards(folder_shards=datasets_folder + "Identification/",
+                                                                      batch_size=args.batch_size,
+                                                                      numbers_of_classes=(9, 4, 2, 2, 4, 2))
+        elif args.in_memory:
+            generators = IdentificationNetwork.in_memory_generators(folder_images=datasets_folder + "Identification/",
+                                                                    batch_size=args.batch_size,
+                                                                    image_ext=(".jpg", ".png"),
+                                                                    cache_folder=in_memory_cache_folder)
+        elif args.tf_data:
+            generators = IdentificationNetwork.datasets(folder_images=datasets_folder + "Identification/",
+                                                        batch_size=args.batch_size,
+                                                        image_ext=(".jpg", ".png"),
+                                                        num_parallel_calls=args.num_parallel_calls,
+                                                        shuffle_buffer_size=args.shuffle_buffer_size,
+                                                        cache=args.cache if not args.cache else args.cache + "_identification")
+        elif args.sequence:
+            generators = IdentificationNetwork.sequences(folder_images=datasets_folder + "Identification/",
+                                                         batch_size=args.batch_size,
+                                                         image_ext=(".jpg", ".png"),
+                                                         number_of_batches=args.steps_per_epoch,
+                                                         seed=args.seed,
+                                                         numbers_of_classes=(9, 4, 2, 2, 4, 2))
+        else:
+            generators = IdentificationNetwork.generators(folder_images=datasets_folder + "Identification/",
+                                                          batch_size=args.batch_size,
+                                                          image_ext=(".jpg", ".png"))
+
+        train_models = net_identification.train_joint_models if args.identification_joint else net_identification.train_models
+
+        train_models(number_of_models=6,
+                     epochs=args.identification_epochs,
+                     steps_per_epoch=args.steps_per_epoch,
+                     weights_save_path=save_folder + "identification.h5",
+                     weights_load_path=None,
+                     do_checkpoint=args.do_checkpoint,
+                     generators=generators,
+                     workers=args.workers,
+                     use_multiprocessing=args.use_multiprocessing,
+                     max_queue_size=args.max_queue_size)